@@ -0,0 +1,81 @@
+from contextlib import contextmanager
+from pathlib import Path
+import json
+import logging
+import os
+import tempfile
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Mỗi thread có lô group commit riêng
+_local = threading.local()
+
+
+def fsync_directory(directory):
+    """fsync thư mục để lệnh đổi tên file được ghi bền (không hỗ trợ trên Windows)"""
+    if os.name == 'nt':
+        return
+    fd = os.open(str(directory), os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def commit_files(files):
+    """Ghi nhiều file {path: text} theo kiểu temp + fsync + os.replace, mỗi thư mục chỉ fsync một lần"""
+    files = {Path(path): text for path, text in files.items()}
+    temps = []
+    try:
+        for path, text in files.items():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+            temps.append((temp_path, path))
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                f.write(text)
+                f.flush()
+                os.fsync(f.fileno())
+
+        for temp_path, path in temps:
+            os.replace(temp_path, path)
+        for directory in {path.parent for path in files}:
+            fsync_directory(directory)
+        return True
+
+    except Exception:
+        for temp_path, _ in temps:
+            if os.path.exists(temp_path):
+                os.unlink(temp_path)
+        raise
+
+
+@contextmanager
+def group_commit():
+    """Các lần write_text/write_json trong khối with được commit cùng nhau khi ra khỏi khối"""
+    if getattr(_local, "batch", None) is not None:
+        # Khối lồng nhau dùng chung lô của khối ngoài
+        yield
+        return
+
+    batch = _local.batch = {}
+    try:
+        yield
+    finally:
+        _local.batch = None
+        if batch:
+            commit_files(batch)
+
+
+def write_text(path, text):
+    """Ghi file an toàn khi crash: hoặc nội dung cũ, hoặc nội dung mới, không bị cắt dở"""
+    batch = getattr(_local, "batch", None)
+    if batch is not None:
+        # Lần ghi sau cùng một file trong lô thay thế lần trước
+        batch[Path(path)] = text
+        return True
+    return commit_files({path: text})
+
+
+def write_json(path, data, indent=4):
+    return write_text(path, json.dumps(data, indent=indent, ensure_ascii=False))
@@ -0,0 +1,283 @@
+from pathlib import Path
+import json
+import logging
+import os
+import re
+import threading
+import time
+
+from .atomic_io import write_json
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_VERSION = 1
+
+# fsync sau mỗi SYNC_EVERY bản ghi hoặc SYNC_INTERVAL giây, tùy điều kiện nào đến trước
+SYNC_EVERY = 16
+SYNC_INTERVAL = 1.0
+# Log vượt kích thước này thì gộp vào snapshot ở thread nền
+COMPACT_BYTES = 4 * 1024 * 1024
+
+_LOG_PATTERN = re.compile(r"log-(\d+)\.jsonl$")
+_SNAPSHOT_PATTERN = re.compile(r"snapshot-(\d+)\.json$")
+
+
+def _session_header(session):
+    return {key: value for key, value in session.items() if key != "segments_data"}
+
+
+def _segment_fields(segment):
+    # Danh sách attempts được ghi bằng từng bản ghi riêng
+    return {key: value for key, value in segment.items()
+            if not (key == "attempts" and isinstance(value, list))}
+
+
+def _apply_header(sessions, header):
+    # Cập nhật thông tin session, giữ nguyên segments đã có
+    session = sessions.setdefault(header["id"], {"segments_data": {}})
+    segments = session.get("segments_data", {})
+    session.clear()
+    session.update(header)
+    session["segments_data"] = segments
+    return session
+
+
+def apply_record(sessions, record):
+    """Áp một bản ghi log lên dict sessions (id -> session)"""
+    op = record.get("op")
+    if op == "session":
+        _apply_header(sessions, record["session"])
+    elif op == "full":
+        session = record["session"]
+        sessions[session["id"]] = session
+    elif op == "clear":
+        sessions.clear()
+    elif op == "segment":
+        segments = _apply_header(sessions, record["session"])["segments_data"]
+
+        segment_id = str(record["segment_id"])
+        attempts = segments.get(segment_id, {}).get("attempts")
+        segment = segments[segment_id] = dict(record["segment"])
+        if "attempts" not in segment:
+            segment["attempts"] = attempts if isinstance(attempts, list) else []
+        if record.get("attempt") is not None:
+            if not isinstance(segment["attempts"], list):
+                segment["attempts"] = []
+            segment["attempts"].append(record["attempt"])
+
+
+class AttemptLog:
+    """Lưu sessions dạng snapshot + log JSON Lines chỉ ghi nối, mỗi attempt là một dòng"""
+
+    # Chỉ lưu sessions; thống kê và tiến trình vẫn dùng file JSON
+    stores_documents = False
+
+    def __init__(self, log_dir=None, sync_every=SYNC_EVERY, sync_interval=SYNC_INTERVAL,
+                 compact_bytes=COMPACT_BYTES):
+        self.log_dir = Path(log_dir or "data/attempts")
+        self.log_dir.mkdir(parents=True, exist_ok=True)
+        self.sync_every = sync_every
+        self.sync_interval = sync_interval
+        self.compact_bytes = compact_bytes
+        self.lock = threading.Lock()
+        self.compaction = None
+        self._pending = 0
+        self._last_sync = time.monotonic()
+        # Timer fsync các bản ghi còn chờ khi người dùng ngừng gõ
+        self._sync_timer = None
+
+        logs = self._files(_LOG_PATTERN)
+        self.sequence = logs[-1][0] if logs else max(
+            [seq for seq, _ in self._files(_SNAPSHOT_PATTERN)] or [1]
+        )
+        self._log = open(self._log_path(self.sequence), 'a', encoding='utf-8')
+        self._terminate_partial_line()
+
+    def _terminate_partial_line(self):
+        """Kết thúc dòng ghi dở từ lần crash trước để bản ghi mới không bị dính vào"""
+        path = self._log_path(self.sequence)
+        if path.stat().st_size == 0:
+            return
+        with open(path, 'rb') as f:
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b"\n":
+                self._log.write("\n")
+                self._log.flush()
+
+    def _files(self, pattern):
+        files = []
+        for path in self.log_dir.iterdir():
+            match = pattern.match(path.name)
+            if match:
+                files.append((int(match.group(1)), path))
+        return sorted(files)
+
+    def _log_path(self, sequence):
+        return self.log_dir / f"log-{sequence:06d}.jsonl"
+
+    def _snapshot_path(self, sequence):
+        return self.log_dir / f"snapshot-{sequence:06d}.json"
+
+    def is_empty(self):
+        return not self._files(_SNAPSHOT_PATTERN) and self._log.tell() == 0 and \
+            all(path.stat().st_size == 0 for _, path in self._files(_LOG_PATTERN))
+
+    # Ghi
+
+    def append(self, record):
+        """Ghi nối một bản ghi; flush ngay, fsync theo lô"""
+        with self.lock:
+            self._log.write(json.dumps(record, ensure_ascii=False) + "\n")
+            self._log.flush()
+            self._pending += 1
+            if self._pending >= self.sync_every or time.monotonic() - self._last_sync >= self.sync_interval:
+                self._sync()
+            elif self._sync_timer is None:
+                self._sync_timer = threading.Timer(self.sync_interval, self._timed_sync)
+                self._sync_timer.daemon = True
+                self._sync_timer.start()
+            size = self._log.tell()
+        if size >= self.compact_bytes:
+            self.compact()
+        return True
+
+    def _sync(self):
+        if self._pending:
+            os.fsync(self._log.fileno())
+            self._pending = 0
+        self._last_sync = time.monotonic()
+        # Timer fsync các bản ghi còn chờ khi người dùng ngừng gõ
+        self._sync_timer = None
+
+    def _timed_sync(self):
+        with self.lock:
+            self._sync_timer = None
+            if not self._log.closed:
+                self._sync()
+
+    def sync(self):
+        """fsync các bản ghi còn chờ"""
+        with self.lock:
+            self._sync()
+
+    def close(self):
+        if self.compaction:
+            self.compaction.join()
+        with self.lock:
+            if self._sync_timer is not None:
+                self._sync_timer.cancel()
+                self._sync_timer = None
+            self._sync()
+            self._log.close()
+
+    def save_session(self, session):
+        """Ghi thông tin và tiến độ của session; segment và attempt ghi qua save_segment"""
+        return self.append({"op": "session", "session": _session_header(session)})
+
+    def replace_session(self, session):
+        """Ghi lại toàn bộ session kể cả lịch sử attempt"""
+        return self.append({"op": "full", "session": session})
+
+    def save_segment(self, session, segment_id, attempt=None):
+        return self.append({
+            "op": "segment",
+            "session": _session_header(session),
+            "segment_id": int(segment_id),
+            "segment": _segment_fields(session["segments_data"][str(segment_id)]),
+            "attempt": attempt
+        })
+
+    def replace_sessions(self, sessions):
+        self.append({"op": "clear"})
+        for session in sessions:
+            self.replace_session(session)
+        return True
+
+    # Đọc
+
+    def _replay(self, sessions, path):
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    apply_record(sessions, json.loads(line))
+                except json.JSONDecodeError:
+                    # Dòng cuối bị ghi dở khi app crash
+                    logger.warning(f"Skipping truncated record in {path}")
+
+    def _read_state(self, up_to=None):
+        """Đọc snapshot mới nhất rồi áp phần log phía sau (chỉ các log có số thứ tự < up_to nếu có)"""
+        sessions = {}
+        snapshots = self._files(_SNAPSHOT_PATTERN)
+        base = 0
+        if snapshots:
+            base, path = snapshots[-1]
+            with open(path, 'r', encoding='utf-8') as f:
+                sessions = {session["id"]: session for session in json.load(f)["sessions"]}
+        for sequence, path in self._files(_LOG_PATTERN):
+            if sequence >= base and (up_to is None or sequence < up_to):
+                self._replay(sessions, path)
+        return sessions
+
+    def load_sessions(self):
+        with self.lock:
+            self._log.flush()
+            return {"sessions": list(self._read_state().values())}
+
+    def load_session(self, session_id):
+        return next((session for session in self.load_sessions()["sessions"]
+                     if session["id"] == session_id), None)
+
+    def find_sessions(self, video_path):
+        sessions = [session for session in self.load_sessions()["sessions"]
+                    if session.get("video_path") == str(video_path)]
+        return sorted(sessions, key=lambda s: s.get("last_accessed") or "", reverse=True)
+
+    # Compaction
+
+    def compact(self, wait=False):
+        """Chuyển sang log mới rồi gộp các log cũ vào snapshot ở thread nền"""
+        with self.lock:
+            if self.compaction and self.compaction.is_alive():
+                return False
+            self._sync()
+            self._log.close()
+            self.sequence += 1
+            self._log = open(self._log_path(self.sequence), 'a', encoding='utf-8')
+            self.compaction = threading.Thread(
+                target=self._write_snapshot, args=(self.sequence,), daemon=True
+            )
+            self.compaction.start()
+        if wait:
+            self.compaction.join()
+        return True
+
+    def _write_snapshot(self, sequence):
+        try:
+            # Các log < sequence đã đóng, đọc không cần lock
+            sessions = self._read_state(up_to=sequence)
+            path = self._snapshot_path(sequence)
+            # Snapshot cũ và các log chỉ bị xóa sau khi snapshot mới đã ghi bền
+            write_json(path, {"version": SNAPSHOT_VERSION, "sessions": list(sessions.values())}, indent=None)
+            with self.lock:
+                for old_sequence, old_path in self._files(_LOG_PATTERN) + self._files(_SNAPSHOT_PATTERN):
+                    if old_sequence < sequence:
+                        old_path.unlink()
+            logger.info(f"Attempt log compacted into {path.name}")
+
+        except Exception as e:
+            logger.error(f"Error compacting attempt log: {str(e)}")
+
+    def import_json(self, data_dir=None):
+        """Chuyển sessions.json cũ vào log ở lần mở đầu tiên"""
+        sessions_file = Path(data_dir or "data") / "sessions.json"
+        if not self.is_empty() or not sessions_file.exists():
+            return False
+        try:
+            with open(sessions_file, 'r', encoding='utf-8') as f:
+                for session in json.load(f).get("sessions", []):
+                    self.replace_session(session)
+            self.sync()
+            return True
+        except Exception as e:
+            logger.error(f"Error importing sessions into attempt log: {str(e)}")
+            return False
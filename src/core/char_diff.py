@@ -0,0 +1,64 @@
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def _count_ones(value):
+    return bin(value).count("1")
+
+
+def lcs_mask(typed, target):
+    """LCS bit-parallel (Allison-Dix) giữa hai từ, trả về tuple bool cho biết ký tự gõ nào nằm trong LCS"""
+    m = len(typed)
+    if m == 0:
+        return ()
+    if not target:
+        return (False,) * m
+
+    # match[c] có bit i bật nếu typed[i] == c
+    match = {}
+    for i, char in enumerate(typed):
+        match[char] = match.get(char, 0) | (1 << i)
+
+    # Bit i của columns[j] bằng 0 khi L[i+1][j] > L[i][j] (L là bảng LCS thông thường)
+    mask = (1 << m) - 1
+    v = mask
+    columns = [v]
+    for char in target:
+        u = v & match.get(char, 0)
+        v = ((v + u) | (v - u)) & mask
+        columns.append(v)
+
+    def lcs_length(i, j):
+        return i - _count_ones(columns[j] & ((1 << i) - 1))
+
+    # Truy vết ngược trên các cột đã lưu
+    matched = [False] * m
+    i, j = m, len(target)
+    while i > 0 and j > 0:
+        if typed[i - 1] == target[j - 1]:
+            matched[i - 1] = True
+            i -= 1
+            j -= 1
+        elif lcs_length(i, j - 1) == lcs_length(i, j):
+            j -= 1
+        else:
+            i -= 1
+    return tuple(matched)
+
+
+class CharDiffer:
+    """So sánh từng ký tự của từ gõ sai với từ đích, ghi nhớ kết quả theo cặp từ"""
+
+    def __init__(self, max_entries=2000):
+        self.max_entries = max_entries
+        self._cache = {}
+
+    def diff(self, typed, target):
+        key = (typed, target)
+        result = self._cache.get(key)
+        if result is None:
+            if len(self._cache) >= self.max_entries:
+                self._cache.clear()
+            result = self._cache[key] = lcs_mask(typed.lower(), target.lower())
+        return result
@@ -2,6 +2,8 @@ import json
 from pathlib import Path
 import logging
 
+from .atomic_io import write_json
+
 logger = logging.getLogger(__name__)
 
 class ConfigManager:
@@ -37,7 +39,11 @@ class ConfigManager:
                 "show_typing_speed": True,
                 "show_accuracy": True,
                 "highlight_errors": True,
-                "auto_replay_count": 1
+                "auto_replay_count": 1,
+                "near_miss_threshold": 0.8,
+                "similar_threshold": 0.5,
+                "char_diff": False,
+                "fold_diacritics": False
             },
             "ui_settings": {
                 "theme": "dark",
@@ -45,6 +51,28 @@ class ConfigManager:
                 "subtitle_position": "bottom",
                 "show_progress_bar": True,
                 "show_statistics": True
+            },
+            "cache_settings": {
+                "subtitle_cache_dir": "data/cache/subtitles",
+                "subtitle_cache_max_mb": 64
+            },
+            "playback_settings": {
+                "timing_repair": True,
+                "tail_ms": 400,
+                "search_ms": 300
+            },
+            "subtitle_settings": {
+                "strip_tags": True,
+                "strip_sound_effects": True,
+                "strip_speaker_labels": True,
+                "strip_bare_speaker_labels": True,
+                "strip_dialogue_dashes": True
+            },
+            "storage_settings": {
+                "backend": "sqlite"
+            },
+            "debug_settings": {
+                "latency_overlay": False
             }
         }
         self.save_config()
@@ -52,9 +80,7 @@ class ConfigManager:
     def save_config(self):
         """Lưu cấu hình"""
         try:
-            with open(self.config_file, 'w', encoding='utf-8') as f:
-                json.dump(self.config, f, indent=4, ensure_ascii=False)
-            return True
+            return write_json(self.config_file, self.config)
         except Exception as e:
             logger.error(f"Error saving config: {str(e)}")
             return False
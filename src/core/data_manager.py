@@ -3,55 +3,106 @@ from pathlib import Path
 import logging
 from datetime import datetime
 
+from .atomic_io import write_json
+from .session_repository import SessionRepository
+
 logger = logging.getLogger(__name__)
 
 class DataManager:
-    def __init__(self):
+    def __init__(self, storage=None):
         self.data_dir = Path("data")
         self.sessions_file = self.data_dir / "sessions.json"
+        # SQLiteStorage nếu bật trong storage_settings, None thì dùng file JSON như cũ
+        self.storage = storage
         self.ensure_data_directory()
+        # Sessions được load một lần rồi tra cứu theo index trong bộ nhớ
+        self.sessions = SessionRepository(
+            lambda: self.read_sessions().get("sessions", []), self.write_sessions
+        )
         
     def ensure_data_directory(self):
         """Đảm bảo thư mục data và các file cần thiết tồn tại"""
         self.data_dir.mkdir(exist_ok=True)
-        if not self.sessions_file.exists():
-            self.sessions_file.write_text('{"sessions": []}', encoding='utf-8')
+        if self.storage is None and not self.sessions_file.exists():
+            write_json(self.sessions_file, {"sessions": []})
             
-    def load_sessions(self):
-        """Load tất cả sessions"""
+    def read_sessions(self):
+        """Đọc toàn bộ sessions từ storage, bỏ qua repository"""
         try:
+            if self.storage is not None:
+                return self.storage.load_sessions()
             with open(self.sessions_file, 'r', encoding='utf-8') as f:
                 return json.load(f)
         except Exception as e:
             logger.error(f"Error loading sessions: {str(e)}")
             return {"sessions": []}
-            
+
+    def write_sessions(self, changed, sessions):
+        """Ghi các session đã thay đổi; file JSON được ghi lại một lần từ bộ nhớ"""
+        try:
+            if self.storage is not None:
+                for session in changed:
+                    if not self.storage.save_session(session):
+                        return False
+                return True
+            return write_json(self.sessions_file, {"sessions": sessions})
+        except Exception as e:
+            logger.error(f"Error saving sessions: {str(e)}")
+            return False
+
+    def load_sessions(self):
+        """Load tất cả sessions"""
+        return {"sessions": self.sessions.all()}
+
+    def load_session(self, session_id):
+        """Load một session theo id, None nếu không có"""
+        try:
+            return self.sessions.get(session_id)
+        except Exception as e:
+            logger.error(f"Error loading session: {str(e)}")
+            return None
+
+    def find_sessions(self, video_path):
+        """Các session của một video, mới truy cập nhất trước"""
+        return self.sessions.find_by_video(video_path)
+
+    def save_segment(self, session_data, segment_index, attempt=None):
+        """Lưu thay đổi của một segment; với SQLite chỉ ghi vài dòng thay vì cả file"""
+        try:
+            if self.storage is not None:
+                # Storage ghi thẳng phần thay đổi, repository chỉ cập nhật index
+                self.sessions.put(session_data, dirty=False)
+                if not self.storage.save_segment(session_data, segment_index, attempt):
+                    return False
+                self.sessions.mark_clean(session_data["id"])
+                return True
+            return self.save_session(session_data)
+        except Exception as e:
+            logger.error(f"Error saving segment: {str(e)}")
+            return False
+
+    def replace_session(self, session_data):
+        """Ghi lại toàn bộ session kể cả lịch sử attempt (sau khi đổi số thứ tự segment)"""
+        try:
+            if self.storage is not None:
+                self.sessions.put(session_data, dirty=False)
+                if not self.storage.replace_session(session_data):
+                    return False
+                self.sessions.mark_clean(session_data["id"])
+                return True
+            return self.save_session(session_data)
+        except Exception as e:
+            logger.error(f"Error replacing session: {str(e)}")
+            return False
+
     def save_session(self, session_data):
-        """Lưu hoặc cập nhật session"""
+        """Lưu hoặc cập nhật session; với storage chỉ ghi thông tin và tiến độ, không ghi lại attempts"""
         try:
-            data = self.load_sessions()
-            
-            # Tìm và cập nhật session nếu đ tồn tại
-            session_found = False
-            for i, session in enumerate(data["sessions"]):
-                if session["id"] == session_data["id"]:
-                    data["sessions"][i] = session_data
-                    session_found = True
-                    break
-            
-            # Thêm mới nếu chưa tồn tại
-            if not session_found:
-                data["sessions"].append(session_data)
-            
-            # Lưu file
-            with open(self.sessions_file, 'w', encoding='utf-8') as f:
-                json.dump(data, f, indent=4, ensure_ascii=False)
-                
-            return True
-            
+            self.sessions.put(session_data)
+            return self.sessions.commit()
         except Exception as e:
             logger.error(f"Error saving session: {str(e)}")
-            return False 
+            return False
 
     def backup_sessions(self):
         """Tạo backup cho dữ liệu sessions"""
@@ -65,8 +116,7 @@ class DataManager:
             
             # Copy dữ liệu hiện tại sang file backup
             data = self.load_sessions()
-            with open(backup_file, 'w', encoding='utf-8') as f:
-                json.dump(data, f, indent=4, ensure_ascii=False)
+            write_json(backup_file, data)
                 
             # Giữ lại tối đa 5 file backup gần nhất
             backup_files = sorted(backup_dir.glob("sessions_backup_*.json"))
@@ -94,10 +144,12 @@ class DataManager:
             self.backup_sessions()
             
             # Restore dữ liệu
-            with open(self.sessions_file, 'w', encoding='utf-8') as f:
-                json.dump(backup_data, f, indent=4, ensure_ascii=False)
-                
-            return True
+            if self.storage is not None:
+                restored = self.storage.replace_sessions(backup_data["sessions"])
+            else:
+                restored = write_json(self.sessions_file, backup_data)
+            self.sessions.reload()
+            return restored
             
         except Exception as e:
             logger.error(f"Error restoring from backup: {str(e)}")
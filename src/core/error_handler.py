@@ -6,6 +6,8 @@ from typing import Optional, Dict, Any
 from pathlib import Path
 from datetime import datetime
 
+from .atomic_io import write_json
+
 logger = logging.getLogger(__name__)
 
 class ErrorType(Enum):
@@ -68,21 +70,19 @@ class ErrorHandler:
         try:
             file_path = Path(error.details.get("file_path", ""))
             
-            # Kiểm tra và tạo file mặc định
+            # Kiểm tra và tạo file mặc định (ghi atomic, không để lại file rỗng)
             if file_path.suffix == ".json":
-                file_path.parent.mkdir(parents=True, exist_ok=True)
-                with open(file_path, "w", encoding="utf-8") as f:
-                    if "sessions" in file_path.name:
-                        json.dump({"sessions": []}, f, indent=4)
-                    elif "statistics" in file_path.name:
-                        json.dump({"daily_stats": {}}, f, indent=4)
-                    elif "progress" in file_path.name:
-                        json.dump({
-                            "practice_streak": 0,
-                            "total_practice_time": 0,
-                            "completed_videos": []
-                        }, f, indent=4)
-                return True
+                if "sessions" in file_path.name:
+                    return write_json(file_path, {"sessions": []})
+                elif "statistics" in file_path.name:
+                    return write_json(file_path, {"daily_stats": {}})
+                elif "progress" in file_path.name:
+                    return write_json(file_path, {
+                        "practice_streak": 0,
+                        "total_practice_time": 0,
+                        "completed_videos": []
+                    })
+                return False
                 
             return False
             
@@ -93,8 +93,10 @@ class ErrorHandler:
     def handle_invalid_data(self, error: AppError) -> bool:
         """Xử lý lỗi dữ liệu không hợp lệ"""
         try:
-            # Backup dữ liệu lỗi
-            self.backup_corrupted_data(error.details.get("file_path"))
+            # Chuyển file lỗi sang chỗ khác, không ghi đè lên dữ liệu của người dùng
+            file_path = error.details.get("file_path")
+            if file_path and Path(file_path).exists() and not self.move_corrupted_data(file_path):
+                return False
             
             # Tạo dữ liệu mới
             return self.handle_file_not_found(error)
@@ -175,8 +177,8 @@ class ErrorHandler:
             logger.error(f"Error handling unknown error: {str(e)}")
             return False
             
-    def backup_corrupted_data(self, file_path: Optional[str]) -> bool:
-        """Backup dữ liệu bị lỗi"""
+    def move_corrupted_data(self, file_path: Optional[str]) -> bool:
+        """Đổi tên file bị lỗi thành <tên>.corrupt-<timestamp> để giữ lại dữ liệu gốc"""
         try:
             if not file_path:
                 return False
@@ -185,15 +187,15 @@ class ErrorHandler:
             if not src.exists():
                 return False
                 
-            # Tạo backup với timestamp
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            dst = src.parent / f"{src.stem}_corrupted_{timestamp}{src.suffix}"
-            shutil.copy2(src, dst)
+            dst = src.with_name(f"{src.name}.corrupt-{timestamp}")
+            src.rename(dst)
+            logger.warning(f"Corrupted file moved to {dst}")
             
             return True
             
         except Exception as e:
-            logger.error(f"Error backing up corrupted data: {str(e)}")
+            logger.error(f"Error moving corrupted data: {str(e)}")
             return False
 
     def backup_all_data(self) -> bool:
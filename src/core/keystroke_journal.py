@@ -0,0 +1,166 @@
+from array import array
+from pathlib import Path
+import hashlib
+import logging
+import struct
+import time
+
+logger = logging.getLogger(__name__)
+
+JOURNAL_MAGIC = b"KSEG"
+# magic, mã nguồn (hash file phụ đề), segment index, số phím, số phím bị ghi đè, thời điểm flush (ns)
+_SEGMENT_HEADER = struct.Struct("<4s8sIIIq")
+
+# Mã phím Qt dùng khi phân tích (Qt.Key_Backspace, Qt.Key_Delete)
+KEY_BACKSPACE = 0x01000003
+KEY_DELETE = 0x01000007
+CORRECTION_KEYS = (KEY_BACKSPACE, KEY_DELETE)
+# Bit đánh dấu phím sinh ra ký tự trong cột keys (Qt không dùng bit này cho mã phím)
+TEXT_KEY = 0x40000000
+
+# Khoảng ngừng giữa hai phím được coi là do dự
+HESITATION_NS = 1_000_000_000
+
+
+def source_id(subtitle_file):
+    """Mã 8 byte đại diện cho file phụ đề trong journal"""
+    return hashlib.blake2b(str(subtitle_file).encode('utf-8'), digest_size=8).digest()
+
+
+class KeystrokeJournal:
+    """Ring buffer cố định ghi (monotonic_ns, key, position) của từng phím, flush theo segment"""
+
+    def __init__(self, journal_file=None, capacity=4096, writer=None):
+        self.journal_file = Path(journal_file or "data/keystrokes.bin")
+        self.capacity = capacity
+        # PersistenceWorker: ghi file ở thread nền thay vì GUI thread
+        self.writer = writer
+        self.flushes = 0
+        # Cấp phát sẵn, mỗi phím chỉ ghi đè 3 phần tử
+        self.times = array('q', bytes(8 * capacity))
+        self.keys = array('i', bytes(4 * capacity))
+        self.positions = array('i', bytes(4 * capacity))
+        self.count = 0
+
+    def record(self, key, position, text=False):
+        """Ghi một phím; text=True nếu phím sinh ra ký tự (không phải Shift, Ctrl, Tab, Return...)"""
+        slot = self.count % self.capacity
+        self.times[slot] = time.monotonic_ns()
+        self.keys[slot] = key | TEXT_KEY if text else key
+        self.positions[slot] = position
+        self.count += 1
+
+    def record_text(self, text, position):
+        """Ghi từng ký tự của chuỗi do bộ gõ (IME) commit, mã phím là code point của ký tự"""
+        for offset, char in enumerate(text):
+            if char.isprintable():
+                self.record(ord(char), position + offset, text=True)
+
+    def snapshot(self):
+        """Các phím của segment hiện tại theo thứ tự thời gian: (times, keys, positions)"""
+        size = min(self.count, self.capacity)
+        start = self.count % self.capacity if self.count > self.capacity else 0
+        order = list(range(start, size)) + list(range(0, start))
+        return (
+            array('q', (self.times[i] for i in order)),
+            array('i', (self.keys[i] for i in order)),
+            array('i', (self.positions[i] for i in order))
+        )
+
+    def reset(self):
+        self.count = 0
+
+    def flush(self, source, segment_index):
+        """Đóng gói các phím của segment rồi xóa buffer; việc ghi vào cuối file journal chạy ở writer nếu có"""
+        try:
+            if self.count == 0:
+                return True
+
+            times, keys, positions = self.snapshot()
+            dropped = self.count - len(times)
+            record = b"".join((
+                _SEGMENT_HEADER.pack(JOURNAL_MAGIC, source, segment_index, len(times), dropped, time.time_ns()),
+                times.tobytes(), keys.tobytes(), positions.tobytes()
+            ))
+            self.reset()
+            if self.writer is not None:
+                # Mỗi lần flush một key riêng để các bản ghi không bị gộp mất
+                self.flushes += 1
+                return self.writer.submit(("keystrokes", self.flushes), self.append, record)
+            return self.append(record)
+
+        except Exception as e:
+            logger.error(f"Error flushing keystroke journal: {str(e)}")
+            self.reset()
+            return False
+
+    def append(self, record):
+        """Ghi nối một bản ghi segment vào file journal"""
+        try:
+            self.journal_file.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.journal_file, 'ab') as f:
+                f.write(record)
+            return True
+        except Exception as e:
+            logger.error(f"Error writing keystroke journal: {str(e)}")
+            return False
+
+
+def iter_journal(journal_file):
+    """Đọc lại file journal, yield dict cho từng segment đã flush"""
+    with open(journal_file, 'rb') as f:
+        while True:
+            header = f.read(_SEGMENT_HEADER.size)
+            if len(header) < _SEGMENT_HEADER.size:
+                return
+            magic, source, segment_index, count, dropped, flushed_at = _SEGMENT_HEADER.unpack(header)
+            if magic != JOURNAL_MAGIC:
+                logger.warning(f"Corrupted keystroke journal: {journal_file}")
+                return
+
+            columns = []
+            for typecode in ('q', 'i', 'i'):
+                column = array(typecode)
+                data = f.read(column.itemsize * count)
+                if len(data) < column.itemsize * count:
+                    # Bản ghi cuối bị ghi dở
+                    return
+                column.frombytes(data)
+                columns.append(column)
+
+            yield {
+                "source": source,
+                "segment_index": segment_index,
+                "dropped": dropped,
+                "flushed_at": flushed_at,
+                "times": columns[0],
+                "keys": columns[1],
+                "positions": columns[2]
+            }
+
+
+def analyze_keystrokes(times, keys, hesitation_ns=HESITATION_NS):
+    """Tính WPM thực, các khoảng do dự và tỉ lệ sửa lỗi từ dữ liệu phím"""
+    count = len(times)
+    if count == 0:
+        return {"keystrokes": 0, "duration": 0, "wpm": 0, "hesitations": [], "correction_rate": 0}
+
+    duration_ns = times[-1] - times[0]
+    corrections = sum(1 for key in keys if (key & ~TEXT_KEY) in CORRECTION_KEYS)
+    # Chỉ phím sinh ra ký tự mới tính là đã gõ; mỗi phím sửa lỗi xóa một ký tự đã gõ trước đó
+    typed = sum(1 for key in keys if key & TEXT_KEY)
+    net_characters = max(0, typed - corrections)
+    minutes = duration_ns / 60e9
+    hesitations = [
+        (i, (times[i] - times[i - 1]) / 1e9)
+        for i in range(1, count)
+        if times[i] - times[i - 1] >= hesitation_ns
+    ]
+    return {
+        "keystrokes": count,
+        "duration": duration_ns / 1e9,
+        # Quy ước 5 ký tự = 1 từ
+        "wpm": round(net_characters / 5 / minutes) if minutes > 0 else 0,
+        "hesitations": hesitations,
+        "correction_rate": corrections / (typed + corrections) if typed + corrections else 0
+    }
@@ -0,0 +1,162 @@
+from array import array
+from datetime import datetime
+from functools import wraps
+from pathlib import Path
+from time import perf_counter_ns
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Histogram log-bucket: mỗi lũy thừa của 2 chia thành 4 bucket (sai số <= 25%)
+_SUB_BUCKET_BITS = 2
+_SUB_BUCKETS = 1 << _SUB_BUCKET_BITS
+_BUCKET_COUNT = 64 * _SUB_BUCKETS
+
+
+def _bucket_index(ns):
+    if ns < _SUB_BUCKETS:
+        return max(0, ns)
+    shift = ns.bit_length() - _SUB_BUCKET_BITS - 1
+    index = (shift + 1) * _SUB_BUCKETS + ((ns >> shift) & (_SUB_BUCKETS - 1))
+    return min(index, _BUCKET_COUNT - 1)
+
+
+def _bucket_upper(index):
+    """Giá trị lớn nhất (ns) thuộc bucket index"""
+    if index < _SUB_BUCKETS:
+        return index
+    shift = index // _SUB_BUCKETS - 1
+    lower = (_SUB_BUCKETS + index % _SUB_BUCKETS) << shift
+    return lower + (1 << shift) - 1
+
+
+class LatencyHistogram:
+    """Histogram độ trễ với bộ nhớ cố định, tính p50/p95/p99 xấp xỉ"""
+
+    def __init__(self):
+        self.counts = array('Q', bytes(8 * _BUCKET_COUNT))
+        self.count = 0
+        self.total_ns = 0
+        self.max_ns = 0
+
+    def record(self, ns):
+        self.counts[_bucket_index(ns)] += 1
+        self.count += 1
+        self.total_ns += ns
+        if ns > self.max_ns:
+            self.max_ns = ns
+
+    def percentile(self, p):
+        """Phân vị p (0-100) tính bằng ns, lấy cận trên của bucket"""
+        if self.count == 0:
+            return 0
+        rank = max(1, -(-self.count * p // 100))
+        seen = 0
+        for index, bucket in enumerate(self.counts):
+            seen += bucket
+            if seen >= rank:
+                return min(_bucket_upper(index), self.max_ns)
+        return self.max_ns
+
+    def to_dict(self):
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total_ns / self.count / 1e6, 3) if self.count else 0,
+            "p50_ms": round(self.percentile(50) / 1e6, 3),
+            "p95_ms": round(self.percentile(95) / 1e6, 3),
+            "p99_ms": round(self.percentile(99) / 1e6, 3),
+            "max_ms": round(self.max_ns / 1e6, 3)
+        }
+
+
+class _Span:
+    __slots__ = ("recorder", "name", "start")
+
+    def __init__(self, recorder, name):
+        self.recorder = recorder
+        self.name = name
+
+    def __enter__(self):
+        self.start = perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        self.recorder.record(self.name, perf_counter_ns() - self.start)
+        return False
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class LatencyRecorder:
+    """Gom thời gian của các span theo tên, mặc định tắt để không tốn chi phí"""
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.histograms = {}
+
+    def record(self, name, elapsed_ns):
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            histogram = self.histograms[name] = LatencyHistogram()
+        histogram.record(elapsed_ns)
+
+    def span(self, name):
+        """Context manager đo một đoạn code"""
+        return _Span(self, name) if self.enabled else _NULL_SPAN
+
+    def summary(self):
+        """p50/p95/p99 của từng span"""
+        return {name: histogram.to_dict() for name, histogram in sorted(self.histograms.items())}
+
+    def reset(self):
+        self.histograms = {}
+
+    def export(self, export_file, extra=None):
+        """Xuất số liệu ra file JSON để đính kèm báo lỗi"""
+        try:
+            export_file = Path(export_file)
+            export_file.parent.mkdir(parents=True, exist_ok=True)
+            report = {
+                "exported_at": datetime.now().isoformat(),
+                "spans": self.summary()
+            }
+            if extra:
+                report.update(extra)
+            with open(export_file, 'w', encoding='utf-8') as f:
+                json.dump(report, f, indent=4, ensure_ascii=False)
+            return True
+        except Exception as e:
+            logger.error(f"Error exporting latency report: {str(e)}")
+            return False
+
+
+# Recorder dùng chung cho các hàm gắn @timed
+latency_recorder = LatencyRecorder()
+
+
+def timed(name, recorder=latency_recorder):
+    """Decorator đo thời gian chạy của hàm, chỉ kiểm tra một cờ khi recorder đang tắt"""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not recorder.enabled:
+                return func(*args, **kwargs)
+            start = perf_counter_ns()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                recorder.record(name, perf_counter_ns() - start)
+        return wrapper
+    return decorator
@@ -2,6 +2,8 @@ from pathlib import Path
 import json
 import logging
 
+from .atomic_io import write_json
+
 logger = logging.getLogger(__name__)
 
 class NoteManager:
@@ -46,9 +48,7 @@ class NoteManager:
         """Lưu notes cho video"""
         try:
             note_file = self.get_note_file(video_file)
-            with open(note_file, 'w', encoding='utf-8') as f:
-                json.dump(notes, f, indent=4, ensure_ascii=False)
-            return True
+            return write_json(note_file, notes)
         except Exception as e:
             logger.error(f"Error saving notes: {str(e)}")
             return False
@@ -0,0 +1,105 @@
+import logging
+import threading
+import time
+
+from .atomic_io import group_commit
+
+logger = logging.getLogger(__name__)
+
+# Các lần lưu cùng một tài liệu trong khoảng này được gộp thành một lần ghi
+WRITE_WINDOW = 0.5
+
+
+class PersistenceWorker:
+    """Thread ghi dữ liệu xuống đĩa thay cho GUI thread, gộp các lần lưu cùng key"""
+
+    def __init__(self, window=WRITE_WINDOW):
+        self.window = window
+        self._condition = threading.Condition()
+        # key -> (deadline, write, args); lần lưu sau thay dữ liệu nhưng giữ deadline của lần đầu
+        self._pending = {}
+        self._busy = False
+        self._force = False
+        self._stopped = False
+        self.writes = 0
+        self.merged = 0
+        self._thread = threading.Thread(target=self._run, name="persistence", daemon=True)
+        self._thread.start()
+
+    def submit(self, key, write, *args):
+        """Đặt lịch gọi write(*args) ở thread nền, thay thế lần ghi chưa thực hiện của key"""
+        with self._condition:
+            if not self._stopped:
+                previous = self._pending.get(key)
+                if previous:
+                    self.merged += 1
+                deadline = previous[0] if previous else time.monotonic() + self.window
+                self._pending[key] = (deadline, write, args)
+                self._condition.notify_all()
+                return True
+
+        # Worker đã dừng (đang đóng app): ghi ngay
+        return self._write(write, args)
+
+    def _write(self, write, args):
+        try:
+            return write(*args)
+        except Exception as e:
+            logger.error(f"Error in background write: {str(e)}")
+            return False
+
+    def _take_due(self, force):
+        now = time.monotonic()
+        due = [key for key, (deadline, _, _) in self._pending.items() if force or deadline <= now]
+        return [self._pending.pop(key)[1:] for key in due]
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while True:
+                    jobs = self._take_due(self._force or self._stopped)
+                    if jobs:
+                        self._busy = True
+                        break
+                    if self._stopped:
+                        return
+                    timeout = None
+                    if self._pending:
+                        timeout = max(0, min(deadline for deadline, _, _ in self._pending.values())
+                                      - time.monotonic())
+                    self._condition.wait(timeout)
+
+            # Các tài liệu ghi trong cùng một lượt được commit cùng nhau, fsync thư mục một lần
+            try:
+                with group_commit():
+                    for write, args in jobs:
+                        self._write(write, args)
+            except Exception as e:
+                logger.error(f"Error committing background writes: {str(e)}")
+
+            with self._condition:
+                self._busy = False
+                self.writes += len(jobs)
+                self._condition.notify_all()
+
+    def flush(self, timeout=None):
+        """Ghi ngay mọi thứ đang chờ và đợi ghi xong"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            self._force = True
+            self._condition.notify_all()
+            while (self._pending or self._busy) and self._thread.is_alive():
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+            self._force = False
+            return not self._pending and not self._busy
+
+    def stop(self, timeout=None):
+        """Ghi nốt dữ liệu đang chờ rồi dừng thread (gọi khi đóng app)"""
+        with self._condition:
+            self._stopped = True
+            self._condition.notify_all()
+        self._thread.join(timeout)
+        return not self._thread.is_alive()
@@ -1,18 +1,30 @@
 from pathlib import Path
 from datetime import datetime, timedelta
+import copy
 import json
 import logging
 
+from .atomic_io import write_json
+
 logger = logging.getLogger(__name__)
 
 class ProgressManager:
-    def __init__(self):
+    def __init__(self, storage=None, writer=None):
         self.progress_file = Path("data/progress.json")
+        # PersistenceWorker để ghi ở thread nền, None thì ghi ngay như cũ
+        self.writer = writer
+        self.storage = storage if getattr(storage, "stores_documents", False) else None
         self.load_progress()
         
     def load_progress(self):
         """Load dữ liệu tiến độ"""
         try:
+            if self.storage is not None:
+                self.progress = self.storage.get_document("progress")
+                if self.progress is None:
+                    self.create_default_progress()
+                return
+
             if not self.progress_file.exists():
                 self.create_default_progress()
             
@@ -33,7 +45,7 @@ class ProgressManager:
                 "total_practice_time": 0,
                 "completed_videos": []
             }
-            return self.save_progress()
+            return self.write_progress()
         except Exception as e:
             logger.error(f"Error creating default progress: {str(e)}")
             return False
@@ -47,14 +59,27 @@ class ProgressManager:
                 "subtitle_file": progress_data["subtitle_file"],
                 "current_segment_index": progress_data["current_segment_index"]
             }
-            
-            with open(self.progress_file, "w", encoding="utf-8") as f:
-                json.dump(self.progress, f, indent=4, ensure_ascii=False)
-            return True
+            return self.write_progress()
         except Exception as e:
             logger.error(f"Error saving progress: {str(e)}")
             return False
 
+    def write_progress(self):
+        """Ghi toàn bộ dữ liệu tiến độ (ở thread nền nếu có writer)"""
+        if self.writer is not None:
+            return self.writer.submit("progress", self.write_document, copy.deepcopy(self.progress))
+        return self.write_document(self.progress)
+
+    def write_document(self, progress):
+        """Ghi dữ liệu tiến độ xuống đĩa"""
+        try:
+            if self.storage is not None:
+                return self.storage.put_document("progress", progress)
+            return write_json(self.progress_file, progress)
+        except Exception as e:
+            logger.error(f"Error writing progress: {str(e)}")
+            return False
+
     def get_progress(self, video_file):
         """Lấy tiến trình học tập của video"""
         try:
@@ -82,7 +107,7 @@ class ProgressManager:
             if self.progress["last_practice_date"] is None:
                 self.progress["practice_streak"] = 1
                 self.progress["last_practice_date"] = today.strftime("%Y-%m-%d")
-                return self.save_progress()
+                return self.write_progress()
             
             # Chuyển đổi last_practice_date từ string sang date
             try:
@@ -94,7 +119,7 @@ class ProgressManager:
                 # Nếu có lỗi khi chuyển đổi, reset về giá trị mặc định
                 self.progress["practice_streak"] = 1
                 self.progress["last_practice_date"] = today.strftime("%Y-%m-%d")
-                return self.save_progress()
+                return self.write_progress()
             
             # Cập nhật streak dựa trên khoảng cách giữa các ngày
             if (today - last_practice) > timedelta(days=1):
@@ -103,7 +128,7 @@ class ProgressManager:
                 self.progress["practice_streak"] += 1
             
             self.progress["last_practice_date"] = today.strftime("%Y-%m-%d")
-            return self.save_progress()
+            return self.write_progress()
             
         except Exception as e:
             logger.error(f"Error updating practice streak: {str(e)}")
@@ -126,11 +151,11 @@ class ProgressManager:
                     # Cập nhật thông tin nếu độ chính xác cao hơn
                     if accuracy > video["accuracy"]:
                         self.progress["completed_videos"][i] = completed_video
-                    return self.save_progress()
+                    return self.write_progress()
                     
             # Thêm video mới
             self.progress["completed_videos"].append(completed_video)
-            return self.save_progress()
+            return self.write_progress()
             
         except Exception as e:
             logger.error(f"Error saving completed video: {str(e)}")
@@ -154,7 +179,7 @@ class ProgressManager:
         """Cập nhật tổng thời gian luyện tập"""
         try:
             self.progress["total_practice_time"] += seconds
-            return self.save_progress()
+            return self.write_progress()
         except Exception as e:
             logger.error(f"Error updating practice time: {str(e)}")
             return False 
@@ -1,6 +1,9 @@
 from datetime import datetime
 import logging
 
+from .textnorm import normalize_token
+from .word_alignment import align_words, SUBSTITUTE, INSERT
+
 logger = logging.getLogger(__name__)
 
 class ProgressTracker:
@@ -10,14 +13,17 @@ class ProgressTracker:
     def track_segment_attempt(self, segment_index, user_text, correct_text, time_taken):
         """Theo dõi một lần thử của segment"""
         try:
+            # Căn từ một lần, dùng chung cho độ chính xác và phân tích lỗi
+            alignment = self.align(user_text, correct_text)
+
             # Tính toán độ chính xác
-            accuracy = self.calculate_accuracy(user_text, correct_text)
+            accuracy = self.calculate_accuracy(user_text, correct_text, alignment)
             
             # Tính toán tốc độ gõ
             typing_speed = self.calculate_typing_speed(user_text, time_taken)
             
             # Phân tích lỗi
-            errors = self.analyze_errors(user_text, correct_text)
+            errors = self.analyze_errors(user_text, correct_text, alignment)
             
             # Tạo dữ liệu attempt
             attempt_data = {
@@ -35,18 +41,20 @@ class ProgressTracker:
             logger.error(f"Error tracking segment attempt: {str(e)}")
             return False
             
-    def calculate_accuracy(self, user_text, correct_text):
+    def align(self, user_text, correct_text):
+        """Căn các từ đã gõ với câu đúng (chịu được từ thừa và từ bị bỏ sót)"""
+        return align_words(
+            [normalize_token(word) for word in user_text.split()],
+            [normalize_token(word) for word in correct_text.split()]
+        )
+
+    def calculate_accuracy(self, user_text, correct_text, alignment=None):
         """Tính toán độ chính xác"""
         try:
-            # Chuẩn hóa text
-            user_words = user_text.lower().split()
-            correct_words = correct_text.lower().split()
-            
-            # Đếm từ đúng
-            correct_count = sum(1 for u, c in zip(user_words, correct_words) if u == c)
-            total_words = len(correct_words)
+            alignment = alignment or self.align(user_text, correct_text)
+            total_words = alignment.target_count
             
-            return (correct_count / total_words * 100) if total_words > 0 else 0
+            return (alignment.matches / total_words * 100) if total_words > 0 else 0
             
         except Exception as e:
             logger.error(f"Error calculating accuracy: {str(e)}")
@@ -63,21 +71,30 @@ class ProgressTracker:
             logger.error(f"Error calculating typing speed: {str(e)}")
             return 0
             
-    def analyze_errors(self, user_text, correct_text):
+    def analyze_errors(self, user_text, correct_text, alignment=None):
         """Phân tích các lỗi gõ"""
         try:
             user_words = user_text.lower().split()
             correct_words = correct_text.lower().split()
+            alignment = alignment or self.align(user_text, correct_text)
             
             errors = []
-            for i, (user, correct) in enumerate(zip(user_words, correct_words)):
-                if user != correct:
-                    errors.append({
-                        "position": i,
-                        "expected": correct,
-                        "actual": user,
-                        "type": self.categorize_error(user, correct)
-                    })
+            # Lần thử đã kết thúc nên các từ chưa gõ cũng tính là bỏ sót
+            for op, user_index, correct_index in alignment.errors(include_pending=True):
+                user = user_words[user_index] if user_index >= 0 else ""
+                correct = correct_words[correct_index] if correct_index >= 0 else ""
+                if op == SUBSTITUTE:
+                    error_type = self.categorize_error(user, correct)
+                elif op == INSERT:
+                    error_type = "extra"
+                else:
+                    error_type = "missing"
+                errors.append({
+                    "position": correct_index if correct_index >= 0 else user_index,
+                    "expected": correct,
+                    "actual": user,
+                    "type": error_type
+                })
                     
             return errors
             
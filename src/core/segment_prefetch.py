@@ -0,0 +1,83 @@
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+import logging
+
+from .word_alignment import WordAligner
+from .word_evaluator import comparable_words
+
+logger = logging.getLogger(__name__)
+
+# aligner là None nếu segment được dựng ngay trên GUI thread (chưa kịp chuẩn bị)
+PreparedSegment = namedtuple(
+    "PreparedSegment", ["position", "tokens", "start_ms", "end_ms", "fold", "aligner"]
+)
+
+# Một thread nền dùng chung cho mọi bảng segment, tạo khi cần lần đầu
+_executor = None
+
+
+def _shared_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="segment-prefetch")
+    return _executor
+
+
+class SegmentPrefetcher:
+    """Chuẩn bị trước segment kế tiếp (tách từ, aligner, thời điểm seek) ở thread nền trong lúc đang gõ"""
+
+    def __init__(self, table, evaluator, tail_ms=0, executor=None):
+        self.table = table
+        self.evaluator = evaluator
+        self.tail_ms = tail_ms
+        self.executor = executor
+        # position -> Future của PreparedSegment
+        self._prepared = {}
+
+    def build(self, position, fold):
+        """Dựng PreparedSegment; chạy ở thread nền nên không dùng cache của bảng hay evaluator"""
+        tokens = self.table.build_tokens(position)
+        start_ms, end_ms = self.table.playback_range(position, self.tail_ms)
+        return PreparedSegment(
+            position, tokens, start_ms, end_ms, fold, WordAligner(comparable_words(tokens, fold))
+        )
+
+    def prepare(self, position):
+        """Bắt đầu chuẩn bị segment tại position ở thread nền, bỏ qua nếu ngoài phạm vi hoặc đã chuẩn bị"""
+        try:
+            if not 0 <= position < len(self.table) or position in self._prepared:
+                return None
+            executor = self.executor or _shared_executor()
+            future = self._prepared[position] = executor.submit(self.build, position, self.evaluator.fold)
+            return future
+        except Exception as e:
+            logger.error(f"Error preparing segment: {str(e)}")
+            return None
+
+    def take(self, position):
+        """Lấy segment đã chuẩn bị (đợi nếu đang dựng dở), chưa bắt đầu thì dựng ngay trên thread hiện tại"""
+        future = self._prepared.pop(position, None)
+        self.clear()
+
+        prepared = None
+        if future is not None and not future.cancel():
+            try:
+                prepared = future.result()
+            except Exception as e:
+                logger.error(f"Error preparing segment: {str(e)}")
+
+        if prepared is None or prepared.fold != self.evaluator.fold:
+            tokens = self.table.tokens(position)
+            start_ms, end_ms = self.table.playback_range(position, self.tail_ms)
+            return PreparedSegment(position, tokens, start_ms, end_ms, self.evaluator.fold, None)
+
+        # Bàn giao kết quả cho thread gọi: tokens vào cache của bảng, aligner cho evaluator
+        self.table.remember_tokens(position, prepared.tokens)
+        self.evaluator.prepare(prepared.tokens, prepared.aligner)
+        return prepared
+
+    def clear(self):
+        """Bỏ các segment đã chuẩn bị (khi bảng segment hoặc timing thay đổi)"""
+        for future in self._prepared.values():
+            future.cancel()
+        self._prepared.clear()
@@ -2,6 +2,7 @@ from datetime import datetime
 import uuid
 import logging
 from .data_manager import DataManager
+from .validation_manager import ValidationManager
 from .error_handler import ErrorType, AppError
 from .cache_manager import CacheManager
 from pathlib import Path
@@ -9,8 +10,9 @@ from pathlib import Path
 logger = logging.getLogger(__name__)
 
 class SessionManager:
-    def __init__(self):
-        self.data_manager = DataManager()
+    def __init__(self, data_manager=None):
+        self.data_manager = data_manager or DataManager()
+        self.validation_manager = ValidationManager()
         self.current_session = None
         self.cache_manager = CacheManager()
         self.error_handler = None
@@ -46,16 +48,25 @@ class SessionManager:
     def load_session(self, session_id):
         """Load một phiên học cụ thể"""
         try:
-            data = self.data_manager.load_sessions()
-            for session in data["sessions"]:
-                if session["id"] == session_id:
-                    self.current_session = session
-                    return session
-            return None
+            session = self.data_manager.load_session(session_id)
+            if session:
+                # Chỉ cập nhật index, last_accessed được ghi cùng lần lưu tiếp theo của session
+                session["last_accessed"] = datetime.now().isoformat()
+                self.data_manager.sessions.put(session, dirty=False)
+                self.current_session = session
+            return session
             
         except Exception as e:
             logger.error(f"Error loading session: {str(e)}")
             return None
+
+    def find_sessions(self, video_path):
+        """Các phiên học của một video, mới truy cập nhất trước"""
+        return self.data_manager.find_sessions(video_path)
+
+    def recent_sessions(self, limit=10):
+        """Các phiên học truy cập gần nhất"""
+        return self.data_manager.sessions.recent(limit)
             
     def update_progress(self, segment_index, accuracy):
         """Cập nhật tiến độ của phiên hiện tại"""
@@ -81,12 +92,37 @@ class SessionManager:
             })
             
             # Lưu thay đổi
-            return self.data_manager.save_session(self.current_session)
+            return self.data_manager.save_segment(self.current_session, segment_index)
             
         except Exception as e:
             logger.error(f"Error updating progress: {str(e)}")
             return False 
 
+    def remap_segments(self, mapping):
+        """Chuyển dữ liệu từng segment sang số thứ tự mới sau khi file phụ đề thay đổi"""
+        if not self.current_session:
+            return False
+
+        try:
+            segments_data = {}
+            for segment_id, data in self.current_session["segments_data"].items():
+                position = int(segment_id) - 1
+                if 0 <= position < len(mapping) and mapping[position] >= 0:
+                    segments_data[str(mapping[position] + 1)] = data
+
+            progress = self.current_session["progress"]
+            current = progress.get("current_segment", 1) - 1
+            if 0 <= current < len(mapping) and mapping[current] >= 0:
+                progress["current_segment"] = mapping[current] + 1
+
+            self.current_session["segments_data"] = segments_data
+            progress["completed_segments"] = len([s for s in segments_data.values() if s.get("completed")])
+            return self.data_manager.replace_session(self.current_session)
+
+        except Exception as e:
+            logger.error(f"Error remapping segments: {str(e)}")
+            return False
+
     def add_segment_attempt(self, segment_index, attempt_data):
         """Thêm một lần thử mới cho segment"""
         try:
@@ -128,7 +164,7 @@ class SessionManager:
             total_time = sum(a["time_taken"] for a in segment["attempts"])
             segment["average_time"] = total_time / len(segment["attempts"])
             
-            if not self.save_sessions():
+            if not self.data_manager.save_segment(self.current_session, segment_index, attempt_data):
                 raise AppError(
                     ErrorType.SESSION_ERROR,
                     "Failed to save session data",
@@ -158,7 +194,7 @@ class SessionManager:
             
             # Tính toán thống kê mới
             stats = {
-                "total_segments": len(self.segments),
+                "total_segments": self.current_session["progress"].get("total_segments", 0),
                 "completed_segments": len([
                     s for s in self.current_session["segments_data"].values()
                     if s["completed"]
@@ -324,7 +360,7 @@ class SessionManager:
 
             # Cập nhật progress
             session["progress"].update({
-                "total_segments": len(self.segments),
+                "total_segments": session["progress"].get("total_segments", 0),
                 "completed_segments": completed_segments,
                 "current_segment": segment_index,
                 "accuracy": avg_accuracy,
@@ -335,8 +371,8 @@ class SessionManager:
                 )
             })
 
-            # Lưu session
-            return self.save_sessions()
+            # Lưu session (chỉ segment vừa cập nhật nếu dùng SQLite)
+            return self.data_manager.save_segment(session, segment_index)
 
         except Exception as e:
             logger.error(f"Error updating session progress: {str(e)}")
@@ -0,0 +1,107 @@
+from bisect import bisect_left, insort
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class SessionRepository:
+    """Giữ sessions trong bộ nhớ sau một lần load, tra cứu O(1) theo id/video, chỉ ghi các session đã sửa"""
+
+    def __init__(self, load, persist):
+        # load() -> list session; persist(changed, all_sessions) ghi xuống storage
+        self._load = load
+        self._persist = persist
+        self._sessions = None
+        self._by_video = {}
+        self._by_accessed = []
+        self._keys = {}
+        self._dirty = set()
+
+    def _ensure_loaded(self):
+        if self._sessions is None:
+            self.reload()
+
+    def reload(self):
+        """Bỏ dữ liệu trong bộ nhớ và load lại từ storage"""
+        self._sessions = {}
+        self._by_video = {}
+        self._by_accessed = []
+        self._keys = {}
+        self._dirty = set()
+        for session in self._load():
+            self._index(session)
+        return len(self._sessions)
+
+    def _index(self, session):
+        session_id = session["id"]
+        self._unindex(session_id)
+        self._sessions[session_id] = session
+        video_path = str(session.get("video_path"))
+        key = (session.get("last_accessed") or "", session_id)
+        self._by_video.setdefault(video_path, {})[session_id] = session
+        self._keys[session_id] = (video_path, key)
+        insort(self._by_accessed, key)
+
+    def _unindex(self, session_id):
+        indexed = self._keys.pop(session_id, None)
+        if indexed is None:
+            return
+        video_path, key = indexed
+        sessions = self._by_video.get(video_path, {})
+        sessions.pop(session_id, None)
+        if not sessions:
+            self._by_video.pop(video_path, None)
+        position = bisect_left(self._by_accessed, key)
+        if position < len(self._by_accessed) and self._by_accessed[position] == key:
+            del self._by_accessed[position]
+
+    def __len__(self):
+        self._ensure_loaded()
+        return len(self._sessions)
+
+    def get(self, session_id):
+        self._ensure_loaded()
+        return self._sessions.get(session_id)
+
+    def all(self):
+        self._ensure_loaded()
+        return list(self._sessions.values())
+
+    def find_by_video(self, video_path):
+        """Các session của một video, mới truy cập nhất trước"""
+        self._ensure_loaded()
+        sessions = self._by_video.get(str(video_path), {}).values()
+        return sorted(sessions, key=lambda s: s.get("last_accessed") or "", reverse=True)
+
+    def recent(self, limit=10):
+        """Các session truy cập gần nhất"""
+        self._ensure_loaded()
+        return [self._sessions[session_id] for _, session_id in reversed(self._by_accessed[-limit:])]
+
+    def put(self, session, dirty=True):
+        """Thêm hoặc cập nhật session (cập nhật lại index theo video và thời điểm truy cập)"""
+        self._ensure_loaded()
+        self._index(session)
+        if dirty:
+            self._dirty.add(session["id"])
+
+    def mark_dirty(self, session_id):
+        if session_id in self._sessions:
+            self._dirty.add(session_id)
+
+    def mark_clean(self, session_id):
+        """Bỏ đánh dấu sau khi storage đã ghi session trực tiếp (ghi nối attempt, ghi lại toàn bộ)"""
+        self._dirty.discard(session_id)
+
+    def is_dirty(self, session_id):
+        return session_id in self._dirty
+
+    def commit(self):
+        """Ghi các session đã thay đổi"""
+        if not self._dirty:
+            return True
+        changed = [self._sessions[session_id] for session_id in self._dirty if session_id in self._sessions]
+        if not self._persist(changed, self.all()):
+            return False
+        self._dirty.clear()
+        return True
@@ -0,0 +1,367 @@
+from pathlib import Path
+import json
+import logging
+import sqlite3
+import threading
+
+from .attempt_log import AttemptLog
+
+logger = logging.getLogger(__name__)
+
+SCHEMA_VERSION = 1
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS sessions (
+    id TEXT PRIMARY KEY,
+    name TEXT,
+    video_path TEXT,
+    subtitle_path TEXT,
+    created_date TEXT,
+    last_accessed TEXT,
+    progress TEXT,
+    extra TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_sessions_video ON sessions (video_path);
+CREATE INDEX IF NOT EXISTS idx_sessions_accessed ON sessions (last_accessed);
+CREATE TABLE IF NOT EXISTS segments (
+    session_id TEXT NOT NULL,
+    segment_id INTEGER NOT NULL,
+    best_accuracy REAL,
+    completed INTEGER,
+    data TEXT,
+    PRIMARY KEY (session_id, segment_id)
+);
+CREATE TABLE IF NOT EXISTS attempts (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    session_id TEXT NOT NULL,
+    segment_id INTEGER NOT NULL,
+    timestamp TEXT,
+    accuracy REAL,
+    typing_speed REAL,
+    time_taken REAL,
+    data TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_attempts_segment ON attempts (session_id, segment_id);
+CREATE INDEX IF NOT EXISTS idx_attempts_timestamp ON attempts (timestamp);
+CREATE TABLE IF NOT EXISTS daily_stats (
+    date TEXT PRIMARY KEY,
+    attempt_count INTEGER,
+    total_time REAL,
+    average_accuracy REAL,
+    average_speed REAL,
+    segments_completed INTEGER
+);
+CREATE TABLE IF NOT EXISTS documents (
+    name TEXT PRIMARY KEY,
+    data TEXT
+);
+"""
+
+# Câu lệnh cố định để sqlite3 dùng lại statement đã compile trong cache của connection
+_UPSERT_SESSION = """
+INSERT INTO sessions (id, name, video_path, subtitle_path, created_date, last_accessed, progress, extra)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT(id) DO UPDATE SET
+    name = excluded.name, video_path = excluded.video_path, subtitle_path = excluded.subtitle_path,
+    created_date = excluded.created_date, last_accessed = excluded.last_accessed,
+    progress = excluded.progress, extra = excluded.extra
+"""
+_UPSERT_SEGMENT = """
+INSERT INTO segments (session_id, segment_id, best_accuracy, completed, data)
+VALUES (?, ?, ?, ?, ?)
+ON CONFLICT(session_id, segment_id) DO UPDATE SET
+    best_accuracy = excluded.best_accuracy, completed = excluded.completed, data = excluded.data
+"""
+_INSERT_ATTEMPT = """
+INSERT INTO attempts (session_id, segment_id, timestamp, accuracy, typing_speed, time_taken, data)
+VALUES (?, ?, ?, ?, ?, ?, ?)
+"""
+_UPSERT_DAILY = """
+INSERT INTO daily_stats (date, attempt_count, total_time, average_accuracy, average_speed, segments_completed)
+VALUES (?, ?, ?, ?, ?, ?)
+ON CONFLICT(date) DO UPDATE SET
+    attempt_count = excluded.attempt_count, total_time = excluded.total_time,
+    average_accuracy = excluded.average_accuracy, average_speed = excluded.average_speed,
+    segments_completed = excluded.segments_completed
+"""
+_UPSERT_DOCUMENT = """
+INSERT INTO documents (name, data) VALUES (?, ?)
+ON CONFLICT(name) DO UPDATE SET data = excluded.data
+"""
+
+# Các cột riêng của bảng sessions, phần còn lại của dict lưu vào cột extra
+_SESSION_COLUMNS = ("id", "name", "video_path", "subtitle_path", "created_date", "last_accessed")
+
+
+def _dumps(value):
+    return json.dumps(value, ensure_ascii=False)
+
+
+class SQLiteStorage:
+    """Lưu sessions, attempts, thống kê ngày và tiến trình trong một database SQLite (WAL)"""
+
+    # Lưu cả thống kê ngày và tài liệu tiến trình, không chỉ sessions
+    stores_documents = True
+
+    def __init__(self, db_file=None):
+        self.db_file = Path(db_file or "data/practice.db")
+        self.db_file.parent.mkdir(parents=True, exist_ok=True)
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(str(self.db_file), check_same_thread=False)
+        self.connection.row_factory = sqlite3.Row
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        # WAL + NORMAL: commit không fsync mỗi lần, vẫn không hỏng database khi app crash
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        with self.connection:
+            self.connection.executescript(_SCHEMA)
+            self.connection.execute(
+                "INSERT OR IGNORE INTO meta (key, value) VALUES ('schema_version', ?)",
+                (str(SCHEMA_VERSION),)
+            )
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
+
+    def get_meta(self, key, default=None):
+        with self.lock:
+            row = self.connection.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row["value"] if row else default
+
+    def set_meta(self, key, value):
+        with self.lock, self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, str(value))
+            )
+
+    # Sessions
+
+    def _write_session_row(self, session):
+        extra = {key: value for key, value in session.items()
+                 if key not in _SESSION_COLUMNS and key not in ("progress", "segments_data")}
+        self.connection.execute(_UPSERT_SESSION, (
+            *(session.get(column) for column in _SESSION_COLUMNS),
+            _dumps(session.get("progress", {})),
+            _dumps(extra)
+        ))
+
+    def _write_segment_row(self, session_id, segment_id, segment):
+        # Danh sách attempts nằm ở bảng attempts, không lưu lặp trong data
+        data = {key: value for key, value in segment.items()
+                if not (key == "attempts" and isinstance(value, list))}
+        self.connection.execute(_UPSERT_SEGMENT, (
+            session_id, int(segment_id), segment.get("best_accuracy", segment.get("accuracy")),
+            int(bool(segment.get("completed"))), _dumps(data)
+        ))
+
+    def _write_attempt_row(self, session_id, segment_id, attempt):
+        self.connection.execute(_INSERT_ATTEMPT, (
+            session_id, int(segment_id), attempt.get("timestamp"), attempt.get("accuracy"),
+            attempt.get("typing_speed"), attempt.get("time_taken"), _dumps(attempt)
+        ))
+
+    def _write_full_session(self, session):
+        # Gọi khi đang giữ lock và trong transaction
+        session_id = session["id"]
+        self._write_session_row(session)
+        self.connection.execute("DELETE FROM segments WHERE session_id = ?", (session_id,))
+        self.connection.execute("DELETE FROM attempts WHERE session_id = ?", (session_id,))
+        for segment_id, segment in session.get("segments_data", {}).items():
+            self._write_segment_row(session_id, segment_id, segment)
+            attempts = segment.get("attempts")
+            if isinstance(attempts, list):
+                for attempt in attempts:
+                    self._write_attempt_row(session_id, segment_id, attempt)
+
+    def save_session(self, session):
+        """Ghi thông tin và tiến độ của session; segment và attempt ghi qua save_segment"""
+        with self.lock, self.connection:
+            self._write_session_row(session)
+        return True
+
+    def replace_session(self, session):
+        """Ghi lại toàn bộ session kể cả lịch sử attempt (sau khi remap segment)"""
+        with self.lock, self.connection:
+            self._write_full_session(session)
+        return True
+
+    def save_segment(self, session, segment_id, attempt=None):
+        """Ghi một segment, nối attempt mới (nếu có) và tiến độ của session trong một transaction"""
+        with self.lock, self.connection:
+            self._write_session_row(session)
+            self._write_segment_row(session["id"], segment_id, session["segments_data"][str(segment_id)])
+            if attempt is not None:
+                self._write_attempt_row(session["id"], segment_id, attempt)
+        return True
+
+    def _session_from_row(self, row, with_segments=True):
+        session = json.loads(row["extra"] or "{}")
+        for column in _SESSION_COLUMNS:
+            session[column] = row[column]
+        session["progress"] = json.loads(row["progress"] or "{}")
+        session["segments_data"] = self._load_segments(row["id"]) if with_segments else {}
+        return session
+
+    def _load_segments(self, session_id):
+        segments = {}
+        for row in self.connection.execute(
+            "SELECT segment_id, data FROM segments WHERE session_id = ? ORDER BY segment_id",
+            (session_id,)
+        ):
+            segments[str(row["segment_id"])] = json.loads(row["data"])
+
+        for row in self.connection.execute(
+            "SELECT segment_id, data FROM attempts WHERE session_id = ? ORDER BY id", (session_id,)
+        ):
+            segment = segments.setdefault(str(row["segment_id"]), {})
+            if not isinstance(segment.get("attempts"), list):
+                segment["attempts"] = []
+            segment["attempts"].append(json.loads(row["data"]))
+
+        for segment in segments.values():
+            segment.setdefault("attempts", [])
+        return segments
+
+    def load_session(self, session_id):
+        with self.lock:
+            row = self.connection.execute("SELECT * FROM sessions WHERE id = ?", (session_id,)).fetchone()
+            return self._session_from_row(row) if row else None
+
+    def load_sessions(self):
+        with self.lock:
+            rows = self.connection.execute("SELECT * FROM sessions ORDER BY rowid").fetchall()
+            return {"sessions": [self._session_from_row(row) for row in rows]}
+
+    def find_sessions(self, video_path):
+        """Các session của một video, mới truy cập nhất trước"""
+        with self.lock:
+            rows = self.connection.execute(
+                "SELECT * FROM sessions WHERE video_path = ? ORDER BY last_accessed DESC", (str(video_path),)
+            ).fetchall()
+            return [self._session_from_row(row) for row in rows]
+
+    def replace_sessions(self, sessions):
+        """Thay toàn bộ sessions (khôi phục từ backup)"""
+        # Một transaction: lỗi giữa chừng thì giữ nguyên dữ liệu cũ
+        with self.lock, self.connection:
+            for table in ("sessions", "segments", "attempts"):
+                self.connection.execute(f"DELETE FROM {table}")
+            for session in sessions:
+                self._write_full_session(session)
+        return True
+
+    # Thống kê ngày
+
+    def _write_daily(self, date, daily):
+        self.connection.execute(_UPSERT_DAILY, (
+            date, daily.get("attempt_count", 0), daily.get("total_time", 0),
+            daily.get("average_accuracy", 0), daily.get("average_speed", 0),
+            daily.get("segments_completed", 0)
+        ))
+
+    def save_daily(self, date, daily):
+        """Ghi bản tổng hợp thống kê của một ngày"""
+        with self.lock, self.connection:
+            self._write_daily(date, daily)
+        return True
+
+    def load_daily(self):
+        daily_stats = {}
+        with self.lock:
+            rows = self.connection.execute("SELECT * FROM daily_stats ORDER BY date").fetchall()
+        for row in rows:
+            daily_stats[row["date"]] = {
+                "sessions": {},
+                "attempt_count": row["attempt_count"],
+                "total_time": row["total_time"],
+                "average_accuracy": row["average_accuracy"],
+                "average_speed": row["average_speed"],
+                "segments_completed": row["segments_completed"]
+            }
+        return daily_stats
+
+    # Tài liệu JSON nhỏ (progress)
+
+    def get_document(self, name, default=None):
+        with self.lock:
+            row = self.connection.execute("SELECT data FROM documents WHERE name = ?", (name,)).fetchone()
+        return json.loads(row["data"]) if row else default
+
+    def put_document(self, name, data):
+        with self.lock, self.connection:
+            self.connection.execute(_UPSERT_DOCUMENT, (name, _dumps(data)))
+        return True
+
+    def _import_sessions(self, data):
+        for session in data.get("sessions", []):
+            self._write_full_session(session)
+
+    def _import_statistics(self, data):
+        for date, daily in data.get("daily_stats", {}).items():
+            daily = dict(daily)
+            daily.setdefault("attempt_count", sum(
+                len(attempts) for attempts in daily.get("sessions", {}).values()
+            ))
+            self._write_daily(date, daily)
+
+    def _import_progress(self, data):
+        self.connection.execute(_UPSERT_DOCUMENT, ("progress", _dumps(data)))
+
+    def import_json(self, data_dir=None):
+        """Chuyển dữ liệu JSON cũ sang database ở lần mở đầu tiên, mỗi file một transaction kèm cờ riêng"""
+        if self.get_meta("json_imported"):
+            return False
+
+        data_dir = Path(data_dir or "data")
+        imported = False
+        for name, importer in (("sessions", self._import_sessions),
+                               ("statistics", self._import_statistics),
+                               ("progress", self._import_progress)):
+            flag = f"json_imported_{name}"
+            if self.get_meta(flag):
+                continue
+
+            json_file = data_dir / f"{name}.json"
+            data = None
+            if json_file.exists():
+                try:
+                    with open(json_file, 'r', encoding='utf-8') as f:
+                        data = json.load(f)
+                except (OSError, ValueError) as e:
+                    # Không import lại ở lần sau: dữ liệu mới trong database sẽ bị ghi đè bằng dữ liệu cũ
+                    logger.error(f"Skipping unreadable {json_file} during import: {str(e)}")
+
+            try:
+                # Dữ liệu và cờ đã import được commit cùng nhau
+                with self.lock, self.connection:
+                    if data is not None:
+                        importer(data)
+                        imported = True
+                    self.connection.execute(
+                        "INSERT OR REPLACE INTO meta (key, value) VALUES (?, '1')", (flag,)
+                    )
+            except Exception as e:
+                logger.error(f"Error importing {json_file}: {str(e)}")
+                return False
+
+        self.set_meta("json_imported", 1)
+        if imported:
+            logger.info(f"Imported JSON data into {self.db_file}")
+        return imported
+
+
+def create_storage(backend, db_file=None):
+    """Tạo storage theo cấu hình: "sqlite", "log" (AttemptLog) hoặc "json" (None, dùng file JSON như cũ)"""
+    if backend not in ("sqlite", "log"):
+        return None
+    try:
+        storage = SQLiteStorage(db_file) if backend == "sqlite" else AttemptLog()
+        storage.import_json()
+        return storage
+    except Exception as e:
+        logger.error(f"Error opening {backend} storage, falling back to JSON: {str(e)}")
+        return None
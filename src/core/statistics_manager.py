@@ -3,11 +3,19 @@ import json
 from pathlib import Path
 import logging
 
+from .validation_manager import ValidationManager
+from .atomic_io import write_json
+
 logger = logging.getLogger(__name__)
 
 class StatisticsManager:
-    def __init__(self, data_manager):
+    def __init__(self, data_manager, writer=None):
         self.data_manager = data_manager
+        # PersistenceWorker để ghi ở thread nền, None thì ghi ngay như cũ
+        self.writer = writer
+        storage = getattr(data_manager, "storage", None)
+        self.storage = storage if getattr(storage, "stores_documents", False) else None
+        self.validation_manager = ValidationManager()
         self.stats_file = Path("data/statistics.json")
         self.daily_stats = {}
         self.load_statistics()  # Load sẵn thống kê khi khởi tạo
@@ -15,7 +23,9 @@ class StatisticsManager:
     def load_statistics(self):
         """Load dữ liệu thống kê"""
         try:
-            if not self.stats_file.exists():
+            if self.storage is not None:
+                self.daily_stats = self.storage.load_daily()
+            elif not self.stats_file.exists():
                 self.create_default_stats()
             else:
                 with open(self.stats_file, 'r', encoding='utf-8') as f:
@@ -34,32 +44,59 @@ class StatisticsManager:
             "total_segments_completed": 0,
             "achievements": []
         }
-        with open(self.stats_file, 'w', encoding='utf-8') as f:
-            json.dump(default_stats, f, indent=4)
+        write_json(self.stats_file, default_stats)
         self.daily_stats = {}
 
-    def save_statistics(self):
-        """Lưu dữ liệu thống kê"""
+    def save_statistics(self, date=None):
+        """Lưu dữ liệu thống kê (SQLite chỉ ghi dòng tổng hợp của ngày date)"""
         try:
+            if self.storage is None:
+                # File JSON luôn phải ghi lại đủ mọi ngày
+                date = None
+            days = [date] if date else list(self.daily_stats)
+
+            # Chụp lại dữ liệu hiện tại, thread ghi không đọc dict đang bị sửa
+            daily_stats = {}
+            for day in days:
+                daily = dict(self.daily_stats[day])
+                daily["sessions"] = {} if self.storage is not None else {
+                    session_id: list(attempts) for session_id, attempts in daily["sessions"].items()
+                }
+                daily_stats[day] = daily
+
+            if self.writer is not None:
+                return self.writer.submit(("statistics", date), self.write_statistics, daily_stats)
+            return self.write_statistics(daily_stats)
+
+        except Exception as e:
+            logger.error(f"Error saving statistics: {str(e)}")
+            return False
+
+    def write_statistics(self, daily_stats):
+        """Ghi bản chụp thống kê xuống đĩa"""
+        try:
+            if self.storage is not None:
+                for day, daily in daily_stats.items():
+                    self.storage.save_daily(day, daily)
+                return True
+
             stats = {
-                "daily_stats": self.daily_stats,
+                "daily_stats": daily_stats,
                 "total_practice_time": sum(
                     day["total_time"] 
-                    for day in self.daily_stats.values()
+                    for day in daily_stats.values()
                 ),
                 "total_segments_completed": sum(
                     day["segments_completed"] 
-                    for day in self.daily_stats.values()
+                    for day in daily_stats.values()
                 ),
                 "achievements": []  # Sẽ cập nhật sau
             }
             
-            with open(self.stats_file, 'w', encoding='utf-8') as f:
-                json.dump(stats, f, indent=4, ensure_ascii=False)
-            return True
+            return write_json(self.stats_file, stats)
             
         except Exception as e:
-            logger.error(f"Error saving statistics: {str(e)}")
+            logger.error(f"Error writing statistics: {str(e)}")
             return False
 
     def update_daily_stats(self, session_id, stats):
@@ -74,40 +111,31 @@ class StatisticsManager:
             if today not in self.daily_stats:
                 self.daily_stats[today] = {
                     "sessions": {},
+                    "attempt_count": 0,
                     "total_time": 0,
                     "average_accuracy": 0,
                     "average_speed": 0,
                     "segments_completed": 0
                 }
+            daily = self.daily_stats[today]
+            if "attempt_count" not in daily:
+                # Dữ liệu cũ chưa có số attempt
+                daily["attempt_count"] = sum(len(attempts) for attempts in daily["sessions"].values())
                 
             # Cập nhật thống kê cho session
-            if session_id not in self.daily_stats[today]["sessions"]:
-                self.daily_stats[today]["sessions"][session_id] = []
-                
-            self.daily_stats[today]["sessions"][session_id].append(stats)
-            
-            # Tính toán thống kê tổng hợp
-            all_attempts = [
-                attempt
-                for session_stats in self.daily_stats[today]["sessions"].values()
-                for attempt in session_stats
-            ]
+            daily["sessions"].setdefault(session_id, []).append(stats)
             
-            total_attempts = len(all_attempts)
-            if total_attempts > 0:
-                self.daily_stats[today].update({
-                    "total_time": sum(a["time_taken"] for a in all_attempts),
-                    "average_accuracy": sum(a["accuracy"] for a in all_attempts) / total_attempts,
-                    "average_speed": sum(a["typing_speed"] for a in all_attempts) / total_attempts,
-                    "segments_completed": len(set(
-                        session_id + "_" + str(i)
-                        for session_id, attempts in self.daily_stats[today]["sessions"].items()
-                        for i, attempt in enumerate(attempts)
-                        if attempt["accuracy"] >= 95
-                    ))
-                })
+            # Cập nhật tổng hợp theo trung bình cộng dồn, không duyệt lại các attempt cũ
+            count = daily["attempt_count"] + 1
+            daily.update({
+                "attempt_count": count,
+                "total_time": daily["total_time"] + stats["time_taken"],
+                "average_accuracy": daily["average_accuracy"] + (stats["accuracy"] - daily["average_accuracy"]) / count,
+                "average_speed": daily["average_speed"] + (stats["typing_speed"] - daily["average_speed"]) / count,
+                "segments_completed": daily["segments_completed"] + (1 if stats["accuracy"] >= 95 else 0)
+            })
             
-            return self.save_statistics()
+            return self.save_statistics(today)
             
         except Exception as e:
             logger.error(f"Error updating daily stats: {str(e)}")
@@ -0,0 +1,98 @@
+from array import array
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Khoảng cách tối đa (ms) để ghép cue không giao nhau với cue gần nhất
+DEFAULT_MAX_GAP_MS = 500
+
+
+def _start_order(table):
+    """Thứ tự các cue theo start time"""
+    starts = table.starts
+    if all(starts[i] <= starts[i + 1] for i in range(len(table) - 1)):
+        return range(len(table))
+    return sorted(range(len(table)), key=starts.__getitem__)
+
+
+def align_tables(target, native, max_gap_ms=DEFAULT_MAX_GAP_MS):
+    """Ghép mỗi cue của track đích với cue của track tiếng mẹ đẻ giao nhau nhiều nhất"""
+    # pairing[i] = vị trí cue native ghép với cue target i, -1 nếu không có
+    pairing = array('i', [-1] * len(target))
+    native_order = _start_order(native)
+    native_count = len(native_order)
+    first = 0
+
+    for pos in _start_order(target):
+        start_ms = target.starts[pos]
+        end_ms = target.ends[pos]
+
+        # Cue native kết thúc trước cue target này thì cũng kết thúc trước các cue sau
+        while first < native_count and native.ends[native_order[first]] + max_gap_ms <= start_ms:
+            first += 1
+
+        best = -1
+        best_score = None
+        k = first
+        while k < native_count:
+            candidate = native_order[k]
+            candidate_start = native.starts[candidate]
+            if candidate_start >= end_ms + max_gap_ms:
+                break
+            candidate_end = native.ends[candidate]
+            overlap = min(end_ms, candidate_end) - max(start_ms, candidate_start)
+            # Ưu tiên độ giao nhau, nếu không giao thì lấy cue gần nhất
+            score = overlap if overlap > 0 else -max(candidate_start - end_ms, start_ms - candidate_end)
+            if best_score is None or score > best_score:
+                best = candidate
+                best_score = score
+            k += 1
+
+        if best >= 0 and best_score > -max_gap_ms:
+            # Nhiều cue target có thể cùng ghép với một cue native (câu bị tách)
+            pairing[pos] = best
+
+    return pairing
+
+
+class AlignmentIndex:
+    """Bảng ghép cue giữa track đang học và track tiếng mẹ đẻ, tra cứu O(1) theo vị trí cue"""
+
+    def __init__(self, native, pairing):
+        self.native = native
+        self.pairing = pairing
+
+    @classmethod
+    def build(cls, target, native, max_gap_ms=DEFAULT_MAX_GAP_MS):
+        return cls(native, align_tables(target, native, max_gap_ms))
+
+    def __len__(self):
+        return len(self.pairing)
+
+    def paired_position(self, pos):
+        """Vị trí cue native ghép với cue target tại pos, -1 nếu không có"""
+        if not 0 <= pos < len(self.pairing):
+            return -1
+        return self.pairing[pos]
+
+    def paired_text(self, pos):
+        """Text (đã làm sạch) của cue native ghép với cue target tại pos"""
+        native_pos = self.paired_position(pos)
+        if native_pos < 0:
+            return ""
+        return self.native.practice_text(native_pos)
+
+
+def load_alignment(cache, target_file, native_file, target, native):
+    """Lấy bảng ghép từ cache cạnh các bảng segment, tính lại nếu một trong hai file đã thay đổi"""
+    try:
+        key = f"{cache.key_for(target_file)}_{cache.key_for(native_file)}"
+        pairing = cache.get_alignment(key)
+        if pairing is None or len(pairing) != len(target):
+            pairing = align_tables(target, native)
+            cache.put_alignment(key, pairing)
+        return AlignmentIndex(native, pairing)
+
+    except Exception as e:
+        logger.error(f"Error loading subtitle alignment: {str(e)}")
+        return AlignmentIndex.build(target, native)
@@ -0,0 +1,227 @@
+from array import array
+from pathlib import Path
+import hashlib
+import logging
+import mmap
+import os
+import struct
+import sys
+
+from .subtitles import SegmentTable
+
+logger = logging.getLogger(__name__)
+
+CACHE_MAGIC = b"DSUB"
+CACHE_VERSION = 4
+
+# Số byte đầu/cuối file dùng để tính content hash, giữ cho fingerprint O(1)
+FINGERPRINT_SAMPLE_SIZE = 64 * 1024
+
+_HEADER = struct.Struct("<4sHBxII")        # magic, version, byteorder, count, số section
+_SECTION = struct.Struct("<16sBxxxQQ")     # tên, kiểu, offset, độ dài
+# Các loại entry trong thư mục cache: bảng segment, bảng ghép track, mốc giọng nói
+CACHE_SUFFIXES = (".seg", ".aln", ".vad")
+
+_KIND_INT32 = 0
+_KIND_BYTES = 1
+_BYTEORDER = 0 if sys.byteorder == "little" else 1
+
+
+def file_fingerprint(file_path):
+    """Tính fingerprint của file từ path, size, mtime và hash nội dung đầu/cuối file"""
+    path = Path(file_path).resolve()
+    stat = path.stat()
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(str(path).encode('utf-8'))
+    digest.update(struct.pack("<QQ", stat.st_size, stat.st_mtime_ns))
+    with open(path, 'rb') as f:
+        digest.update(f.read(FINGERPRINT_SAMPLE_SIZE))
+        if stat.st_size > FINGERPRINT_SAMPLE_SIZE * 2:
+            f.seek(-FINGERPRINT_SAMPLE_SIZE, os.SEEK_END)
+            digest.update(f.read(FINGERPRINT_SAMPLE_SIZE))
+    return digest.hexdigest()
+
+
+def _align(offset, alignment=8):
+    return (offset + alignment - 1) // alignment * alignment
+
+
+def write_columns(path, count, int_columns, byte_columns):
+    """Ghi các cột int32 và bytes ra file nhị phân có thể memory-map"""
+    sections = []
+    for name, column in int_columns.items():
+        data = column if isinstance(column, array) else array('i', column)
+        sections.append((name, _KIND_INT32, data.tobytes()))
+    for name, data in byte_columns.items():
+        sections.append((name, _KIND_BYTES, bytes(data)))
+
+    offset = _align(_HEADER.size + _SECTION.size * len(sections))
+    descriptors = []
+    for name, kind, data in sections:
+        descriptors.append(_SECTION.pack(name.encode('ascii'), kind, offset, len(data)))
+        offset = _align(offset + len(data))
+
+    path = Path(path)
+    temp_path = path.with_suffix(path.suffix + ".tmp")
+    with open(temp_path, 'wb') as f:
+        f.write(_HEADER.pack(CACHE_MAGIC, CACHE_VERSION, _BYTEORDER, count, len(sections)))
+        for descriptor in descriptors:
+            f.write(descriptor)
+        for name, kind, data in sections:
+            f.seek(_align(f.tell()))
+            f.write(data)
+    os.replace(temp_path, path)
+
+
+def read_columns(path):
+    """Đọc file cache qua mmap, trả về (count, int_columns, byte_columns) hoặc None nếu không hợp lệ"""
+    with open(path, 'rb') as f:
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    # Chép các cột ra array/bytes rồi đóng map ngay, không giữ file bị map sau khi đọc
+    with mapped, memoryview(mapped) as view:
+        magic, version, byteorder, count, section_count = _HEADER.unpack_from(view, 0)
+        if magic != CACHE_MAGIC or version != CACHE_VERSION or byteorder != _BYTEORDER:
+            return None
+
+        int_columns = {}
+        byte_columns = {}
+        for i in range(section_count):
+            raw_name, kind, offset, length = _SECTION.unpack_from(view, _HEADER.size + i * _SECTION.size)
+            name = raw_name.rstrip(b"\0").decode('ascii')
+            if kind == _KIND_INT32:
+                column = int_columns[name] = array('i')
+                column.frombytes(view[offset:offset + length])
+            else:
+                byte_columns[name] = bytes(view[offset:offset + length])
+        return count, int_columns, byte_columns
+
+
+class SubtitleCache:
+    """Cache trên đĩa cho SegmentTable đã parse, key theo fingerprint của file phụ đề"""
+
+    def __init__(self, cache_dir=None, max_size_mb=64):
+        # Thư mục lấy từ cache_settings, chỉ được tạo ở lần ghi đầu tiên
+        self.cache_dir = Path(cache_dir or "data/cache/subtitles")
+        self.max_size = int(max_size_mb * 1024 * 1024)
+
+    def entry_path(self, key):
+        return self.cache_dir / f"{key}.seg"
+
+    def get(self, key):
+        """Lấy SegmentTable từ cache, trả về None nếu chưa có"""
+        try:
+            path = self.entry_path(key)
+            if not path.exists():
+                return None
+
+            columns = read_columns(path)
+            if columns is None:
+                return None
+
+            # Cập nhật mtime để đánh dấu entry vừa được dùng (LRU)
+            os.utime(path)
+            count, int_columns, byte_columns = columns
+            return SegmentTable.from_columns(int_columns, byte_columns)
+
+        except Exception as e:
+            logger.error(f"Error reading subtitle cache: {str(e)}")
+            return None
+
+    def put(self, key, table):
+        """Lưu SegmentTable vào cache"""
+        try:
+            int_columns, byte_columns = table.to_columns()
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            write_columns(self.entry_path(key), len(table), int_columns, byte_columns)
+            self.evict()
+            return True
+        except Exception as e:
+            logger.error(f"Error writing subtitle cache: {str(e)}")
+            return False
+
+    def arrays_path(self, key, kind):
+        return self.cache_dir / f"{key}.{kind}"
+
+    def get_arrays(self, key, kind):
+        """Lấy các cột int32 phụ trợ (vd bảng ghép, mốc giọng nói) từ cache, trả về None nếu chưa có"""
+        try:
+            path = self.arrays_path(key, kind)
+            if not path.exists():
+                return None
+
+            columns = read_columns(path)
+            if columns is None:
+                return None
+
+            os.utime(path)
+            return columns[1]
+
+        except Exception as e:
+            logger.error(f"Error reading {kind} cache: {str(e)}")
+            return None
+
+    def put_arrays(self, key, kind, columns, count=0):
+        """Lưu các cột int32 phụ trợ vào cache"""
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            write_columns(self.arrays_path(key, kind), count, columns, {})
+            self.evict()
+            return True
+        except Exception as e:
+            logger.error(f"Error writing {kind} cache: {str(e)}")
+            return False
+
+    def get_alignment(self, key):
+        """Lấy bảng ghép cue giữa hai track từ cache, trả về None nếu chưa có"""
+        columns = self.get_arrays(key, "aln")
+        return columns["pairing"] if columns else None
+
+    def put_alignment(self, key, pairing):
+        """Lưu bảng ghép cue giữa hai track vào cache"""
+        return self.put_arrays(key, "aln", {"pairing": pairing}, len(pairing))
+
+    def key_for(self, subtitle_file, variant=""):
+        """Key cache của file phụ đề"""
+        # variant phân biệt các cách xử lý khác nhau của cùng một file (vd cấu hình cleanup)
+        key = file_fingerprint(subtitle_file)
+        if variant:
+            key = f"{key}_{variant}"
+        return key
+
+    def load(self, subtitle_file, parser, variant=""):
+        """Lấy bảng segment từ cache, parse lại bằng parser nếu file đã thay đổi"""
+        key = self.key_for(subtitle_file, variant)
+        table = self.get(key)
+        if table is not None:
+            logger.info(f"Loaded subtitles from cache: {subtitle_file}")
+            return table
+
+        table = parser(subtitle_file)
+        if table:
+            self.put(key, table)
+        return table
+
+    def evict(self):
+        """Xóa các entry ít được dùng nhất cho tới khi tổng dung lượng <= max_size"""
+        try:
+            entries = []
+            for path in self.cache_dir.glob("*.*"):
+                if path.suffix not in CACHE_SUFFIXES:
+                    continue
+                stat = path.stat()
+                entries.append((stat.st_mtime, stat.st_size, path))
+
+            total_size = sum(size for _, size, _ in entries)
+            for _, size, path in sorted(entries):
+                if total_size <= self.max_size:
+                    break
+                try:
+                    path.unlink()
+                    total_size -= size
+                except OSError as e:
+                    # Entry đang được chương trình khác mở (Windows) thì bỏ qua
+                    logger.warning(f"Could not evict cache entry {path}: {str(e)}")
+
+        except Exception as e:
+            logger.error(f"Error evicting subtitle cache: {str(e)}")
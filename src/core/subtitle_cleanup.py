@@ -0,0 +1,92 @@
+import hashlib
+import json
+import logging
+import re
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CLEANUP_SETTINGS = {
+    "strip_tags": True,               # <i>, <font ...>, {\an8}
+    "strip_sound_effects": True,      # [MUSIC], (LAUGHS), ♪
+    "strip_speaker_labels": True,     # >> ANNA:, >>
+    # Tên viết hoa không có >> (JOHN: ...) chỉ là phỏng đoán, có thể bỏ nhầm lời thoại như "NO: I said no"
+    "strip_bare_speaker_labels": True,
+    "strip_dialogue_dashes": True     # "- " ở đầu dòng hội thoại
+}
+
+# Rule chỉ chạy khi rule cha cũng được bật
+_REQUIRES = {"strip_bare_speaker_labels": "strip_speaker_labels"}
+
+# Tên người nói: ít nhất hai ký tự viết hoa, theo sau là lời thoại trên cùng dòng
+_SPEAKER_LABEL = r'[A-Z][A-Z0-9 .\'\-]{0,29}[A-Z0-9]:[ \t]+(?=[^\s\x00])'
+
+# Ký tự nối các cue khi xử lý cả bảng cùng lúc (không phải khoảng trắng, không có trong phụ đề)
+CUE_SEPARATOR = '\x00'
+
+# Đầu dòng: đầu chuỗi, sau xuống dòng hoặc sau ký tự nối cue
+_LINE_START = r'(?:^|(?<=[\n\x00]))[ \t]*'
+
+_RULES = {
+    "strip_tags": [
+        re.compile(r'<[^<>\n\x00]*>'),
+        re.compile(r'\{[^{}\n\x00]*\}'),
+    ],
+    "strip_sound_effects": [
+        re.compile(r'\[[^\[\]\n\x00]*\]'),
+        # Chỉ bỏ ngoặc tròn viết hoa kiểu SDH, giữ lại lời thoại trong ngoặc
+        re.compile(r'\((?=[^()\n\x00]*[A-Z])[^a-z()\n\x00]*\)'),
+        re.compile(r'[♪♫]+'),
+    ],
+    # Gạch đầu dòng phải bỏ trước để "- JOHN: ..." vẫn nhận ra tên người nói
+    "strip_dialogue_dashes": [
+        re.compile(_LINE_START + r'[-‐–—][ \t]*(?=\D)'),
+    ],
+    "strip_speaker_labels": [
+        re.compile(_LINE_START + r'>>[ \t]*' + _SPEAKER_LABEL),
+        re.compile(_LINE_START + r'>>[ \t]*'),
+    ],
+    "strip_bare_speaker_labels": [
+        re.compile(_LINE_START + _SPEAKER_LABEL),
+    ],
+}
+
+_EXTRA_SPACES = re.compile(r'[ \t]{2,}')
+_LINE_EDGES = re.compile(r'[ \t]*\n[ \t]*')
+_EMPTY_LINES = re.compile(r'\n{2,}')
+
+
+class SubtitleCleaner:
+    """Tạo practice text cho từng cue: bỏ markup, SDH, tên người nói và gạch đầu dòng"""
+
+    def __init__(self, settings=None):
+        self.settings = dict(DEFAULT_CLEANUP_SETTINGS)
+        if settings:
+            self.settings.update(settings)
+
+    def signature(self):
+        """Chuỗi đại diện cho cấu hình, dùng làm một phần của key cache"""
+        data = json.dumps(self.settings, sort_keys=True).encode('utf-8')
+        return hashlib.blake2b(data, digest_size=8).hexdigest()
+
+    def clean_all(self, texts):
+        """Làm sạch toàn bộ cue, mỗi regex chỉ chạy một lần trên cả bảng"""
+        try:
+            joined = CUE_SEPARATOR.join(texts)
+            for name, patterns in _RULES.items():
+                if not self.settings.get(name) or not self.settings.get(_REQUIRES.get(name, name)):
+                    continue
+                for pattern in patterns:
+                    joined = pattern.sub('', joined)
+
+            joined = _EXTRA_SPACES.sub(' ', joined)
+            joined = _LINE_EDGES.sub('\n', joined)
+            joined = _EMPTY_LINES.sub('\n', joined)
+            return [text.strip(' \t\n') for text in joined.split(CUE_SEPARATOR)]
+
+        except Exception as e:
+            logger.error(f"Error cleaning subtitles: {str(e)}")
+            return list(texts)
+
+    def clean(self, text):
+        """Làm sạch một cue"""
+        return self.clean_all([text])[0]
@@ -0,0 +1,131 @@
+import json
+import logging
+import subprocess
+import threading
+from pathlib import Path
+from PyQt5.QtCore import QObject, pyqtSignal
+
+from .subtitle_cache import file_fingerprint
+
+logger = logging.getLogger(__name__)
+
+# Codec phụ đề dạng text và phần mở rộng tương ứng khi tách ra file
+TEXT_SUBTITLE_CODECS = {
+    "subrip": ".srt",
+    "srt": ".srt",
+    "ass": ".ass",
+    "ssa": ".ass",
+    "webvtt": ".vtt",
+    "mov_text": ".srt",
+    "text": ".srt"
+}
+
+# Container thường có track phụ đề text được mux sẵn
+EMBEDDED_SUBTITLE_CONTAINERS = ('.mkv', '.mp4', '.m4v', '.mov')
+
+# Các codec không copy thẳng vào container đích được, cần chuyển sang SRT (chỉ xử lý text)
+TRANSCODE_TO_SRT = {"mov_text", "text"}
+
+
+class SubtitleExtractor(QObject):
+    # Signal báo kết quả chạy nền, kèm file video để bỏ kết quả của file người dùng đã đóng
+    streams_listed = pyqtSignal(str, list)          # video_file, tracks
+    extraction_finished = pyqtSignal(str, str)      # video_file, subtitle_file
+    extraction_failed = pyqtSignal(str, str)        # video_file, lỗi
+
+    def __init__(self, cache_dir=None):
+        super().__init__()
+        # Nằm trong thư mục cache phụ đề (cache_settings), chỉ được tạo khi tách track đầu tiên
+        self.cache_dir = Path(cache_dir or "data/cache/subtitles") / "tracks"
+
+    def list_subtitle_streams(self, video_file):
+        """Liệt kê các track phụ đề dạng text trong file video bằng ffprobe"""
+        try:
+            command = [
+                'ffprobe',
+                '-v', 'error',
+                '-select_streams', 's',
+                '-show_entries', 'stream=index,codec_name:stream_tags=language,title',
+                '-of', 'json',
+                str(video_file)
+            ]
+            result = subprocess.run(command, capture_output=True, text=True, check=True)
+            streams = json.loads(result.stdout or "{}").get("streams", [])
+
+            tracks = []
+            for position, stream in enumerate(streams):
+                codec = stream.get("codec_name", "")
+                if codec not in TEXT_SUBTITLE_CODECS:
+                    # Phụ đề dạng hình ảnh (PGS, VobSub) không dùng để gõ được
+                    continue
+                tags = stream.get("tags", {})
+                tracks.append({
+                    "track": position,  # Vị trí N dùng cho -map 0:s:N
+                    "codec": codec,
+                    "language": tags.get("language", "und"),
+                    "title": tags.get("title", "")
+                })
+            return tracks
+
+        except FileNotFoundError:
+            logger.error("FFprobe not found. Please install FFmpeg first.")
+            return []
+        except Exception as e:
+            logger.error(f"Error listing subtitle streams: {str(e)}")
+            return []
+
+    def track_path(self, video_file, track):
+        """Đường dẫn cache của track phụ đề, key theo fingerprint của file video"""
+        extension = TEXT_SUBTITLE_CODECS[track["codec"]]
+        return self.cache_dir / f"{file_fingerprint(video_file)}_{track['track']}{extension}"
+
+    def extract_track(self, video_file, track):
+        """Tách track phụ đề ra file (không decode lại video), dùng lại kết quả đã cache"""
+        output_path = self.track_path(video_file, track)
+        if output_path.exists():
+            logger.info(f"Using cached subtitle track: {output_path}")
+            return str(output_path)
+
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        codec = 'srt' if track["codec"] in TRANSCODE_TO_SRT else 'copy'
+        temp_path = output_path.with_name("tmp_" + output_path.name)
+        command = [
+            'ffmpeg',
+            '-v', 'error',
+            '-y',
+            '-i', str(video_file),
+            '-map', f"0:s:{track['track']}",
+            '-c', codec,
+            str(temp_path)
+        ]
+        subprocess.run(command, capture_output=True, check=True)
+        temp_path.replace(output_path)
+        return str(output_path)
+
+    def list_in_background(self, video_file):
+        """Liệt kê track phụ đề bằng ffprobe trên thread riêng, kết quả trả về qua signal streams_listed"""
+        def run():
+            self.streams_listed.emit(str(video_file), self.list_subtitle_streams(video_file))
+
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+        return thread
+
+    def extract_in_background(self, video_file, track):
+        """Tách track phụ đề trên thread riêng, kết quả trả về qua signal"""
+        def run():
+            try:
+                self.extraction_finished.emit(str(video_file), self.extract_track(video_file, track))
+            except Exception as e:
+                logger.error(f"Error extracting subtitle track: {str(e)}")
+                self.extraction_failed.emit(str(video_file), str(e))
+
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+        return thread
+
+    @staticmethod
+    def describe_track(track):
+        """Mô tả ngắn của track để hiển thị cho người dùng"""
+        title = f" - {track['title']}" if track["title"] else ""
+        return f"Track {track['track'] + 1}: {track['language']}{title} ({track['codec']})"
@@ -0,0 +1,258 @@
+from abc import ABC, abstractmethod
+from pathlib import Path
+import codecs
+import logging
+import mmap
+import re
+
+from .subtitles import SegmentTable, iter_srt_cues, parse_timestamp
+
+logger = logging.getLogger(__name__)
+
+# BOM dài hơn phải được kiểm tra trước (UTF-32 LE bắt đầu bằng BOM của UTF-16 LE)
+_BOMS = [
+    (codecs.BOM_UTF32_LE, 'utf-32-le'),
+    (codecs.BOM_UTF32_BE, 'utf-32-be'),
+    (codecs.BOM_UTF8, 'utf-8'),
+    (codecs.BOM_UTF16_LE, 'utf-16-le'),
+    (codecs.BOM_UTF16_BE, 'utf-16-be'),
+]
+
+# Số byte đầu file dùng để đoán encoding khi không có BOM
+SNIFF_SIZE = 64 * 1024
+CHUNK_SIZE = 64 * 1024
+
+
+def sniff_encoding(head):
+    """Đoán encoding từ phần đầu file, trả về (encoding, độ dài BOM)"""
+    for bom, encoding in _BOMS:
+        if head.startswith(bom):
+            return encoding, len(bom)
+
+    # UTF-16 không có BOM: nhiều byte NUL xen kẽ trong phần text ASCII
+    if head:
+        even_nuls = head[0::2].count(0)
+        odd_nuls = head[1::2].count(0)
+        if odd_nuls > len(head) // 4 and even_nuls == 0:
+            return 'utf-16-le', 0
+        if even_nuls > len(head) // 4 and odd_nuls == 0:
+            return 'utf-16-be', 0
+
+    try:
+        codecs.getincrementaldecoder('utf-8')().decode(head, final=False)
+        return 'utf-8', 0
+    except UnicodeDecodeError:
+        # Phụ đề cũ thường là Windows-1252
+        return 'cp1252', 0
+
+
+class SubtitleReader(ABC):
+    """Đọc file phụ đề qua mmap, giải mã dần từng phần và yield cue theo kiểu lazy"""
+
+    extensions = ()
+
+    def __init__(self, subtitle_file):
+        self.subtitle_file = Path(subtitle_file)
+        self.encoding = None
+
+    def iter_lines(self):
+        """Yield từng dòng text (đã bỏ ký tự xuống dòng) mà không đọc cả file vào bộ nhớ"""
+        with open(self.subtitle_file, 'rb') as f:
+            try:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                # File rỗng không thể mmap
+                return
+
+            with mapped:
+                self.encoding, bom_size = sniff_encoding(mapped[:SNIFF_SIZE])
+                if codecs.lookup(self.encoding).name.startswith(('utf-16', 'utf-32')):
+                    yield from self._iter_wide_lines(mapped, bom_size)
+                else:
+                    yield from self._iter_byte_lines(mapped, bom_size)
+
+    def _iter_byte_lines(self, mapped, position):
+        """Tách dòng trên bytes với các encoding tương thích ASCII"""
+        decode = codecs.getdecoder(self.encoding)
+        size = len(mapped)
+        while position < size:
+            end = mapped.find(b'\n', position)
+            if end < 0:
+                end = size
+            line = mapped[position:end]
+            yield decode(line, 'replace')[0].rstrip('\r')
+            position = end + 1
+
+    def _iter_wide_lines(self, mapped, position):
+        """Giải mã UTF-16/UTF-32 theo từng chunk rồi tách dòng"""
+        decoder = codecs.getincrementaldecoder(self.encoding)('replace')
+        pending = ""
+        size = len(mapped)
+        while position < size:
+            chunk = mapped[position:position + CHUNK_SIZE]
+            position += len(chunk)
+            pending += decoder.decode(chunk, final=position >= size)
+            lines = pending.split('\n')
+            pending = lines.pop()
+            for line in lines:
+                yield line.rstrip('\r')
+        if pending:
+            yield pending.rstrip('\r')
+
+    @abstractmethod
+    def iter_cues(self):
+        """Yield các tuple (index, start_ms, end_ms, text)"""
+
+    def read_table(self):
+        """Đọc toàn bộ cue thành SegmentTable"""
+        return SegmentTable.from_cues(self.iter_cues())
+
+
+class SrtReader(SubtitleReader):
+    extensions = ('.srt',)
+
+    def iter_cues(self):
+        return iter_srt_cues(self.iter_lines())
+
+
+class WebVttReader(SubtitleReader):
+    extensions = ('.vtt',)
+
+    # Timestamp nội tuyến dạng <00:00:01.500> dùng cho karaoke
+    INLINE_TIMESTAMP = re.compile(r'<\d{1,2}(?::\d{2}){1,2}\.\d{3}>')
+
+    def iter_cues(self):
+        index = 0
+        start_ms = end_ms = None
+        text_lines = []
+        skip_block = False
+
+        for raw_line in self.iter_lines():
+            line = raw_line.strip()
+
+            if not line:
+                if start_ms is not None:
+                    index += 1
+                    yield index, start_ms, end_ms, "\n".join(text_lines)
+                start_ms = end_ms = None
+                text_lines = []
+                skip_block = False
+                continue
+
+            if skip_block:
+                continue
+
+            if start_ms is None:
+                if line.startswith(('WEBVTT', 'NOTE', 'STYLE', 'REGION')):
+                    skip_block = True
+                elif '-->' in line:
+                    start, _, end = line.partition('-->')
+                    try:
+                        start_ms = parse_timestamp(start)
+                        end_ms = parse_timestamp(end.split()[0])
+                    except (ValueError, IndexError):
+                        logger.warning(f"Skipping invalid WebVTT timing line: {line}")
+                        skip_block = True
+                # Các dòng khác trước timing line là cue identifier
+                continue
+
+            text_lines.append(self.INLINE_TIMESTAMP.sub('', line))
+
+        if start_ms is not None:
+            index += 1
+            yield index, start_ms, end_ms, "\n".join(text_lines)
+
+
+class AssReader(SubtitleReader):
+    extensions = ('.ass', '.ssa')
+
+    # Các khối override style như {\an8}, {\pos(10,20)\fad(100,200)}
+    OVERRIDE_BLOCK = re.compile(r'\{[^}]*\}')
+    DEFAULT_FORMAT = ['layer', 'start', 'end', 'style', 'name',
+                      'marginl', 'marginr', 'marginv', 'effect', 'text']
+
+    def iter_cues(self):
+        in_events = False
+        fields = self.DEFAULT_FORMAT
+        index = 0
+
+        for raw_line in self.iter_lines():
+            line = raw_line.strip()
+
+            if line.startswith('['):
+                in_events = line.lower() == '[events]'
+                continue
+            if not in_events:
+                continue
+
+            key, _, value = line.partition(':')
+            key = key.strip().lower()
+            if key == 'format':
+                fields = [field.strip().lower() for field in value.split(',')]
+                continue
+            if key != 'dialogue':
+                # Bỏ qua Comment và các dòng khác
+                continue
+
+            values = value.split(',', len(fields) - 1)
+            if len(values) < len(fields):
+                continue
+            event = dict(zip(fields, values))
+
+            try:
+                start_ms = parse_timestamp(event['start'])
+                end_ms = parse_timestamp(event['end'])
+            except (KeyError, ValueError):
+                logger.warning(f"Skipping invalid ASS event: {line}")
+                continue
+
+            text = self.OVERRIDE_BLOCK.sub('', event.get('text', ''))
+            text = text.replace('\\N', '\n').replace('\\n', '\n').replace('\\h', ' ')
+            text = "\n".join(part.strip() for part in text.split('\n') if part.strip())
+            if not text:
+                continue
+
+            index += 1
+            yield index, start_ms, end_ms, text
+
+    def read_table(self):
+        """Event trong file ASS không theo thứ tự thời gian nên cần sắp xếp lại"""
+        cues = sorted(self.iter_cues(), key=lambda cue: (cue[1], cue[2]))
+        return SegmentTable.from_cues(
+            (position + 1, start_ms, end_ms, text)
+            for position, (_, start_ms, end_ms, text) in enumerate(cues)
+        )
+
+
+READERS = [SrtReader, WebVttReader, AssReader]
+
+SUBTITLE_EXTENSIONS = tuple(ext for reader in READERS for ext in reader.extensions)
+
+
+def get_reader(subtitle_file):
+    """Chọn reader theo phần mở rộng, nếu không rõ thì đoán theo nội dung file"""
+    suffix = Path(subtitle_file).suffix.lower()
+    for reader in READERS:
+        if suffix in reader.extensions:
+            return reader(subtitle_file)
+
+    # Reader nào cũng đọc dòng giống nhau, chỉ cần một reader cụ thể để xem phần đầu file
+    lines = SrtReader(subtitle_file).iter_lines()
+    try:
+        for line in lines:
+            line = line.strip()
+            if not line:
+                continue
+            if line.startswith('WEBVTT'):
+                return WebVttReader(subtitle_file)
+            if line.lower() == '[script info]':
+                return AssReader(subtitle_file)
+            break
+    finally:
+        lines.close()
+    return SrtReader(subtitle_file)
+
+
+def load_subtitle_file(subtitle_file):
+    """Đọc file phụ đề (SRT, WebVTT, ASS/SSA) thành SegmentTable"""
+    return get_reader(subtitle_file).read_table()
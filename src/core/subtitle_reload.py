@@ -0,0 +1,118 @@
+from collections import defaultdict, deque
+from array import array
+from pathlib import Path
+import codecs
+import logging
+import re
+
+from .subtitles import SegmentTable, iter_srt_cues
+from .subtitle_readers import sniff_encoding, load_subtitle_file, SNIFF_SIZE
+
+logger = logging.getLogger(__name__)
+
+# Các cue SRT được ngăn cách bởi một hoặc nhiều dòng trống
+_BLOCK_BREAK = re.compile(rb'\r?\n(?:[ \t]*\r?\n)+')
+
+
+class SubtitleReloader:
+    """Đọc lại file phụ đề khi bị sửa, chỉ parse lại các block cue có nội dung thay đổi"""
+
+    def __init__(self, subtitle_file, cleaner=None):
+        self.subtitle_file = Path(subtitle_file)
+        self.cleaner = cleaner
+        # bytes của block -> các cue đã parse từ block đó
+        self._block_cues = {}
+        self.reparsed_blocks = 0
+
+    def _supports_blocks(self, encoding):
+        """Chỉ tách block trực tiếp trên bytes với file SRT dùng encoding tương thích ASCII"""
+        if self.subtitle_file.suffix.lower() != '.srt':
+            return False
+        return not codecs.lookup(encoding).name.startswith(('utf-16', 'utf-32'))
+
+    def _read_blocks(self):
+        """Đọc file, trả về (encoding, danh sách block bytes) hoặc (encoding, None) nếu không tách được"""
+        data = self.subtitle_file.read_bytes()
+        encoding, bom_size = sniff_encoding(data[:SNIFF_SIZE])
+        if not self._supports_blocks(encoding):
+            return encoding, None
+        return encoding, _BLOCK_BREAK.split(data[bom_size:])
+
+    def _parse_blocks(self, encoding, blocks):
+        """Parse các block, dùng lại kết quả cũ cho block không đổi"""
+        decode = codecs.getdecoder(encoding)
+        cues = []
+        block_cues = {}
+        for block in blocks:
+            parsed = self._block_cues.get(block)
+            if parsed is None:
+                parsed = block_cues.get(block)
+            if parsed is None:
+                parsed = tuple(iter_srt_cues(decode(block, 'replace')[0].split('\n')))
+                self.reparsed_blocks += 1
+            block_cues[block] = parsed
+            cues.extend(parsed)
+        self._block_cues = block_cues
+        return cues
+
+    def prime(self):
+        """Ghi nhớ nội dung hiện tại của file để lần reload sau chỉ parse phần thay đổi"""
+        try:
+            encoding, blocks = self._read_blocks()
+            if blocks is not None:
+                self._parse_blocks(encoding, blocks)
+            self.reparsed_blocks = 0
+            return True
+        except Exception as e:
+            logger.error(f"Error reading subtitle file: {str(e)}")
+            return False
+
+    def load(self):
+        """Đọc lại file phụ đề thành SegmentTable, trả về None nếu lỗi"""
+        try:
+            encoding, blocks = self._read_blocks()
+            if blocks is None:
+                table = load_subtitle_file(self.subtitle_file)
+            else:
+                table = SegmentTable.from_cues(self._parse_blocks(encoding, blocks))
+            if self.cleaner:
+                table.apply_cleanup(self.cleaner)
+            return table
+        except Exception as e:
+            logger.error(f"Error reloading subtitles: {str(e)}")
+            return None
+
+
+def reconcile(old_table, new_table):
+    """Ghép cue cũ với cue mới, trả về array vị trí mới của từng cue cũ (-1 nếu cue đã bị xóa)"""
+    mapping = array('i', [-1] * len(old_table))
+    taken = bytearray(len(new_table))
+
+    def match(key_of):
+        # Các vị trí mới theo key, lấy theo thứ tự để giữ nguyên thứ tự cue trùng key
+        candidates = defaultdict(deque)
+        for pos in range(len(new_table)):
+            if not taken[pos]:
+                candidates[key_of(new_table, pos)].append(pos)
+        for pos in range(len(old_table)):
+            if mapping[pos] >= 0:
+                continue
+            queue = candidates.get(key_of(old_table, pos))
+            if queue:
+                new_pos = queue.popleft()
+                mapping[pos] = new_pos
+                taken[new_pos] = 1
+
+    # Không đổi gì -> chỉ đổi timing hoặc đánh số lại -> sửa text của cue
+    match(lambda table, pos: (table.cue_number(pos), table.text(pos)))
+    match(lambda table, pos: table.text(pos))
+    match(lambda table, pos: table.cue_number(pos))
+    return mapping
+
+
+def remap_position(mapping, position):
+    """Vị trí mới của cue đang học; nếu cue đã bị xóa thì lấy cue gần nhất phía trước"""
+    for pos in range(min(position, len(mapping) - 1), -1, -1):
+        if mapping[pos] >= 0:
+            return mapping[pos]
+    return 0
@@ -0,0 +1,321 @@
+from array import array
+from collections import namedtuple
+import logging
+
+from .textnorm import normalize_token
+
+logger = logging.getLogger(__name__)
+
+# Ký tự phân tách các token đã chuẩn hóa (token có thể rỗng, vd "-")
+TOKEN_SEPARATOR = '\x1f'
+
+SegmentTokens = namedtuple("SegmentTokens", ["words", "normalized", "offsets"])
+
+# Số segment gần nhất được giữ lại kết quả tách từ
+RECENT_TOKENS_SIZE = 4
+
+
+def tokenize(text):
+    """Tách text thành (words, normalized, offsets) với offsets là vị trí ký tự của từng từ"""
+    words = []
+    offsets = []
+    position = 0
+    for word in text.split():
+        position = text.index(word, position)
+        words.append(word)
+        offsets.append(position)
+        position += len(word)
+    return SegmentTokens(tuple(words), tuple(normalize_token(word) for word in words), tuple(offsets))
+
+
+def parse_timestamp(time_str):
+    """Chuyển timestamp dạng HH:MM:SS,mmm (hoặc MM:SS.mmm) sang milliseconds"""
+    time_str = time_str.strip()
+    head, sep, frac = time_str.replace('.', ',').rpartition(',')
+    if not sep:
+        head, frac = time_str, "0"
+    parts = head.split(':')
+    seconds = 0
+    for part in parts:
+        seconds = seconds * 60 + int(part)
+    # Chuẩn hóa phần lẻ về đúng 3 chữ số (".5" -> 500ms, ".05" -> 50ms)
+    millis = int((frac.strip() + "00")[:3])
+    return seconds * 1000 + millis
+
+
+def format_timestamp(milliseconds):
+    """Format milliseconds theo định dạng SRT HH:MM:SS,mmm"""
+    milliseconds = max(0, int(milliseconds))
+    seconds, millis = divmod(milliseconds, 1000)
+    minutes, seconds = divmod(seconds, 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours:02d}:{minutes:02d}:{seconds:02d},{millis:03d}"
+
+
+class TextColumn:
+    """Văn bản của từng cue, lưu chung trong một buffer UTF-8 kèm offsets"""
+
+    def __init__(self, buffer=b"", starts=None, ends=None):
+        self.buffer = buffer
+        self.starts = starts if starts is not None else array('i')
+        self.ends = ends if ends is not None else array('i')
+
+    @classmethod
+    def from_strings(cls, strings):
+        """Tạo column từ danh sách chuỗi, các chuỗi trùng nhau chỉ lưu một lần"""
+        chunks = []
+        interned = {}
+        starts = array('i')
+        ends = array('i')
+        size = 0
+        for text in strings:
+            span = interned.get(text)
+            if span is None:
+                data = text.encode('utf-8')
+                span = (size, size + len(data))
+                interned[text] = span
+                chunks.append(data)
+                size += len(data)
+            starts.append(span[0])
+            ends.append(span[1])
+        return cls(b"".join(chunks), starts, ends)
+
+    def __len__(self):
+        return len(self.starts)
+
+    def __getitem__(self, pos):
+        return bytes(self.buffer[self.starts[pos]:self.ends[pos]]).decode('utf-8')
+
+    def __iter__(self):
+        for pos in range(len(self)):
+            yield self[pos]
+
+
+class SegmentTable:
+    """Bảng segment phụ đề dạng cột: thời gian lưu bằng array('i'), text lưu trong TextColumn"""
+
+    def __init__(self, indices=None, starts=None, ends=None, texts=None, tokens=None, practice=None):
+        self.indices = indices if indices is not None else array('i')
+        self.starts = starts if starts is not None else array('i')
+        self.ends = ends if ends is not None else array('i')
+        self.texts = texts if texts is not None else TextColumn()
+        # Practice text là text dùng để so sánh khi gõ, mặc định trùng với text hiển thị
+        self.practice = practice if practice is not None else self.texts
+        self.token_columns = tokens if tokens is not None else self.build_token_columns(self.practice)
+        self._recent_tokens = {}
+        # Thời gian phát đã căn theo giọng nói thật (None nếu chưa sửa timing)
+        self.play_starts = None
+        self.play_ends = None
+
+    def apply_cleanup(self, cleaner):
+        """Tạo practice text cho toàn bộ bảng bằng SubtitleCleaner và tách từ lại"""
+        self.practice = TextColumn.from_strings(cleaner.clean_all(list(self.texts)))
+        self.token_columns = self.build_token_columns(self.practice)
+        self._recent_tokens = {}
+        return self
+
+    @staticmethod
+    def build_token_columns(texts):
+        """Tách từ và chuẩn hóa toàn bộ các cue một lần khi load phụ đề"""
+        words = []
+        normalized = []
+        offsets = array('i')
+        bounds = array('i', [0])
+        for text in texts:
+            tokens = tokenize(text)
+            words.append(' '.join(tokens.words))
+            normalized.append(TOKEN_SEPARATOR.join(tokens.normalized))
+            offsets.extend(tokens.offsets)
+            bounds.append(len(offsets))
+        return {
+            "words": TextColumn.from_strings(words),
+            "normalized": TextColumn.from_strings(normalized),
+            "offsets": offsets,
+            "bounds": bounds
+        }
+
+    @classmethod
+    def from_cues(cls, cues):
+        """Tạo bảng từ iterable các tuple (index, start_ms, end_ms, text)"""
+        indices = array('i')
+        starts = array('i')
+        ends = array('i')
+        texts = []
+        for index, start_ms, end_ms, text in cues:
+            indices.append(index)
+            starts.append(start_ms)
+            ends.append(end_ms)
+            texts.append(text)
+        return cls(indices, starts, ends, TextColumn.from_strings(texts))
+
+    def to_columns(self):
+        """Trả về (int_columns, byte_columns) để lưu xuống cache"""
+        int_columns = {
+            "indices": self.indices,
+            "starts": self.starts,
+            "ends": self.ends,
+            "token_offsets": self.token_columns["offsets"],
+            "token_bounds": self.token_columns["bounds"]
+        }
+        byte_columns = {}
+        for name, column in (("texts", self.texts),
+                             ("practice", self.practice),
+                             ("words", self.token_columns["words"]),
+                             ("normalized", self.token_columns["normalized"])):
+            int_columns[name + "@s"] = column.starts
+            int_columns[name + "@e"] = column.ends
+            byte_columns[name] = column.buffer
+        return int_columns, byte_columns
+
+    @classmethod
+    def from_columns(cls, int_columns, byte_columns):
+        """Tạo bảng từ các cột đọc lại từ cache (array hoặc memoryview)"""
+        def text_column(name):
+            return TextColumn(byte_columns[name], int_columns[name + "@s"], int_columns[name + "@e"])
+
+        tokens = {
+            "words": text_column("words"),
+            "normalized": text_column("normalized"),
+            "offsets": int_columns["token_offsets"],
+            "bounds": int_columns["token_bounds"]
+        }
+        return cls(
+            int_columns["indices"],
+            int_columns["starts"],
+            int_columns["ends"],
+            text_column("texts"),
+            tokens,
+            text_column("practice")
+        )
+
+    def __len__(self):
+        return len(self.starts)
+
+    def __iter__(self):
+        for pos in range(len(self)):
+            yield self[pos]
+
+    def __getitem__(self, pos):
+        """Trả về segment dạng dict, tương thích với code cũ dùng segment["text"]"""
+        if pos < 0:
+            pos += len(self)
+        if not 0 <= pos < len(self):
+            raise IndexError("segment index out of range")
+        start_ms = self.starts[pos]
+        end_ms = self.ends[pos]
+        return {
+            "index": self.indices[pos],
+            "start_time": format_timestamp(start_ms),
+            "end_time": format_timestamp(end_ms),
+            "start_ms": start_ms,
+            "end_ms": end_ms,
+            "duration_ms": end_ms - start_ms,
+            "text": self.texts[pos]
+        }
+
+    def cue_number(self, pos):
+        return self.indices[pos]
+
+    def start_ms(self, pos):
+        return self.starts[pos]
+
+    def end_ms(self, pos):
+        return self.ends[pos]
+
+    def duration_ms(self, pos):
+        return self.ends[pos] - self.starts[pos]
+
+    def text(self, pos):
+        return self.texts[pos]
+
+    def set_playback_times(self, starts, ends):
+        """Lưu thời gian phát đã sửa cho toàn bộ bảng"""
+        self.play_starts = starts
+        self.play_ends = ends
+
+    def playback_range(self, pos, tail_ms=0):
+        """Khoảng (start, end) dùng khi phát cue; chưa sửa timing thì cộng thêm tail_ms vào end"""
+        if self.play_ends is not None:
+            return self.play_starts[pos], self.play_ends[pos]
+        return self.starts[pos], self.ends[pos] + tail_ms
+
+    def practice_text(self, pos):
+        return self.practice[pos]
+
+    def tokens(self, pos):
+        """Trả về SegmentTokens đã tính sẵn của cue tại vị trí pos"""
+        # Giữ vài segment gần nhất (segment đang gõ và segment đã chuẩn bị trước)
+        tokens = self._recent_tokens.get(pos)
+        if tokens is not None:
+            return tokens
+        tokens = self.build_tokens(pos)
+        self.remember_tokens(pos, tokens)
+        return tokens
+
+    def build_tokens(self, pos):
+        """Dựng SegmentTokens từ các cột, không đụng tới cache (gọi được từ thread nền)"""
+        words = self.token_columns["words"][pos]
+        if not words:
+            return SegmentTokens((), (), ())
+        bounds = self.token_columns["bounds"]
+        return SegmentTokens(
+            tuple(words.split(' ')),
+            tuple(self.token_columns["normalized"][pos].split(TOKEN_SEPARATOR)),
+            tuple(self.token_columns["offsets"][bounds[pos]:bounds[pos + 1]])
+        )
+
+    def remember_tokens(self, pos, tokens):
+        """Đưa SegmentTokens (vd. do thread prefetch dựng) vào cache các segment gần nhất"""
+        self._recent_tokens.pop(pos, None)
+        if len(self._recent_tokens) >= RECENT_TOKENS_SIZE:
+            self._recent_tokens.pop(next(iter(self._recent_tokens)))
+        self._recent_tokens[pos] = tokens
+
+
+def iter_srt_cues(lines):
+    """Đọc tuần tự các dòng SRT và yield từng cue (index, start_ms, end_ms, text)"""
+    index = None
+    start_ms = end_ms = None
+    text_lines = []
+    expect_header = True
+    auto_index = 0
+
+    for raw_line in lines:
+        line = raw_line.strip()
+
+        if not line:
+            # Dòng trống kết thúc cue hiện tại
+            if start_ms is not None:
+                auto_index += 1
+                yield (index if index is not None else auto_index,
+                       start_ms, end_ms, "\n".join(text_lines))
+                index = start_ms = end_ms = None
+                text_lines = []
+            expect_header = True
+            continue
+
+        if expect_header and start_ms is None and line.isdigit():
+            index = int(line)
+            continue
+
+        if start_ms is None and '-->' in line:
+            start, _, end = line.partition('-->')
+            try:
+                start_ms = parse_timestamp(start)
+                # Bỏ các thông tin vị trí phía sau end time (X1:... Y1:...)
+                end_ms = parse_timestamp(end.split()[0])
+            except (ValueError, IndexError):
+                logger.warning(f"Skipping invalid timestamp line: {line}")
+                start_ms = end_ms = None
+                index = None
+            expect_header = False
+            continue
+
+        if start_ms is not None:
+            text_lines.append(line)
+
+    if start_ms is not None:
+        auto_index += 1
+        yield (index if index is not None else auto_index,
+               start_ms, end_ms, "\n".join(text_lines))
+
@@ -0,0 +1,51 @@
+from functools import lru_cache
+import logging
+import sys
+import unicodedata
+
+logger = logging.getLogger(__name__)
+
+# Ký hiệu ASCII vẫn bị bỏ như trước đây dù không thuộc nhóm dấu câu Unicode
+LEGACY_SYMBOLS = '$^<>~'
+
+# Chữ không tách được thành chữ gốc + dấu khi NFD, dùng khi bỏ dấu
+_FOLD_EXTRA = {'đ': 'd', 'Đ': 'D', 'ø': 'o', 'Ø': 'O', 'ł': 'l', 'Ł': 'L',
+               'ß': 'ss', 'æ': 'ae', 'Æ': 'AE', 'œ': 'oe', 'Œ': 'OE'}
+
+
+def _build_punctuation_table():
+    """Bảng translate xóa mọi dấu câu Unicode (nhóm P*) trong BMP và các ký hiệu cũ"""
+    deleted = {ord(char): None for char in LEGACY_SYMBOLS}
+    for codepoint in range(min(sys.maxunicode + 1, 0x10000)):
+        if unicodedata.category(chr(codepoint)).startswith('P'):
+            deleted[codepoint] = None
+    return deleted
+
+
+PUNCTUATION_TABLE = _build_punctuation_table()
+FOLD_TABLE = str.maketrans(_FOLD_EXTRA)
+
+
+def fold_diacritics(text):
+    """Bỏ dấu thanh/dấu phụ: "café" -> "cafe", "đường" -> "duong" """
+    decomposed = unicodedata.normalize('NFD', text.translate(FOLD_TABLE))
+    return unicodedata.normalize(
+        'NFC', ''.join(char for char in decomposed if not unicodedata.combining(char))
+    )
+
+
+@lru_cache(maxsize=8192)
+def normalize_token(word, fold=False):
+    """Chuẩn hóa một từ: NFKC, bỏ dấu câu, chuyển về chữ thường, bỏ dấu nếu fold"""
+    word = unicodedata.normalize('NFKC', word).translate(PUNCTUATION_TABLE).lower()
+    if fold:
+        word = fold_diacritics(word)
+    return ''.join(word.split())
+
+
+def normalize_text(text, fold=False):
+    """Chuẩn hóa cả câu theo từng từ, bỏ các từ chỉ có dấu câu"""
+    if not text:
+        return ""
+    return ' '.join(token for token in (normalize_token(word, fold) for word in text.split()) if token)
+
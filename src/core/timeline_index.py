@@ -0,0 +1,62 @@
+from array import array
+from bisect import bisect_left, bisect_right
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class TimelineIndex:
+    """Index start/end đã sắp xếp của SegmentTable, tra cứu cue theo thời gian trong O(log n)"""
+
+    def __init__(self, table):
+        count = len(table)
+        starts = table.starts
+        if all(starts[i] <= starts[i + 1] for i in range(count - 1)):
+            order = range(count)
+        else:
+            # File phụ đề không theo thứ tự thời gian thì sắp xếp lại theo start
+            order = sorted(range(count), key=starts.__getitem__)
+
+        self.order = array('i', order)
+        self.starts = array('i', (table.starts[pos] for pos in self.order))
+        self.ends = array('i', (table.ends[pos] for pos in self.order))
+
+        # max_ends[i] = end lớn nhất trong các cue [0..i], dùng để dừng sớm khi quét lùi
+        self.max_ends = array('i')
+        running = -1
+        for end in self.ends:
+            running = max(running, end)
+            self.max_ends.append(running)
+
+    def __len__(self):
+        return len(self.order)
+
+    def segment_at(self, time_ms):
+        """Trả về vị trí cue đang phát tại time_ms, -1 nếu đang ở khoảng trống"""
+        i = bisect_right(self.starts, time_ms) - 1
+        while i >= 0 and self.max_ends[i] > time_ms:
+            if self.ends[i] > time_ms:
+                return self.order[i]
+            i -= 1
+        return -1
+
+    def seek(self, time_ms):
+        """Trả về cue tại time_ms, hoặc cue kế tiếp nếu time_ms rơi vào khoảng trống"""
+        if not self.order:
+            return -1
+        pos = self.segment_at(time_ms)
+        if pos >= 0:
+            return pos
+        i = bisect_left(self.starts, time_ms)
+        return self.order[min(i, len(self.order) - 1)]
+
+    def overlapping(self, start_ms, end_ms):
+        """Trả về các cue giao với khoảng [start_ms, end_ms), sắp xếp theo thời gian bắt đầu"""
+        result = []
+        i = bisect_left(self.starts, end_ms) - 1
+        while i >= 0 and self.max_ends[i] > start_ms:
+            if self.ends[i] > start_ms:
+                result.append(self.order[i])
+            i -= 1
+        result.reverse()
+        return result
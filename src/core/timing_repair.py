@@ -0,0 +1,174 @@
+from array import array
+import logging
+import subprocess
+import threading
+import numpy as np
+from PyQt5.QtCore import QObject, pyqtSignal
+
+from .subtitle_cache import file_fingerprint
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_RATE = 16000
+FRAME_MS = 10
+# Số frame đọc từ ffmpeg mỗi lần (10 giây audio)
+FRAMES_PER_CHUNK = 1000
+
+DEFAULT_TIMING_SETTINGS = {
+    "timing_repair": True,
+    "tail_ms": 400,        # Phần cộng thêm vào end khi không tìm được mốc giọng nói
+    "search_ms": 300,      # Khoảng tìm mốc giọng nói quanh start/end của cue
+    "pad_ms": 100,         # Lề giữ lại trước/sau mốc để không cắt mất âm đầu/cuối
+    "margin_db": 12,       # Ngưỡng giọng nói so với mức nhiễu nền
+    "min_gap_ms": 150      # Khoảng lặng ngắn hơn thế này coi như vẫn đang nói
+}
+
+
+def frame_energies(media_file, sample_rate=SAMPLE_RATE, frame_ms=FRAME_MS):
+    """Decode audio một lần bằng ffmpeg (mono 16 kHz) và tính năng lượng (dB) của từng frame"""
+    frame = sample_rate * frame_ms // 1000
+    frame_bytes = frame * 2
+    command = [
+        'ffmpeg',
+        '-v', 'error',
+        '-i', str(media_file),
+        '-vn',
+        '-ac', '1',
+        '-ar', str(sample_rate),
+        '-f', 's16le',
+        '-'
+    ]
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+
+    energies = []
+    pending = b""
+    try:
+        while True:
+            data = process.stdout.read(frame_bytes * FRAMES_PER_CHUNK)
+            if not data:
+                break
+            data = pending + data
+            usable = len(data) // frame_bytes * frame_bytes
+            pending = data[usable:]
+            # Mỗi chunk chỉ chiếm vài trăm KB, không giữ toàn bộ audio trong bộ nhớ
+            samples = np.frombuffer(data[:usable], dtype='<i2').astype(np.float32).reshape(-1, frame)
+            energies.append(np.einsum('ij,ij->i', samples, samples) / frame)
+    finally:
+        process.stdout.close()
+        return_code = process.wait()
+
+    if return_code != 0:
+        raise RuntimeError(f"ffmpeg exited with code {return_code}")
+    if not energies:
+        return np.zeros(0, dtype=np.float32)
+    return 10 * np.log10(np.concatenate(energies) + 1.0)
+
+
+def speech_edges(energy_db, frame_ms=FRAME_MS, margin_db=12, min_gap_ms=150):
+    """Tìm các mốc bắt đầu/kết thúc giọng nói (ms) từ năng lượng từng frame"""
+    if len(energy_db) == 0:
+        return np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.int32)
+
+    noise_floor = np.percentile(energy_db, 10)
+    mask = energy_db > noise_floor + margin_db
+
+    # Nối các khoảng lặng ngắn giữa các từ (dilation rồi erosion)
+    kernel = np.ones(max(1, min_gap_ms // frame_ms), dtype=np.int32)
+    mask = np.convolve(mask.astype(np.int32), kernel, 'same') > 0
+    mask = np.convolve((~mask).astype(np.int32), kernel, 'same') == 0
+
+    changes = np.diff(np.concatenate(([0], mask.astype(np.int8), [0])))
+    onsets = np.flatnonzero(changes == 1) * frame_ms
+    offsets = np.flatnonzero(changes == -1) * frame_ms
+    return onsets.astype(np.int32), offsets.astype(np.int32)
+
+
+def _nearest(edges, times, search_ms):
+    """Mốc gần nhất với từng thời điểm và mask cho biết mốc có nằm trong khoảng tìm không"""
+    if len(edges) == 0:
+        return times, np.zeros(len(times), dtype=bool)
+    index = np.searchsorted(edges, times)
+    left = edges[np.clip(index - 1, 0, len(edges) - 1)]
+    right = edges[np.clip(index, 0, len(edges) - 1)]
+    nearest = np.where(np.abs(times - left) <= np.abs(right - times), left, right)
+    return nearest, np.abs(nearest - times) <= search_ms
+
+
+def _to_array(values):
+    result = array('i')
+    result.frombytes(values.astype(np.int32).tobytes())
+    return result
+
+
+def snap_times(starts, ends, onsets, offsets, settings=None):
+    """Căn start/end của tất cả cue về mốc giọng nói gần nhất, trả về (starts, ends) kiểu array('i')"""
+    settings = {**DEFAULT_TIMING_SETTINGS, **(settings or {})}
+    search_ms = settings["search_ms"]
+    pad_ms = settings["pad_ms"]
+
+    starts = np.asarray(starts, dtype=np.int64)
+    ends = np.asarray(ends, dtype=np.int64)
+    onsets = np.asarray(onsets, dtype=np.int64)
+    offsets = np.asarray(offsets, dtype=np.int64)
+
+    snapped_starts, has_start = _nearest(onsets, starts, search_ms)
+    new_starts = np.where(has_start, np.maximum(snapped_starts - pad_ms, 0), starts)
+
+    snapped_ends, has_end = _nearest(offsets, ends, search_ms)
+    has_end &= snapped_ends > new_starts
+    new_ends = np.where(has_end, snapped_ends + pad_ms, ends + settings["tail_ms"])
+    new_ends = np.maximum(new_ends, new_starts + 1)
+
+    return _to_array(new_starts), _to_array(new_ends)
+
+
+class TimingRepairer(QObject):
+    # Signal (file media, (onsets, offsets)) khi phân tích audio xong
+    edges_ready = pyqtSignal(str, object)
+
+    def __init__(self, cache=None, settings=None):
+        super().__init__()
+        self.cache = cache
+        self.settings = {**DEFAULT_TIMING_SETTINGS, **(settings or {})}
+
+    def load_edges(self, media_file):
+        """Lấy mốc giọng nói của file media, chỉ decode audio khi chưa có trong cache"""
+        key = f"{file_fingerprint(media_file)}_{self.settings['margin_db']}_{self.settings['min_gap_ms']}"
+        if self.cache:
+            columns = self.cache.get_arrays(key, "vad")
+            if columns:
+                return np.asarray(columns["onsets"]), np.asarray(columns["offsets"])
+
+        onsets, offsets = speech_edges(
+            frame_energies(media_file),
+            margin_db=self.settings["margin_db"],
+            min_gap_ms=self.settings["min_gap_ms"]
+        )
+        if self.cache:
+            self.cache.put_arrays(key, "vad", {
+                "onsets": _to_array(onsets),
+                "offsets": _to_array(offsets)
+            })
+        return onsets, offsets
+
+    def analyze_in_background(self, media_file):
+        """Phân tích audio trên thread riêng, kết quả trả về qua signal"""
+        def run():
+            try:
+                self.edges_ready.emit(str(media_file), self.load_edges(media_file))
+            except Exception as e:
+                logger.error(f"Error analyzing audio: {str(e)}")
+
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+        return thread
+
+    def repair(self, table, edges):
+        """Gán thời gian phát đã căn theo giọng nói vào SegmentTable"""
+        try:
+            onsets, offsets = edges
+            table.set_playback_times(*snap_times(table.starts, table.ends, onsets, offsets, self.settings))
+            return True
+        except Exception as e:
+            logger.error(f"Error repairing subtitle timing: {str(e)}")
+            return False
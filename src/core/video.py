@@ -7,52 +7,29 @@ from pydub import AudioSegment
 import subprocess
 import pysrt
 
+from .subtitles import SegmentTable, parse_timestamp, format_timestamp
+from .subtitle_cache import SubtitleCache
+from .subtitle_readers import load_subtitle_file
+from .subtitle_cleanup import SubtitleCleaner
+
 logger = logging.getLogger(__name__)
 
 class VideoProcessor:
-    def __init__(self):
+    def __init__(self, subtitle_cache=None, cleaner=None):
         self.subtitles = None
+        self.subtitle_cache = subtitle_cache or SubtitleCache()
+        self.cleaner = cleaner or SubtitleCleaner()
         
+    def parse_subtitles(self, subtitle_file):
+        """Parse file phụ đề và tạo practice text đã làm sạch"""
+        return load_subtitle_file(subtitle_file).apply_cleanup(self.cleaner)
+
     def load_subtitles(self, subtitle_file):
-        """Load và parse file phụ đề với thời gian chính xác"""
+        """Load file phụ đề thành SegmentTable, dùng cache nếu file chưa thay đổi"""
         try:
-            segments = []
-            current_segment = {}
-            
-            with open(subtitle_file, 'r', encoding='utf-8') as f:
-                lines = f.readlines()
-                
-            i = 0
-            while i < len(lines):
-                line = lines[i].strip()
-                
-                if line.isdigit():  # Segment number
-                    if current_segment:
-                        segments.append(current_segment)
-                    current_segment = {"index": int(line)}
-                    
-                elif '-->' in line:  # Timestamp
-                    start, end = line.split(' --> ')
-                    current_segment["start_time"] = start.strip()
-                    current_segment["end_time"] = end.strip()
-                    current_segment["duration_ms"] = (
-                        self.time_to_milliseconds(end.strip()) - 
-                        self.time_to_milliseconds(start.strip())
-                    )
-                    
-                elif line:  # Text content
-                    if "text" not in current_segment:
-                        current_segment["text"] = line
-                    else:
-                        current_segment["text"] += "\n" + line
-                        
-                i += 1
-                
-            if current_segment:
-                segments.append(current_segment)
-                
-            return segments
-            
+            return self.subtitle_cache.load(
+                subtitle_file, self.parse_subtitles, variant=self.cleaner.signature()
+            )
         except Exception as e:
             logger.error(f"Error loading subtitles: {str(e)}")
             return None
@@ -60,10 +37,7 @@ class VideoProcessor:
     def time_to_milliseconds(self, time_str):
         """Chuyển đổi thời gian từ string sang milliseconds chính xác"""
         try:
-            h, m, s = time_str.split(':')
-            s, ms = s.split(',')
-            total_ms = (int(h) * 3600 + int(m) * 60 + int(s)) * 1000 + int(ms)
-            return total_ms
+            return parse_timestamp(time_str)
         except Exception as e:
             logger.error(f"Error converting time to milliseconds: {str(e)}")
             return 0
@@ -78,50 +52,12 @@ class VideoProcessor:
 
     @staticmethod
     def parse_srt_to_segments(srt_file):
-        """Đọc file SRT và chuyển thành danh sách các đoạn phụ đề"""
+        """Đọc file SRT và chuyển thành SegmentTable"""
         try:
-            segments = []
-            current_segment = {}
-            
-            with open(srt_file, 'r', encoding='utf-8') as file:
-                lines = file.readlines()
-                
-            i = 0
-            while i < len(lines):
-                line = lines[i].strip()
-                
-                if not line:
-                    i += 1
-                    continue
-                    
-                if line.isdigit():
-                    if current_segment:
-                        segments.append(current_segment)
-                    current_segment = {'index': int(line)}
-                    i += 1
-                    continue
-                    
-                if '-->' in line:
-                    times = line.split(' --> ')
-                    current_segment['start_time'] = times[0].strip()
-                    current_segment['end_time'] = times[1].strip()
-                    i += 1
-                    continue
-                    
-                text = []
-                while i < len(lines) and lines[i].strip():
-                    text.append(lines[i].strip())
-                    i += 1
-                current_segment['text'] = ' '.join(text)
-                
-            if current_segment:
-                segments.append(current_segment)
-                
-            return segments
-            
+            return load_subtitle_file(srt_file)
         except Exception as e:
             logger.error(f"Error parsing SRT file: {str(e)}")
-            return []
+            return SegmentTable()
 
     @staticmethod
     def generate_subtitles(video_file):
@@ -202,11 +138,7 @@ class VideoProcessor:
     @staticmethod
     def format_time(milliseconds):
         """Format thời gian theo định dạng SRT"""
-        seconds = milliseconds / 1000
-        hours = int(seconds // 3600)
-        minutes = int((seconds % 3600) // 60)
-        seconds = seconds % 60
-        return f"{hours:02d}:{minutes:02d}:{seconds:06.3f}".replace('.', ',')
+        return format_timestamp(milliseconds)
 
     @staticmethod
     def write_srt_file(segments, output_file):
@@ -0,0 +1,161 @@
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Các loại op khi căn từ gõ (typed) với từ đích (target)
+MATCH = "match"             # Từ gõ trùng từ đích
+SUBSTITUTE = "substitute"   # Gõ sai một từ đích
+INSERT = "insert"           # Từ thừa không có trong câu đích
+DELETE = "delete"           # Bỏ sót từ đích
+
+
+def myers_diff(typed, target):
+    """Diff O(ND) của Myers, trả về danh sách (op, typed_index, target_index) với op MATCH/INSERT/DELETE"""
+    n, m = len(typed), len(target)
+    v = {1: 0}
+    trace = []
+    for d in range(n + m + 1):
+        trace.append(dict(v))
+        done = False
+        for k in range(-d, d + 1, 2):
+            if k == -d or (k != d and v[k - 1] < v[k + 1]):
+                x = v[k + 1]
+            else:
+                x = v[k - 1] + 1
+            y = x - k
+            while x < n and y < m and typed[x] == target[y]:
+                x += 1
+                y += 1
+            v[k] = x
+            if x >= n and y >= m:
+                done = True
+                break
+        if done:
+            break
+
+    # Đi ngược trace để dựng lại đường đi ngắn nhất
+    ops = []
+    x, y = n, m
+    for d in range(len(trace) - 1, -1, -1):
+        v = trace[d]
+        k = x - y
+        if k == -d or (k != d and v.get(k - 1, -1) < v.get(k + 1, -1)):
+            prev_k = k + 1
+        else:
+            prev_k = k - 1
+        prev_x = v[prev_k]
+        prev_y = prev_x - prev_k
+        while x > prev_x and y > prev_y:
+            x -= 1
+            y -= 1
+            ops.append((MATCH, x, y))
+        if d > 0:
+            if x == prev_x:
+                ops.append((DELETE, -1, y - 1))
+            else:
+                ops.append((INSERT, x - 1, -1))
+        x, y = prev_x, prev_y
+    ops.reverse()
+    return ops
+
+
+def pair_substitutions(ops):
+    """Ghép các cặp INSERT/DELETE nằm giữa hai MATCH thành SUBSTITUTE"""
+    result = []
+    inserts = []
+    deletes = []
+
+    def flush():
+        for typed_index, target_index in zip(inserts, deletes):
+            result.append((SUBSTITUTE, typed_index, target_index))
+        result.extend((INSERT, typed_index, -1) for typed_index in inserts[len(deletes):])
+        result.extend((DELETE, -1, target_index) for target_index in deletes[len(inserts):])
+        inserts.clear()
+        deletes.clear()
+
+    for op in ops:
+        if op[0] == MATCH:
+            flush()
+            result.append(op)
+        elif op[0] == INSERT:
+            inserts.append(op[1])
+        else:
+            deletes.append(op[2])
+    flush()
+    return result
+
+
+class WordAlignment:
+    """Kết quả căn từ: op của từng từ gõ và số match/substitution/insertion/deletion"""
+
+    def __init__(self, ops, typed_count, target_count):
+        self.ops = ops
+        self.target_count = target_count
+        self.typed_ops = [INSERT] * typed_count
+        self.typed_to_target = [-1] * typed_count
+        last_target = -1
+        for op, typed_index, target_index in ops:
+            if typed_index >= 0:
+                self.typed_ops[typed_index] = op
+                self.typed_to_target[typed_index] = target_index
+                last_target = max(last_target, target_index)
+
+        # Từ đích phía sau từ gõ cuối cùng là chưa gõ tới, không tính là bỏ sót
+        self.pending = [target_index for op, _, target_index in ops
+                        if op == DELETE and target_index > last_target]
+        self.matches = self.typed_ops.count(MATCH)
+        self.substitutions = self.typed_ops.count(SUBSTITUTE)
+        self.insertions = self.typed_ops.count(INSERT)
+        self.deletions = sum(1 for op in ops if op[0] == DELETE) - len(self.pending)
+
+    def errors(self, include_pending=False):
+        """Các op không khớp; mặc định bỏ qua các từ đích chưa gõ tới"""
+        pending = set() if include_pending else set(self.pending)
+        return [op for op in self.ops
+                if op[0] != MATCH and not (op[0] == DELETE and op[2] in pending)]
+
+
+class WordAligner:
+    """Căn từ gõ với câu đích, khi người dùng gõ thêm chỉ diff lại phần sau tiền tố đã khớp"""
+
+    def __init__(self, target):
+        self.target = tuple(target)
+        self._typed = ()
+        self._ops = []
+
+    def align(self, typed):
+        typed = tuple(typed)
+
+        # Phần đầu không đổi so với lần trước
+        prefix_length = 0
+        for old, new in zip(self._typed, typed):
+            if old != new:
+                break
+            prefix_length += 1
+
+        # Chỉ giữ phần op đầu toàn MATCH thẳng hàng (typed[i] == target[i]) trong phần không đổi:
+        # tiền tố chung luôn nằm trong một alignment tối ưu, các MATCH khác thì không chắc
+        anchor = 0
+        for op, typed_index, target_index in self._ops:
+            if op != MATCH or typed_index != anchor or target_index != anchor or anchor >= prefix_length:
+                break
+            anchor += 1
+        ops = self._ops[:anchor]
+        typed_start = target_start = anchor
+
+        tail = pair_substitutions(myers_diff(typed[typed_start:], self.target[target_start:]))
+        for op, typed_index, target_index in tail:
+            ops.append((
+                op,
+                typed_index + typed_start if typed_index >= 0 else -1,
+                target_index + target_start if target_index >= 0 else -1
+            ))
+
+        self._typed = typed
+        self._ops = ops
+        return WordAlignment(ops, len(typed), len(self.target))
+
+
+def align_words(typed, target):
+    """Căn một lần hai dãy từ đã chuẩn hóa"""
+    return WordAligner(target).align(typed)
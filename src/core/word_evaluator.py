@@ -0,0 +1,138 @@
+import logging
+
+from .textnorm import normalize_token, fold_diacritics
+from .word_matcher import similarity, DEFAULT_NEAR_MISS_THRESHOLD, DEFAULT_SIMILAR_THRESHOLD
+from .word_alignment import WordAligner, MATCH, SUBSTITUTE
+
+logger = logging.getLogger(__name__)
+
+# Trạng thái của từng từ người dùng gõ
+WORD_CORRECT = "correct"
+WORD_NEAR_MISS = "near_miss"    # Sai chính tả nhẹ (>= near_miss_threshold)
+WORD_SIMILAR = "similar"        # Gần giống (>= similar_threshold)
+WORD_WRONG = "wrong"
+
+
+def comparable_words(tokens, fold=False):
+    """Từ đích đã chuẩn hóa của segment, bỏ dấu nếu fold"""
+    if not fold:
+        return tokens.normalized
+    return tuple(fold_diacritics(word) for word in tokens.normalized)
+
+
+class WordEvaluator:
+    """So sánh từ người dùng gõ với từ đích của segment, ghi nhớ kết quả giữa các lần gõ phím"""
+
+    def __init__(self, near_miss_threshold=DEFAULT_NEAR_MISS_THRESHOLD,
+                 similar_threshold=DEFAULT_SIMILAR_THRESHOLD, fold=False):
+        self.near_miss_threshold = near_miss_threshold
+        self.similar_threshold = similar_threshold
+        # Chế độ dễ: bỏ qua dấu thanh/dấu phụ khi so sánh
+        self.fold = fold
+        self.target = None
+        self.target_words = ()
+        self.aligner = None
+        self._states = {}
+        self._normalized = {}
+        self._last = (None, None, None)
+        self._prepared = (None, None)
+
+    def prepare(self, tokens, aligner=None):
+        """Chuẩn bị trước aligner cho segment sắp tới (nhận aligner đã dựng sẵn ở thread prefetch nếu có)"""
+        self._prepared = (tokens, aligner or WordAligner(self.comparable(tokens)))
+
+    def set_target(self, tokens):
+        """Đổi segment đích, xóa kết quả cũ khi segment thay đổi"""
+        if tokens is not self.target:
+            prepared_tokens, prepared_aligner = self._prepared
+            if tokens is None:
+                self.aligner = None
+            elif tokens is prepared_tokens:
+                self.aligner = prepared_aligner
+                self._prepared = (None, None)
+            else:
+                self.aligner = WordAligner(self.comparable(tokens))
+            self.target = tokens
+            self.target_words = self.aligner.target if self.aligner else ()
+            self._states = {}
+            self._last = (None, None, None)
+
+    def set_fold(self, fold):
+        """Bật/tắt bỏ dấu khi so sánh, tính lại toàn bộ kết quả"""
+        if fold != self.fold:
+            self.fold = fold
+            self._normalized = {}
+            self._prepared = (None, None)
+            self.set_target(None)
+
+    def comparable(self, tokens):
+        """Từ đích đã chuẩn hóa dùng để so sánh (đã bỏ dấu nếu bật fold)"""
+        return comparable_words(tokens, self.fold)
+
+    def normalize(self, word):
+        """Chuẩn hóa từ người dùng gõ, chỉ tính lại với từ mới"""
+        normalized = self._normalized.get(word)
+        if normalized is None:
+            if len(self._normalized) > 1000:
+                self._normalized.clear()
+            normalized = self._normalized[word] = normalize_token(word, self.fold)
+        return normalized
+
+    def evaluate(self, index, word):
+        """Trạng thái của từ gõ so với từ đích thứ index, None nếu vượt quá số từ đích"""
+        key = (index, word)
+        state = self._states.get(key)
+        if state is None:
+            if self.target is None or index >= len(self.target_words):
+                return None
+            state = self.classify(self.normalize(word), self.target_words[index])
+            self._states[key] = state
+        return state
+
+    def classify(self, typed, target):
+        """Phân loại từ đã chuẩn hóa theo độ giống với từ đích"""
+        if typed == target:
+            return WORD_CORRECT
+        ratio = similarity(typed, target, self.similar_threshold)
+        if ratio >= self.near_miss_threshold:
+            return WORD_NEAR_MISS
+        if ratio >= self.similar_threshold:
+            return WORD_SIMILAR
+        return WORD_WRONG
+
+    def align(self, words):
+        """Căn các từ đã gõ với câu đích, chỉ tính lại khi nội dung thay đổi"""
+        words = tuple(words)
+        last_words, alignment, states = self._last
+        if words == last_words:
+            return alignment, states
+
+        alignment = self.aligner.align([self.normalize(word) for word in words])
+        states = []
+        for word, op, target_index in zip(words, alignment.typed_ops, alignment.typed_to_target):
+            if op == MATCH:
+                states.append(WORD_CORRECT)
+            elif op == SUBSTITUTE:
+                states.append(self.evaluate(target_index, word))
+            else:
+                # Từ thừa không có trong câu đích
+                states.append(WORD_WRONG)
+        self._last = (words, alignment, states)
+        return alignment, states
+
+    def last_result(self):
+        """(alignment, states) của lần căn từ gần nhất, (None, None) nếu chưa có"""
+        _, alignment, states = self._last
+        return alignment, states
+
+    def evaluate_words(self, words):
+        """Trạng thái của từng từ đã gõ theo kết quả căn từ"""
+        return self.align(words)[1]
+
+    def correct_count(self, words):
+        """Số từ gõ đúng"""
+        return self.align(words)[0].matches
+
+    def count(self, words, state):
+        """Số từ có trạng thái state"""
+        return self.evaluate_words(words).count(state)
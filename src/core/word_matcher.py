@@ -0,0 +1,65 @@
+import logging
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_NEAR_MISS_THRESHOLD = 0.8
+DEFAULT_SIMILAR_THRESHOLD = 0.5
+
+
+def levenshtein(a, b, max_distance=None):
+    """Khoảng cách Levenshtein theo thuật toán bit-parallel của Myers
+
+    Trả về max_distance + 1 ngay khi chắc chắn khoảng cách vượt quá max_distance.
+    """
+    if a == b:
+        return 0
+    # Chuỗi ngắn hơn làm pattern để bitvector nhỏ nhất
+    if len(a) > len(b):
+        a, b = b, a
+    m, n = len(a), len(b)
+    if max_distance is not None and n - m > max_distance:
+        return max_distance + 1
+    if m == 0:
+        return n
+
+    peq = {}
+    for i, char in enumerate(a):
+        peq[char] = peq.get(char, 0) | (1 << i)
+
+    mask = (1 << m) - 1
+    last = 1 << (m - 1)
+    pv = mask
+    mv = 0
+    score = m
+
+    for j, char in enumerate(b):
+        eq = peq.get(char, 0)
+        xv = eq | mv
+        xh = (((eq & pv) + pv) ^ pv) | eq
+        ph = mv | ~(xh | pv)
+        mh = pv & xh
+        if ph & last:
+            score += 1
+        elif mh & last:
+            score -= 1
+        # Mỗi ký tự còn lại của b giảm score nhiều nhất 1
+        if max_distance is not None and score - (n - j - 1) > max_distance:
+            return max_distance + 1
+        ph = (ph << 1) | 1
+        mh <<= 1
+        pv = (mh | ~(xv | ph)) & mask
+        mv = ph & xv & mask
+
+    return score
+
+
+def similarity(a, b, min_ratio=0.0):
+    """Độ giống nhau 1 - distance / độ dài lớn nhất; trả về 0 nếu chắc chắn nhỏ hơn min_ratio"""
+    longest = max(len(a), len(b))
+    if longest == 0:
+        return 1.0
+    max_distance = int(longest * (1 - min_ratio))
+    distance = levenshtein(a, b, max_distance)
+    if distance > max_distance:
+        return 0.0
+    return 1 - distance / longest
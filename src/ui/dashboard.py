@@ -9,6 +9,8 @@ from .statistics_dialog import StatisticsDialog
 from src.core.statistics_manager import StatisticsManager
 from src.core.data_manager import DataManager
 from src.core.progress_manager import ProgressManager
+from src.core.config_manager import ConfigManager
+from src.core.sqlite_storage import create_storage
 import os
 
 logger = logging.getLogger(__name__)
@@ -24,9 +26,13 @@ class Dashboard(QMainWindow):
         
     def init_managers(self):
         """Khởi tạo các manager"""
-        self.data_manager = DataManager()
+        self.config_manager = ConfigManager()
+        self.storage = create_storage(
+            self.config_manager.get_setting("storage_settings", "backend", "sqlite")
+        )
+        self.data_manager = DataManager(self.storage)
         self.statistics_manager = StatisticsManager(self.data_manager)
-        self.progress_manager = ProgressManager()
+        self.progress_manager = ProgressManager(self.storage)
         
     def init_ui(self):
         """Khởi tạo giao diện"""
@@ -152,7 +158,7 @@ class Dashboard(QMainWindow):
     def start_new_practice(self):
         """Bắt đầu phiên luyện tập mới"""
         try:
-            self.transcription_app = TranscriptionApp()
+            self.transcription_app = TranscriptionApp(data_manager=self.data_manager)
             # Thêm transcription app vào stack và chuyển sang nó
             self.stack.addWidget(self.transcription_app)
             self.stack.setCurrentWidget(self.transcription_app)
@@ -203,7 +209,8 @@ class Dashboard(QMainWindow):
             try:
                 self.transcription_app = TranscriptionApp(
                     video_file=self.current_video["video_file"],
-                    subtitle_file=self.current_video["subtitle_file"]
+                    subtitle_file=self.current_video["subtitle_file"],
+                    data_manager=self.data_manager
                 )
                 self.stack.addWidget(self.transcription_app)
                 self.stack.setCurrentWidget(self.transcription_app)
@@ -211,4 +218,15 @@ class Dashboard(QMainWindow):
                 
             except Exception as e:
                 logger.error(f"Error continuing practice: {str(e)}")
-                self.show_error_message("Error", f"Could not continue practice: {str(e)}") 
\ No newline at end of file
+                self.show_error_message("Error", f"Could not continue practice: {str(e)}")
+
+    def closeEvent(self, event):
+        """Lưu phiên luyện tập đang mở rồi đóng storage dùng chung"""
+        try:
+            if getattr(self, 'transcription_app', None) is not None:
+                self.transcription_app.close()
+            if self.storage is not None:
+                self.storage.close()
+        except Exception as e:
+            logger.error(f"Error closing dashboard: {str(e)}")
+        event.accept()
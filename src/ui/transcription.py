@@ -3,7 +3,9 @@ import difflib
 import string
 import json
 import logging
+import time
 import vlc
+from collections import deque
 from textblob import TextBlob
 from datetime import datetime
 
@@ -12,9 +14,9 @@ from PyQt5.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QLabel,
     QFileDialog, QTextEdit, QSpinBox, QDialog, QFormLayout,
     QMenuBar, QMessageBox, QSlider, QShortcut, QSizePolicy,
-    QSplitter, QMenu, QGraphicsOpacityEffect
+    QSplitter, QMenu, QGraphicsOpacityEffect, QInputDialog
 )
-from PyQt5.QtCore import QTimer, Qt, QTime, QSize
+from PyQt5.QtCore import QTimer, Qt, QTime, QSize, QFileSystemWatcher
 from PyQt5.QtGui import QKeySequence
 
 import sys
@@ -22,7 +24,22 @@ import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from core.video import VideoProcessor
+from core.subtitle_cache import SubtitleCache
+from core.subtitle_cleanup import SubtitleCleaner
+from core.subtitle_extractor import SubtitleExtractor, EMBEDDED_SUBTITLE_CONTAINERS
+from core.subtitle_reload import SubtitleReloader, reconcile, remap_position
+from core.subtitle_alignment import load_alignment
+from core.timing_repair import TimingRepairer
+from core.timeline_index import TimelineIndex
+from core.word_evaluator import WordEvaluator, WORD_CORRECT, WORD_NEAR_MISS
+from core.word_alignment import SUBSTITUTE, INSERT
+from core.keystroke_journal import KeystrokeJournal, analyze_keystrokes, source_id
+from core.segment_prefetch import SegmentPrefetcher
+from core.latency import latency_recorder, timed
+from core.textnorm import normalize_text
 from core.session_manager import SessionManager
+from core.sqlite_storage import create_storage
+from core.persistence import PersistenceWorker
 from core.config_manager import ConfigManager
 from core.statistics_manager import StatisticsManager
 from core.achievement_manager import AchievementManager
@@ -36,6 +53,8 @@ from src.ui.video_player import VideoPlayer
 from src.ui.video_controls import VideoControls
 from core.note_manager import NoteManager
 from src.ui.note_dialog import NoteDialog
+from src.ui.word_highlighter import WordHighlighter
+from src.ui.ui_update_scheduler import UiUpdateScheduler, StatusLabel
 
 logger = logging.getLogger(__name__)
 
@@ -46,18 +65,50 @@ class CustomTextEdit(QTextEdit):
         self.parent_app = parent
         self.setAcceptRichText(False)
         self.ctrl_pressed = False
-        self.is_updating = False
         self.current_word_index = 0
+        # Kết quả so sánh từng từ được giữ giữa các lần gõ phím, màu do highlighter tô
+        config_manager = getattr(parent, 'config_manager', None)
+        if config_manager:
+            self.evaluator = WordEvaluator(
+                config_manager.get_setting("practice_settings", "near_miss_threshold", 0.8),
+                config_manager.get_setting("practice_settings", "similar_threshold", 0.5),
+                config_manager.get_setting("practice_settings", "fold_diacritics", False)
+            )
+        else:
+            self.evaluator = WordEvaluator()
+        self.highlighter = WordHighlighter(self.document(), self.evaluator, self.current_target)
+        if config_manager:
+            self.highlighter.char_diff = config_manager.get_setting("practice_settings", "char_diff", False)
+        # Trạng thái gõ bằng bộ gõ (Telex/VNI/IME): đang có preedit thì chưa chấm điểm
+        self.composing = False
+        self.skipped_evaluations = 0
+        # Ghi lại từng phím của segment hiện tại
+        self.journal = KeystrokeJournal()
         self.textChanged.connect(self.on_text_changed)
         
     def normalize_text(self, text):
         """Chuẩn hóa text: bỏ dấu câu, chuyển về chữ thường"""
-        punctuation = '!()-[]{};:\'",<>./?@#$%^&*_~'
-        for char in punctuation:
-            text = text.replace(char, '')
-        return ' '.join(text.lower().split())
+        return normalize_text(text, self.evaluator.fold)
+
+    def normalize_typed_word(self, word):
+        """Chuẩn hóa từ người dùng gõ, chỉ tính lại với từ mới"""
+        return self.evaluator.normalize(word)
+
+    def target_tokens(self):
+        """Lấy các từ đích đã tách và chuẩn hóa sẵn của segment hiện tại"""
+        return self.parent_app.segments.tokens(self.parent_app.current_segment_index - 1)
 
+    def current_target(self):
+        """Từ đích của segment hiện tại, None nếu chưa load phụ đề"""
+        if not self.parent_app or not getattr(self.parent_app, 'segments', None):
+            return None
+        return self.target_tokens()
+
+    @timed("keyPressEvent")
     def keyPressEvent(self, event):
+        text = event.text()
+        self.journal.record(event.key(), self.textCursor().position(), bool(text) and text.isprintable())
+
         # Xử lý phím Shift để hiện từ tiếp theo
         if event.key() == Qt.Key_Shift:
             self.reveal_next_word()
@@ -77,14 +128,14 @@ class CustomTextEdit(QTextEdit):
 
         # Xử lý phím Enter như cũ
         if event.key() == Qt.Key_Return:
-            current_text = self.toPlainText().strip()
-            target_text = self.parent_app.segments[self.parent_app.current_segment_index - 1]["text"]
+            current_words = self.toPlainText().split()
+            tokens = self.target_tokens()
             
-            if current_text == target_text:
+            if current_words == list(tokens.words):
                 self.parent_app.next_segment()
                 return
                 
-            self.setText(target_text)
+            self.setText(' '.join(tokens.words))
             cursor = self.textCursor()
             cursor.movePosition(QTextCursor.End)
             self.setTextCursor(cursor)
@@ -94,31 +145,57 @@ class CustomTextEdit(QTextEdit):
         if event.key() == Qt.Key_Space:
             if self.parent_app and self.parent_app.segments:
                 current_text = self.toPlainText().strip()
-                target_text = self.parent_app.segments[self.parent_app.current_segment_index - 1]["text"]
-                if len(current_text.split()) == len(target_text.split()):
+                if len(current_text.split()) == len(self.target_tokens().words):
                     return
 
         super().keyPressEvent(event)
 
+    def inputMethodEvent(self, event):
+        """Theo dõi trạng thái preedit của bộ gõ, chỉ chấm điểm khi chữ đã được commit"""
+        was_composing = self.composing
+        self.composing = bool(event.preeditString())
+        self.highlighter.paused = self.composing
+        # Chữ commit qua bộ gõ không đi qua keyPressEvent, ghi vào journal ở đây
+        commit = event.commitString()
+        if commit:
+            self.journal.record_text(commit, self.textCursor().position())
+        super().inputMethodEvent(event)
+
+        if was_composing and not self.composing:
+            logger.debug(f"Skipped evaluations during composition: {self.skipped_evaluations}")
+            if not event.commitString():
+                # Hủy composition: văn bản không đổi nên textChanged không chấm lại
+                self.highlighter.rehighlight()
+                self.on_text_changed()
+
     def reveal_next_word(self):
         """Hiện từ tiếp theo đúng"""
         try:
             current_text = self.toPlainText().strip()
-            target_text = self.parent_app.segments[self.parent_app.current_segment_index - 1]["text"]
+            tokens = self.target_tokens()
             
             current_words = current_text.split()
-            target_words = target_text.split()
+            target_words = tokens.words
+            self.evaluator.set_target(tokens)
+            alignment, _ = self.evaluator.align(current_words)
             
-            # Tìm từ tiếp theo chưa đúng
-            for i, (current_word, target_word) in enumerate(zip(current_words, target_words)):
-                if self.normalize_text(current_word) != self.normalize_text(target_word):
-                    # Thay thế từ hiện tại bằng từ đúng
-                    current_words[i] = target_word
-                    break
-            else:
+            # Sửa lỗi đầu tiên theo kết quả căn từ
+            errors = alignment.errors()
+            if errors:
+                op, typed_index, target_index = errors[0]
+                if op == SUBSTITUTE:
+                    # Thay thế từ gõ sai bằng từ đúng
+                    current_words[typed_index] = target_words[target_index]
+                elif op == INSERT:
+                    # Bỏ từ thừa
+                    del current_words[typed_index]
+                else:
+                    # Chèn từ bị bỏ sót vào đúng vị trí
+                    position = sum(1 for index in alignment.typed_to_target if 0 <= index < target_index)
+                    current_words.insert(position, target_words[target_index])
+            elif alignment.pending:
                 # Nếu tất cả các từ hiện tại đều đúng, thêm từ tiếp theo
-                if len(current_words) < len(target_words):
-                    current_words.append(target_words[len(current_words)])
+                current_words.append(target_words[alignment.pending[0]])
             
             # Cập nhật text
             self.setText(' '.join(current_words))
@@ -129,57 +206,36 @@ class CustomTextEdit(QTextEdit):
         except Exception as e:
             logger.error(f"Error revealing next word: {str(e)}")
 
+    @timed("on_text_changed")
     def on_text_changed(self):
-        if self.is_updating:
-            return
-
+        """Cập nhật số từ đúng, màu của từng từ do WordHighlighter tô"""
         try:
             if not self.parent_app or not self.parent_app.segments:
                 return
 
-            self.is_updating = True
+            if self.composing:
+                # Chữ đang soạn chưa phải kết quả cuối cùng
+                self.skipped_evaluations += 1
+                return
+
             current_text = self.toPlainText()
-            target_text = self.parent_app.segments[self.parent_app.current_segment_index - 1]["text"]
+            tokens = self.target_tokens()
+            self.evaluator.set_target(tokens)
 
-            # Tách thành từng từ
+            # Tách thành từng từ (từ đích đã được tách sẵn khi load phụ đề)
             current_words = current_text.split()
-            target_words = target_text.split()
-
-            # Reset format
-            cursor = self.textCursor()
-            cursor.select(QTextCursor.Document)
-            cursor.setCharFormat(QTextCharFormat())
-
-            # Highlight từng từ
-            cursor.setPosition(0)
-            pos = 0
-            correct_count = 0
-            
-            for i, current_word in enumerate(current_words):
-                if i >= len(target_words):
-                    break
-
-                word_format = QTextCharFormat()
-                if self.normalize_text(current_word) == self.normalize_text(target_words[i]):
-                    word_format.setForeground(QColor("green"))
-                    correct_count += 1
-                else:
-                    word_format.setForeground(QColor("red"))
-
-                cursor.setPosition(pos)
-                cursor.setPosition(pos + len(current_word), QTextCursor.KeepAnchor)
-                cursor.setCharFormat(word_format)
-
-                pos += len(current_word) + 1
+            target_words = tokens.words
 
             # Cập nhật word count trong 2 trường hợp:
             # 1. Khi gõ xong từ (có space hoặc enter) cho các từ không phải từ cuối
             # 2. Khi từ cuối cùng đc gõ đúng
+            alignment, states = self.evaluator.align(current_words)
             if (current_text.endswith(' ') or current_text.endswith('\n')) or \
                (len(current_words) == len(target_words) and \
                 len(current_words) > 0 and \
-                self.normalize_text(current_words[-1]) == self.normalize_text(target_words[-1])):
+                states[-1] == WORD_CORRECT):
                 
+                correct_count = alignment.matches
                 total_words = len(target_words)
                 accuracy = (correct_count / total_words * 100) if total_words > 0 else 0
                 self.parent_app.word_count_widget.update_count(
@@ -191,9 +247,6 @@ class CustomTextEdit(QTextEdit):
         except Exception as e:
             logger.error(f"Error handling text changed: {str(e)}")
 
-        finally:
-            self.is_updating = False
-
     def keyReleaseEvent(self, event):
         """Xử lý sự kiện th phím"""
         if event.key() == Qt.Key_Control:
@@ -219,10 +272,10 @@ class CustomTextEdit(QTextEdit):
             
         menu.exec_(event.globalPos())
 
-class WordCountWidget(QLabel):
+class WordCountWidget(StatusLabel):
     """Widget hiển thị số từ và độ chính xác"""
-    def __init__(self, parent=None):
-        super().__init__(parent)
+    def __init__(self, parent=None, scheduler=None):
+        super().__init__(parent, scheduler)
         self.setAlignment(Qt.AlignRight)
         self.setStyleSheet("""
             QLabel {
@@ -234,19 +287,23 @@ class WordCountWidget(QLabel):
         """)
         self.update_count(0, 0, 0)
         
+    @timed("WordCountWidget.update_count")
     def update_count(self, correct: int, total: int, accuracy: float):
         """Cập nhật số từ và độ chính xác"""
+        self.post(self.format_count, correct, total, accuracy)
+
+    def format_count(self, correct, total, accuracy):
         progress = "░" * 20  # Thanh progress mặc định
         if total > 0:
             filled = int((correct / total) * 20)
             progress = "█" * filled + "░" * (20 - filled)
         
-        self.setText(f"Words: {correct}/{total} [{progress}] {accuracy:.1f}%")
+        return f"Words: {correct}/{total} [{progress}] {accuracy:.1f}%"
 
-class SegmentCountWidget(QLabel):
+class SegmentCountWidget(StatusLabel):
     """Widget hiển thị số segment đã hoàn thành"""
-    def __init__(self, parent=None):
-        super().__init__(parent)
+    def __init__(self, parent=None, scheduler=None):
+        super().__init__(parent, scheduler)
         self.setStyleSheet("""
             QLabel {
                 background-color: #3d3d3d;
@@ -260,7 +317,10 @@ class SegmentCountWidget(QLabel):
         
     def update_count(self, current, total, progress):
         """Cập nhật số segment đã hoàn thành"""
-        self.setText(f"Segments: {current}/{total} [{current}/{total}] {progress:.1f}%")
+        self.post(self.format_count, current, total, progress)
+
+    def format_count(self, current, total, progress):
+        return f"Segments: {current}/{total} [{current}/{total}] {progress:.1f}%"
 
 class FloatingTextEdit(CustomTextEdit):
     """Widget nhập liệu nổi trên video"""
@@ -362,18 +422,28 @@ class FloatingTextEdit(CustomTextEdit):
         menu.exec_(self.mapToGlobal(pos))
 
 class TranscriptionApp(QWidget):
-    def __init__(self, video_file=None, subtitle_file=None):
+    def __init__(self, video_file=None, subtitle_file=None, data_manager=None):
         super().__init__()
+        # Dashboard truyền DataManager của nó vào để dùng chung storage và repository sessions
+        self.shared_data_manager = data_manager
         # Khởi tạo các thuộc tính
         self.video_file = video_file
         self.subtitle_file = subtitle_file
         self.video_file = video_file
         self.subtitle_file = subtitle_file
         self.segments = None
+        self.timeline = None
+        # File video đang dò track phụ đề (ffprobe chạy nền)
+        self.probing_video_file = None
+        self.native_file = None
+        self.native_alignment = None
+        self.speech_edges = None
         self.current_segment_index = 1
         self.current_segment_index = 1
         self.timer = QTimer()
         self.segment_timer = QTimer()
+        self.segment_timer.setSingleShot(True)
+        self.segment_timer.timeout.connect(self.pause_segment)
         
         # Khởi tạo managers và UI
         self.init_managers()
@@ -399,15 +469,60 @@ class TranscriptionApp(QWidget):
         try:
             # Khởi tạo theo thứ tự phụ thuộc
             self.config_manager = ConfigManager()  # Khởi tạo config_manager trước
-            self.session_manager = SessionManager()
-            self.data_manager = DataManager()
-            self.statistics_manager = StatisticsManager(self.data_manager)
+            if self.shared_data_manager is not None:
+                self.data_manager = self.shared_data_manager
+                self.storage = self.data_manager.storage
+            else:
+                # Backend lưu trữ: "sqlite" (một database WAL) hoặc "json" (các file JSON như cũ)
+                self.storage = create_storage(
+                    self.config_manager.get_setting("storage_settings", "backend", "sqlite")
+                )
+                self.data_manager = DataManager(self.storage)
+            # Ghi progress/statistics ở thread nền, các lần lưu liên tiếp được gộp lại
+            self.persistence = PersistenceWorker()
+            self.session_manager = SessionManager(self.data_manager)
+            self.statistics_manager = StatisticsManager(self.data_manager, self.persistence)
             self.achievement_manager = AchievementManager(self.statistics_manager)
-            self.progress_manager = ProgressManager()
+            self.progress_manager = ProgressManager(self.storage, self.persistence)
             self.backup_manager = BackupManager(self.config_manager)  # Truyền config_manager vào
             self.validation_manager = ValidationManager()
             self.video_converter = VideoConverter()
             self.note_manager = NoteManager()
+            subtitle_cache_dir = self.config_manager.get_setting(
+                "cache_settings", "subtitle_cache_dir", "data/cache/subtitles"
+            )
+            self.subtitle_cache = SubtitleCache(
+                subtitle_cache_dir,
+                max_size_mb=self.config_manager.get_setting("cache_settings", "subtitle_cache_max_mb", 64)
+            )
+            self.subtitle_cleaner = SubtitleCleaner(
+                self.config_manager.config.get("subtitle_settings")
+            )
+            self.subtitle_extractor = SubtitleExtractor(subtitle_cache_dir)
+            self.subtitle_extractor.streams_listed.connect(self.on_subtitle_streams_listed)
+            self.subtitle_extractor.extraction_finished.connect(self.on_subtitle_extracted)
+            self.subtitle_extractor.extraction_failed.connect(self.on_subtitle_extraction_failed)
+
+            # Căn thời gian phát của cue theo giọng nói thật trong audio
+            self.playback_settings = self.config_manager.config.get("playback_settings", {})
+            self.timing_repairer = TimingRepairer(self.subtitle_cache, self.playback_settings)
+            self.timing_repairer.edges_ready.connect(self.on_speech_edges_ready)
+
+            # Theo dõi file phụ đề để reload khi được sửa trong lúc học
+            self.subtitle_reloader = None
+            self.subtitle_watcher = QFileSystemWatcher(self)
+            self.subtitle_watcher.fileChanged.connect(self.on_subtitle_file_changed)
+            self.subtitle_reload_timer = QTimer(self)
+            self.subtitle_reload_timer.setSingleShot(True)
+            self.subtitle_reload_timer.setInterval(300)
+            self.subtitle_reload_timer.timeout.connect(self.reload_subtitles)
+
+            # Chuẩn bị trước segment kế tiếp trong lúc đang gõ segment hiện tại
+            self.segment_prefetcher = None
+
+            # Thời gian từ lúc chuyển segment tới khi VLC phát frame đầu tiên (ms)
+            self.switch_started_ns = None
+            self.switch_latencies = deque(maxlen=100)
             
             # Thiết lập error handler cho session manager
             self.session_manager.error_handler = self.show_error_message
@@ -452,18 +567,47 @@ class TranscriptionApp(QWidget):
         status_container = QWidget()
         status_layout = QHBoxLayout(status_container)
         
+        # Các widget trạng thái cập nhật tối đa một lần mỗi frame
+        self.ui_scheduler = UiUpdateScheduler(parent=self)
+        
         # Thêm segment count widget
-        self.segment_count_widget = SegmentCountWidget()
+        self.segment_count_widget = SegmentCountWidget(scheduler=self.ui_scheduler)
         status_layout.addWidget(self.segment_count_widget)
         
         # Thêm word count widget
-        self.word_count_widget = WordCountWidget()
+        self.word_count_widget = WordCountWidget(scheduler=self.ui_scheduler)
         status_layout.addWidget(self.word_count_widget)
         
         left_layout.addWidget(status_container)
+
+        # Phụ đề tiếng mẹ đẻ của segment hiện tại, chỉ hiện khi người dùng bật
+        self.native_label = QLabel()
+        self.native_label.setAlignment(Qt.AlignCenter)
+        self.native_label.setWordWrap(True)
+        self.native_label.hide()
+        left_layout.addWidget(self.native_label)
+
+        # Overlay độ trễ của vòng gõ phím, nổi ở góc trên video
+        self.latency_label = QLabel(video_container)
+        self.latency_label.setStyleSheet("""
+            QLabel {
+                background-color: rgba(0, 0, 0, 160);
+                color: #9cff9c;
+                font-family: monospace;
+                font-size: 11px;
+                padding: 4px;
+            }
+        """)
+        self.latency_label.move(10, 10)
+        self.latency_label.hide()
+        self.latency_timer = QTimer(self)
+        self.latency_timer.setInterval(500)
+        self.latency_timer.timeout.connect(self.update_latency_overlay)
         
         # Text edit nổi trên video - Sửa lại parent
         self.text_edit = FloatingTextEdit(self)  # Truyền self thay vì video_container
+        # Ghi keystroke journal ở thread nền, không chặn GUI khi chuyển segment
+        self.text_edit.journal.writer = self.persistence
         self.text_edit.setParent(video_container)  # Đặt parent widget là video_container
         self.text_edit.parent_app = self  # Thêm reference đến TranscriptionApp
         self.text_edit.show()
@@ -487,6 +631,9 @@ class TranscriptionApp(QWidget):
         
         self.setLayout(main_layout)
 
+        if self.latency_action.isChecked():
+            self.set_latency_overlay(True)
+
     def on_container_resize(self, event):
         """Xử lý khi container thay đổi kích thước"""
         if hasattr(self, 'text_edit'):
@@ -514,6 +661,9 @@ class TranscriptionApp(QWidget):
         open_action = file_menu.addAction("Open Files")
         open_action.triggered.connect(self.load_files)
         
+        native_action = file_menu.addAction("Open Native Subtitles")
+        native_action.triggered.connect(self.load_native_subtitles)
+        
         save_action = file_menu.addAction("Save Progress")
         save_action.triggered.connect(self.save_progress)
         
@@ -523,12 +673,43 @@ class TranscriptionApp(QWidget):
         stats_action = view_menu.addAction("Statistics")
         stats_action.triggered.connect(self.show_statistics)
         
+        self.show_native_action = view_menu.addAction("Show Native Subtitle")
+        self.show_native_action.setCheckable(True)
+        self.show_native_action.setShortcut("Ctrl+T")
+        self.show_native_action.toggled.connect(self.update_native_subtitle)
+        
+        char_diff_action = view_menu.addAction("Character Diff")
+        char_diff_action.setCheckable(True)
+        char_diff_action.setChecked(
+            self.config_manager.get_setting("practice_settings", "char_diff", False)
+        )
+        char_diff_action.toggled.connect(self.set_char_diff)
+        
+        fold_action = view_menu.addAction("Ignore Diacritics")
+        fold_action.setCheckable(True)
+        fold_action.setChecked(
+            self.config_manager.get_setting("practice_settings", "fold_diacritics", False)
+        )
+        fold_action.toggled.connect(self.set_fold_diacritics)
+        
+        # Overlay được tạo sau menu, init_ui bật lại theo trạng thái đã lưu
+        self.latency_action = view_menu.addAction("Latency Overlay")
+        self.latency_action.setCheckable(True)
+        self.latency_action.setShortcut("Ctrl+L")
+        self.latency_action.setChecked(
+            self.config_manager.get_setting("debug_settings", "latency_overlay", False)
+        )
+        self.latency_action.toggled.connect(self.set_latency_overlay)
+        
         # Menu Help
         help_menu = menu_bar.addMenu("Help")
         
         about_action = help_menu.addAction("About")
         about_action.triggered.connect(self.show_about)
         
+        latency_export_action = help_menu.addAction("Export Latency Report")
+        latency_export_action.triggered.connect(self.export_latency_report)
+        
         # Add Notes menu
         notes_menu = menu_bar.addMenu("Notes")
         
@@ -590,10 +771,26 @@ class TranscriptionApp(QWidget):
             if not video_file:
                 return False
 
+            # Ưu tiên track phụ đề có sẵn trong file video; ffprobe chạy nền, chọn track khi có kết quả
+            if Path(video_file).suffix.lower() in EMBEDDED_SUBTITLE_CONTAINERS:
+                self.probing_video_file = video_file
+                self.subtitle_extractor.list_in_background(video_file)
+                return True
+
+            return self.open_with_external_subtitles(video_file)
+
+        except Exception as e:
+            logger.error(f"Error loading files: {str(e)}")
+            self.show_error_message("Error", f"Could not load files: {str(e)}")
+            return False
+
+    def open_with_external_subtitles(self, video_file):
+        """Chọn file phụ đề ngoài rồi load cùng video"""
+        try:
             # Chọn file phụ đề
             subtitle_file, _ = QFileDialog.getOpenFileName(
                 self, "Open Subtitle File", "", 
-                "Subtitle Files (*.srt)"
+                "Subtitle Files (*.srt *.vtt *.ass *.ssa)"
             )
             if not subtitle_file:
                 return False
@@ -618,6 +815,84 @@ class TranscriptionApp(QWidget):
             self.show_error_message("Error", f"Could not load files: {str(e)}")
             return False
 
+    def on_subtitle_streams_listed(self, video_file, tracks):
+        """Có danh sách track phụ đề trong video: cho chọn track hoặc file phụ đề ngoài"""
+        if video_file != self.probing_video_file:
+            # Người dùng đã mở file khác trong lúc đang dò track
+            return
+        self.probing_video_file = None
+
+        try:
+            track = self.choose_embedded_track(tracks)
+            if track is None:
+                self.open_with_external_subtitles(video_file)
+                return
+
+            # Bỏ bảng segment của video cũ trước khi tách track cho video mới
+            self.clear_subtitles()
+            self.video_file = video_file
+            self.subtitle_file = None
+            if not self.load_video():
+                raise Exception("Failed to load video")
+            self.subtitle_extractor.extract_in_background(video_file, track)
+
+        except Exception as e:
+            logger.error(f"Error loading files: {str(e)}")
+            self.show_error_message("Error", f"Could not load files: {str(e)}")
+
+    def choose_embedded_track(self, tracks):
+        """Cho người dùng chọn track phụ đề trong file video, trả về None nếu dùng file ngoài"""
+        if not tracks:
+            return None
+
+        items = [SubtitleExtractor.describe_track(track) for track in tracks]
+        items.append("Open external subtitle file...")
+        item, ok = QInputDialog.getItem(
+            self, "Subtitle Track", "Choose a subtitle track:", items, 0, False
+        )
+        if not ok or item not in items[:-1]:
+            return None
+        return tracks[items.index(item)]
+
+    def clear_subtitles(self):
+        """Bỏ bảng segment và các trạng thái đi kèm (khi đổi sang video chưa có phụ đề)"""
+        self.flush_keystrokes()
+        if self.segment_prefetcher:
+            self.segment_prefetcher.clear()
+        self.segments = None
+        self.timeline = None
+        self.segment_prefetcher = None
+        self.speech_edges = None
+        self.native_file = None
+        self.native_alignment = None
+        self.subtitle_reloader = None
+        watched = self.subtitle_watcher.files()
+        if watched:
+            self.subtitle_watcher.removePaths(watched)
+        self.current_segment_index = 1
+        self.text_edit.clear()
+        self.update_button_states()
+
+    def on_subtitle_extracted(self, video_file, subtitle_file):
+        """Load phụ đề sau khi tách track xong ở thread nền"""
+        if video_file != str(self.video_file):
+            # Kết quả của video người dùng đã đóng
+            return
+        try:
+            self.subtitle_file = subtitle_file
+            if not self.load_subtitles():
+                raise Exception("Failed to load subtitles")
+            self.load_progress()
+        except Exception as e:
+            logger.error(f"Error loading extracted subtitles: {str(e)}")
+            self.show_error_message("Error", f"Could not load subtitles: {str(e)}")
+
+    def on_subtitle_extraction_failed(self, video_file, error):
+        """Thông báo lỗi tách track phụ đề"""
+        if video_file != str(self.video_file):
+            return
+        self.show_error_message("Error", f"Could not extract subtitle track: {error}")
+
     def show_message(self, title: str, message: str):
         """Hiển thị thông báo"""
         QMessageBox.information(self, title, message)
@@ -650,6 +925,10 @@ class TranscriptionApp(QWidget):
                 self.player.set_hwnd(self.video_frame.winId())
             elif sys.platform == "darwin":
                 self.player.set_nsobject(int(self.video_frame.winId()))
+
+            self.player.event_manager().event_attach(
+                vlc.EventType.MediaPlayerTimeChanged, self.on_player_time_changed
+            )
             
             
             return True
@@ -669,18 +948,24 @@ class TranscriptionApp(QWidget):
                 return False
                 
             # Tải phụ đề
-            self.video_processor = VideoProcessor()
+            self.video_processor = VideoProcessor(self.subtitle_cache, self.subtitle_cleaner)
             self.segments = self.video_processor.load_subtitles(self.subtitle_file)
             if not self.segments:
                 raise Exception("No segments found in subtitle file")
+            self.timeline = TimelineIndex(self.segments)
+            self.native_file = None
+            self.native_alignment = None
+            self.watch_subtitle_file()
+            self.repair_timing()
+            self.segment_prefetcher = SegmentPrefetcher(
+                self.segments, self.text_edit.evaluator, self.timing_repairer.settings["tail_ms"]
+            )
+            self.text_edit.journal.reset()
             
             # Đặt vị trí video tại segment đầu tiên
-            if self.segments:
-                self.current_segment_index = 1
-                self.play_current_segment()
-                
-                self.current_segment_index = 1
-                self.play_current_segment()
+            self.current_segment_index = 1
+            self.play_current_segment()
+            self.prefetch_next_segment()
                 
             # Cập nhật segment count
             total_segments = len(self.segments)
@@ -689,6 +974,7 @@ class TranscriptionApp(QWidget):
                 total_segments,
                 (self.current_segment_index / total_segments * 100)
             )
+            self.video_controls.update_timer.start()
             
             return True
             
@@ -696,6 +982,192 @@ class TranscriptionApp(QWidget):
             logger.error(f"Error loading subtitles: {str(e)}")
             return False
 
+    def load_native_subtitles(self):
+        """Chọn track phụ đề tiếng mẹ đẻ và ghép với track đang học"""
+        try:
+            if not self.segments:
+                self.show_message("Info", "Please open a video and its subtitles first")
+                return False
+
+            native_file, _ = QFileDialog.getOpenFileName(
+                self, "Open Native Subtitle File", "",
+                "Subtitle Files (*.srt *.vtt *.ass *.ssa)"
+            )
+            if not native_file:
+                return False
+
+            native = self.video_processor.load_subtitles(native_file)
+            if not native:
+                raise Exception("No segments found in subtitle file")
+
+            self.native_file = native_file
+            self.native_alignment = load_alignment(
+                self.subtitle_cache, self.subtitle_file, native_file, self.segments, native
+            )
+            self.show_native_action.setChecked(True)
+            self.update_native_subtitle()
+            return True
+
+        except Exception as e:
+            logger.error(f"Error loading native subtitles: {str(e)}")
+            self.show_error_message("Error", f"Could not load native subtitles: {str(e)}")
+            return False
+
+    def update_native_subtitle(self):
+        """Hiện phụ đề tiếng mẹ đẻ ghép với segment hiện tại"""
+        if not self.native_alignment or not self.show_native_action.isChecked():
+            self.native_label.hide()
+            return
+        self.native_label.setText(
+            self.native_alignment.paired_text(self.current_segment_index - 1)
+        )
+        self.native_label.show()
+
+    def repair_timing(self):
+        """Phân tích audio ở thread nền để căn start/end của cue theo giọng nói"""
+        self.speech_edges = None
+        if self.video_file and self.timing_repairer.settings.get("timing_repair", True):
+            self.timing_repairer.analyze_in_background(self.video_file)
+
+    def on_speech_edges_ready(self, media_file, edges):
+        """Gán thời gian phát đã sửa khi phân tích audio xong"""
+        if media_file != str(self.video_file) or not self.segments:
+            # Người dùng đã mở file khác trong lúc đang phân tích
+            return
+        self.speech_edges = edges
+        self.timing_repairer.repair(self.segments, edges)
+        # Thời điểm seek đã chuẩn bị theo timing cũ
+        self.segment_prefetcher.clear()
+        self.prefetch_next_segment()
+        logger.info("Subtitle timing repaired from audio")
+
+    def segment_play_range(self, position):
+        """Khoảng thời gian phát của segment"""
+        return self.segments.playback_range(position, self.timing_repairer.settings["tail_ms"])
+
+    def set_char_diff(self, enabled):
+        """Bật/tắt tô màu từng ký tự cho từ gõ sai"""
+        self.text_edit.highlighter.set_char_diff(enabled)
+        self.config_manager.update_setting("practice_settings", "char_diff", enabled)
+
+    def set_fold_diacritics(self, enabled):
+        """Bật/tắt chế độ dễ: từ gõ thiếu dấu vẫn được tính đúng"""
+        self.text_edit.evaluator.set_fold(enabled)
+        if self.segment_prefetcher:
+            self.segment_prefetcher.clear()
+            self.prefetch_next_segment()
+        self.text_edit.highlighter.rehighlight()
+        self.text_edit.on_text_changed()
+        self.config_manager.update_setting("practice_settings", "fold_diacritics", enabled)
+
+    def set_latency_overlay(self, enabled):
+        """Bật/tắt đo độ trễ và overlay hiển thị p50/p95/p99"""
+        latency_recorder.enabled = enabled
+        if enabled:
+            self.update_latency_overlay()
+            self.latency_label.show()
+            self.latency_label.raise_()
+            self.latency_timer.start()
+        else:
+            self.latency_timer.stop()
+            self.latency_label.hide()
+        self.config_manager.update_setting("debug_settings", "latency_overlay", enabled)
+
+    def update_latency_overlay(self):
+        """Cập nhật nội dung overlay độ trễ"""
+        lines = [f"{'span':<28} {'n':>6} {'p50':>7} {'p95':>7} {'p99':>7}"]
+        for name, stats in latency_recorder.summary().items():
+            lines.append(
+                f"{name:<28} {stats['count']:>6} {stats['p50_ms']:>7.2f} "
+                f"{stats['p95_ms']:>7.2f} {stats['p99_ms']:>7.2f}"
+            )
+        lines.append(f"skipped evaluations (IME): {self.text_edit.skipped_evaluations}")
+        self.latency_label.setText("\n".join(lines))
+        self.latency_label.adjustSize()
+
+    def export_latency_report(self):
+        """Xuất số liệu độ trễ ra file JSON"""
+        export_file, _ = QFileDialog.getSaveFileName(
+            self, "Export Latency Report", "latency_report.json", "JSON Files (*.json)"
+        )
+        if not export_file:
+            return False
+        extra = {
+            "recording": latency_recorder.enabled,
+            "switch_latencies_ms": [round(latency, 3) for latency in self.switch_latencies],
+            "skipped_evaluations": self.text_edit.skipped_evaluations
+        }
+        if not latency_recorder.export(export_file, extra):
+            self.show_error_message("Error", "Could not export latency report")
+            return False
+        self.show_message("Success", f"Latency report saved to {export_file}")
+        return True
+
+    def watch_subtitle_file(self):
+        """Bắt đầu theo dõi file phụ đề hiện tại"""
+        watched = self.subtitle_watcher.files()
+        if watched:
+            self.subtitle_watcher.removePaths(watched)
+        self.subtitle_watcher.addPath(self.subtitle_file)
+        self.subtitle_reloader = SubtitleReloader(self.subtitle_file, self.subtitle_cleaner)
+        self.subtitle_reloader.prime()
+
+    def on_subtitle_file_changed(self, path):
+        """File phụ đề bị sửa: chờ editor ghi xong rồi mới reload"""
+        # Nhiều editor lưu bằng cách thay file mới, watcher sẽ mất path cũ
+        if path not in self.subtitle_watcher.files() and os.path.exists(path):
+            self.subtitle_watcher.addPath(path)
+        self.subtitle_reload_timer.start()
+
+    def reload_subtitles(self):
+        """Đọc lại file phụ đề đã sửa, giữ nguyên vị trí học và dữ liệu từng segment"""
+        try:
+            if not self.subtitle_reloader or not self.segments:
+                return False
+
+            table = self.subtitle_reloader.load()
+            if not table:
+                # File có thể đang được ghi dở, lần thay đổi sau sẽ reload lại
+                return False
+
+            mapping = reconcile(self.segments, table)
+            position = remap_position(mapping, self.current_segment_index - 1)
+
+            self.segments = table
+            self.timeline = TimelineIndex(table)
+            self.segment_prefetcher = SegmentPrefetcher(
+                table, self.text_edit.evaluator, self.timing_repairer.settings["tail_ms"]
+            )
+            self.current_segment_index = min(position, len(table) - 1) + 1
+            self.session_manager.remap_segments(mapping)
+            if self.speech_edges:
+                self.timing_repairer.repair(table, self.speech_edges)
+            if self.native_alignment:
+                self.native_alignment = load_alignment(
+                    self.subtitle_cache, self.subtitle_file, self.native_file,
+                    table, self.native_alignment.native
+                )
+            self.subtitle_cache.put(
+                self.subtitle_cache.key_for(self.subtitle_file, self.subtitle_cleaner.signature()),
+                table
+            )
+
+            # Tính lại phạm vi timeline quanh segment hiện tại và màu của các từ đã gõ
+            self.video_controls.slider_position = None
+            self.text_edit.highlighter.rehighlight()
+            self.segment_count_widget.update_count(
+                self.current_segment_index,
+                len(table),
+                (self.current_segment_index / len(table) * 100)
+            )
+            self.prefetch_next_segment()
+            logger.info(f"Subtitles reloaded: segment {self.current_segment_index}")
+            return True
+
+        except Exception as e:
+            logger.error(f"Error reloading subtitles: {str(e)}")
+            return False
+
     def check_transcription(self):
         """Kiểm tra kết quả gõ phụ đề"""
         try:
@@ -703,16 +1175,18 @@ class TranscriptionApp(QWidget):
                 return None
             
             current_text = self.text_edit.toPlainText().strip()
-            correct_text = self.segments[self.current_segment_index - 1]["text"]
+            tokens = self.segments.tokens(self.current_segment_index - 1)
             
             # Tính số từ đúng và accuracy
             current_words = current_text.split()
-            correct_words = correct_text.split()
             
-            correct_count = sum(1 for c, t in zip(current_words, correct_words) 
-                              if self.normalize_text(c) == self.normalize_text(t))
+            evaluator = self.text_edit.evaluator
+            evaluator.set_target(tokens)
+            alignment, states = evaluator.align(current_words)
+            correct_count = alignment.matches
+            near_miss_count = states.count(WORD_NEAR_MISS)
                               
-            total_words = len(correct_words)
+            total_words = len(tokens.words)
             accuracy = (correct_count / total_words * 100) if total_words > 0 else 0
             
             # Cập nhật word count widget
@@ -722,12 +1196,21 @@ class TranscriptionApp(QWidget):
                 accuracy
             )
             
+            # Tốc độ và thời gian gõ tính từ keystroke journal của segment
+            times, keys, _ = self.text_edit.journal.snapshot()
+            typing = analyze_keystrokes(times, keys)
+
             # Lưu kết quả kiểm tra
             self.last_check_result = {
                 "accuracy": accuracy,
-                "typing_speed": 0,  # Tính sau
-                "time_taken": 0,    # Tính sau
+                "typing_speed": typing["wpm"],
+                "time_taken": typing["duration"],
+                "correction_rate": typing["correction_rate"],
                 "correct_words": correct_count,
+                "near_miss_words": near_miss_count,
+                "substituted_words": alignment.substitutions,
+                "extra_words": alignment.insertions,
+                "missed_words": alignment.deletions,
                 "total_words": total_words
             }
             
@@ -745,12 +1228,7 @@ class TranscriptionApp(QWidget):
 
     def normalize_text(self, text):
         """Chuẩn hóa text: bỏ dấu câu, chuyển về chữ thường"""
-        if not text:
-            return ""
-        punctuation = '!()-[]{};:\'",<>./?@#$%^&*_~'
-        for char in punctuation:
-            text = text.replace(char, '')
-        return ' '.join(text.lower().split())
+        return self.text_edit.normalize_text(text)
 
     def highlight_text(self, current_text, correct_text, current_word_index=0):
         """Highlight text khi g"""
@@ -818,96 +1296,141 @@ class TranscriptionApp(QWidget):
             message = "Try again!"
             
         # Cập nhật word count widget
-        total_words = len(self.segments[self.current_segment_index - 1]["text"].split())
+        total_words = len(self.segments.tokens(self.current_segment_index - 1).words)
         self.word_count_widget.update_count(
             int(accuracy * total_words / 100),
             total_words,
             accuracy
         )
 
+    def flush_keystrokes(self):
+        """Ghi keystroke journal của segment hiện tại ra file"""
+        if self.subtitle_file and self.segments:
+            self.text_edit.journal.flush(source_id(self.subtitle_file), self.current_segment_index)
+        else:
+            self.text_edit.journal.reset()
+
     def previous_segment(self):
         """Chuyển đến segment trước"""
-        if self.current_segment_index > 1:
-            self.current_segment_index -= 1
-            self.save_progress()
-            self.play_current_segment()
-            self.text_edit.clear()
-            
-            # Cập nhật segment count
-            total_segments = len(self.segments)
-            self.segment_count_widget.update_count(
-                self.current_segment_index,
-                total_segments,
-                (self.current_segment_index / total_segments * 100)
-            )
-            
-            # Reset word count với số từ của câu mới
-            total_words = len(self.segments[self.current_segment_index - 1]["text"].split())
-            self.word_count_widget.update_count(0, total_words, 0)
-            
-            self.update_button_states()
+        if self.segments and self.current_segment_index > 1:
+            self.switch_to_segment(self.current_segment_index - 2)
 
+    @timed("next_segment")
     def next_segment(self):
         """Chuyển đến segment tiếp theo"""
-        if self.current_segment_index < len(self.segments):
-            self.current_segment_index += 1
-            self.save_progress()
-            self.play_current_segment()
-            self.text_edit.clear()
-            
-            # Cập nhật segment count
-            total_segments = len(self.segments)
-            self.segment_count_widget.update_count(
-                self.current_segment_index,
-                total_segments,
-                (self.current_segment_index / total_segments * 100)
-            )
-            
-            # Reset word count với số từ của câu mới
-            total_words = len(self.segments[self.current_segment_index - 1]["text"].split())
-            self.word_count_widget.update_count(0, total_words, 0)
-            
-            self.update_button_states()
+        if self.segments and self.current_segment_index < len(self.segments):
+            self.switch_to_segment(self.current_segment_index)
+
+    def switch_to_segment(self, position, play=True):
+        """Chuyển sang segment tại position, dùng trạng thái đã chuẩn bị trước nếu có"""
+        self.switch_started_ns = time.perf_counter_ns()
+        self.flush_keystrokes()
+        prepared = self.segment_prefetcher.take(position)
+        self.current_segment_index = position + 1
+        if play:
+            self.play_current_segment(prepared)
+        self.text_edit.clear()
+
+        # Cập nhật segment count
+        total_segments = len(self.segments)
+        self.segment_count_widget.update_count(
+            self.current_segment_index,
+            total_segments,
+            (self.current_segment_index / total_segments * 100)
+        )
+
+        # Reset word count với số từ của câu mới
+        self.word_count_widget.update_count(0, len(prepared.tokens.words), 0)
+        self.update_button_states()
+
+        # Tiến trình được ghi ở thread nền, không chặn lúc chuyển segment
+        self.save_progress()
+        self.prefetch_next_segment()
+
+    def prefetch_next_segment(self):
+        """Chuẩn bị segment kế tiếp ở thread nền, không chiếm GUI thread"""
+        if self.segment_prefetcher:
+            self.segment_prefetcher.prepare(self.current_segment_index)
+
+    def on_player_time_changed(self, event):
+        """Callback từ thread của VLC: đo thời gian tới frame đầu tiên sau khi chuyển segment"""
+        started = self.switch_started_ns
+        if started is None:
+            return
+        self.switch_started_ns = None
+        elapsed_ns = time.perf_counter_ns() - started
+        latency = elapsed_ns / 1e6
+        self.switch_latencies.append(latency)
+        if latency_recorder.enabled:
+            latency_recorder.record("enter_to_first_audio", elapsed_ns)
+        logger.debug(f"Segment switch latency: {latency:.1f} ms")
+
+    def jump_to_time(self, time_ms):
+        """Phát từ time_ms, chuyển sang segment chứa thời điểm đó nếu khác segment hiện tại"""
+        try:
+            if not self.segments or not self.player or not self.timeline:
+                return
+
+            position = self.timeline.seek(time_ms)
+            if position < 0:
+                return
+
+            if position != self.current_segment_index - 1:
+                self.switch_to_segment(position, play=False)
+
+            # Phát tới hết segment (cùng điểm dừng với play_current_segment)
+            start_ms, end_ms = self.segment_play_range(position)
+            time_ms = max(time_ms, start_ms)
+            duration = end_ms - time_ms
+            self.player.set_time(int(time_ms))
+            self.player.play()
+            self.segment_timer.start(max(0, duration))
+
+        except Exception as e:
+            logger.error(f"Error jumping to time: {str(e)}")
 
     def replay_segment(self):
         """Phát lại segment hiện tại"""
         if self.player:
             self.play_current_segment()
 
-    def play_current_segment(self):
+    @timed("play_current_segment")
+    def play_current_segment(self, prepared=None):
         """Phát segment hiện tại"""
         try:
             if not self.segments or not self.player:
                 return
             
-            # Lấy thông tin segment hiện tại
-            current_segment = self.segments[self.current_segment_index - 1]
-            start_time = current_segment["start_time"]
-            end_time = current_segment["end_time"]
-            
-            # Chuyển đổi thời gian sang milliseconds
-            start_ms = self.video_processor.time_to_milliseconds(start_time)
-            end_ms = self.video_processor.time_to_milliseconds(end_time)
-            
-            # Thêm 500ms vào thời gian kết thúc
-            end_ms += 400 # Thêm 0.5 giây
+            # Lấy thời gian phát của segment (đã căn theo giọng nói nếu có)
+            position = self.current_segment_index - 1
+            if prepared is not None:
+                start_ms, end_ms = prepared.start_ms, prepared.end_ms
+                tokens = prepared.tokens
+            else:
+                start_ms, end_ms = self.segment_play_range(position)
+                tokens = self.segments.tokens(position)
             duration = end_ms - start_ms
             
             # Đặt vị trí video chính xác đến millisecond
             self.player.set_time(int(start_ms))
             self.player.play()
             
-            # Dừng video khi hết segment (đã bao gồm 500ms phụ trội)
-            self.segment_timer.stop()  # Dừng timer cũ nếu có
-            self.segment_timer.singleShot(duration, self.player.pause)
+            # Dừng video khi hết segment (start() thay thế timer cũ nếu có)
+            self.segment_timer.start(max(0, duration))
             
             # Cập nhật word count
-            total_words = len(current_segment["text"].split())
+            total_words = len(tokens.words)
             self.word_count_widget.update_count(0, total_words, 0)
+            self.update_native_subtitle()
             
         except Exception as e:
             logger.error(f"Error playing segment: {str(e)}")
 
+    def pause_segment(self):
+        """Dừng video khi hết segment"""
+        if getattr(self, 'player', None):
+            self.player.pause()
+
     def check_segment_end(self):
         """Kiểm tra và dừng video khi đến cuối segment"""
         try:
@@ -1006,8 +1529,13 @@ class TranscriptionApp(QWidget):
     def closeEvent(self, event):
         """Xử lý khi đóng ứng dụng"""
         try:
-            # Lưu tiến trình
+            # Lưu tiến trình, ghi nốt mọi thứ đang chờ trước khi đóng storage
             self.save_progress()
+            self.flush_keystrokes()
+            self.persistence.stop()
+            # Storage dùng chung với Dashboard do Dashboard đóng
+            if self.storage is not None and self.shared_data_manager is None:
+                self.storage.close()
             
             # Dừng video
             if hasattr(self, 'player'):
@@ -0,0 +1,55 @@
+import logging
+from PyQt5.QtCore import QObject, QTimer
+from PyQt5.QtWidgets import QLabel
+
+logger = logging.getLogger(__name__)
+
+# Khoảng một frame ở 60 Hz
+FRAME_INTERVAL_MS = 16
+
+
+class UiUpdateScheduler(QObject):
+    """Gom các lần cập nhật widget trong cùng một frame, mỗi widget chỉ áp dụng lần cuối cùng"""
+
+    def __init__(self, interval_ms=FRAME_INTERVAL_MS, parent=None):
+        super().__init__(parent)
+        self._pending = {}
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(interval_ms)
+        self.timer.timeout.connect(self.flush)
+
+    def schedule(self, key, callback):
+        """Đặt lịch cập nhật cho key, thay thế lần cập nhật chưa áp dụng của key đó"""
+        self._pending[key] = callback
+        if not self.timer.isActive():
+            self.timer.start()
+
+    def flush(self):
+        """Áp dụng ngay mọi cập nhật đang chờ"""
+        self.timer.stop()
+        pending, self._pending = self._pending, {}
+        for callback in pending.values():
+            try:
+                callback()
+            except Exception as e:
+                logger.error(f"Error applying UI update: {str(e)}")
+
+
+class StatusLabel(QLabel):
+    """Label trạng thái: cập nhật qua scheduler và bỏ qua setText khi nội dung không đổi"""
+
+    def __init__(self, parent=None, scheduler=None):
+        super().__init__(parent)
+        self.scheduler = scheduler
+
+    def post(self, formatter, *args):
+        """Dựng text bằng formatter(*args) ở frame kế tiếp (ngay lập tức nếu không có scheduler)"""
+        if self.scheduler is None:
+            self.show_text(formatter(*args))
+        else:
+            self.scheduler.schedule(self, lambda: self.show_text(formatter(*args)))
+
+    def show_text(self, text):
+        if text != self.text():
+            self.setText(text)
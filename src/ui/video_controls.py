@@ -8,6 +8,7 @@ class VideoControls(QWidget):
     def __init__(self, parent=None):
         super().__init__(parent)
         self.parent = parent
+        self.slider_position = None
         self.setup_ui()
         self.setup_timer()
 
@@ -76,6 +77,18 @@ class VideoControls(QWidget):
         self.update_timer.setInterval(100)  # Cập nhật mỗi 100ms
         self.update_timer.timeout.connect(self.update_video_time)
 
+    def update_slider_range(self, position):
+        """Đặt phạm vi timeline quanh segment hiện tại, cho phép kéo sang segment liền kề"""
+        segments = self.parent.segments
+        start_ms = segments.start_ms(position)
+        window_start = segments.start_ms(position - 1) if position > 0 else start_ms
+        window_end = segments.end_ms(min(position + 1, len(segments) - 1))
+        window_end = max(window_end, segments.end_ms(position))
+
+        # Giá trị 0 của slider ứng với điểm bắt đầu của segment hiện tại
+        self.time_slider.setRange(window_start - start_ms, window_end - start_ms)
+        self.slider_position = position
+
     def update_video_time(self):
         """Cập nhật thời gian video"""
         if not self.parent or not hasattr(self.parent, 'player') or not self.parent.player:
@@ -84,33 +97,20 @@ class VideoControls(QWidget):
         try:
             # Lấy thời gian hiện tại và tổng thời gian của segment
             if self.parent.segments and self.parent.current_segment_index > 0:
-                segment = self.parent.segments[self.parent.current_segment_index - 1]
-                
-                # Chuyển đổi thời gian từ string sang milliseconds
-                start_time_parts = segment["start_time"].split(':')
-                end_time_parts = segment["end_time"].split(':')
-                
-                # Thay thế dấu phẩy bằng dấu chấm trước khi chuyển đổi
-                start_ms = ((int(start_time_parts[0]) * 3600 + 
-                            int(start_time_parts[1]) * 60 + 
-                            float(start_time_parts[2].replace(',', '.'))) * 1000)
-                end_ms = ((int(end_time_parts[0]) * 3600 + 
-                          int(end_time_parts[1]) * 60 + 
-                          float(end_time_parts[2].replace(',', '.'))) * 1000)
-                
-                current_ms = self.parent.player.get_time() - int(start_ms)
-                duration_ms = int(end_ms - start_ms)
-                
-                # Đảm bảo current_ms không âm
-                current_ms = max(0, current_ms)
+                position = self.parent.current_segment_index - 1
+                if self.slider_position != position:
+                    self.update_slider_range(position)
+
+                start_ms = self.parent.segments.start_ms(position)
+                duration_ms = self.parent.segments.duration_ms(position)
+                offset_ms = self.parent.player.get_time() - start_ms
                 
                 # Cập nhật timeline
                 if not self.time_slider.isSliderDown():
-                    self.time_slider.setMaximum(duration_ms)
-                    self.time_slider.setValue(current_ms)
+                    self.time_slider.setValue(offset_ms)
                 
-                # Cập nhật label thời gian
-                current_time = QTime(0, 0).addMSecs(current_ms)
+                # Cập nhật label thời gian (không âm trong segment hiện tại)
+                current_time = QTime(0, 0).addMSecs(max(0, offset_ms))
                 total_time = QTime(0, 0).addMSecs(duration_ms)
                 time_format = 'mm:ss'
                 time_text = f"{current_time.toString(time_format)} / {total_time.toString(time_format)}"
@@ -127,26 +127,21 @@ class VideoControls(QWidget):
                 self.parent.player.pause()
 
     def on_slider_released(self):
-        """Xử lý khi người dùng thả timeline"""
+        """Xử lý khi người dùng thả timeline, chuyển segment nếu kéo qua ranh giới cue"""
         if self.parent and hasattr(self.parent, 'player') and self.parent.player:
-            segment = self.parent.segments[self.parent.current_segment_index - 1]
-            start_time_parts = segment["start_time"].split(':')
-            start_ms = ((int(start_time_parts[0]) * 3600 + 
-                        int(start_time_parts[1]) * 60 + 
-                        float(start_time_parts[2].replace(',', '.'))) * 1000)
-            position = int(start_ms + self.time_slider.value())
-            self.parent.player.set_time(position)
-            self.parent.player.play()
+            if self.slider_position is None:
+                self.update_timer.start()
+                return
+            start_ms = self.parent.segments.start_ms(self.slider_position)
+            self.parent.jump_to_time(start_ms + self.time_slider.value())
             self.update_timer.start()
 
     def set_video_position(self, position):
-        """Đặt vị trí video trong segment"""
+        """Đặt vị trí video trong khi kéo timeline"""
         if self.parent and hasattr(self.parent, 'player') and self.parent.player:
-            segment = self.parent.segments[self.parent.current_segment_index - 1]
-            start_time_parts = segment["start_time"].split(':')
-            start_ms = ((int(start_time_parts[0]) * 3600 + 
-                        int(start_time_parts[1]) * 60 + 
-                        float(start_time_parts[2].replace(',', '.'))) * 1000)
+            if self.slider_position is None:
+                return
+            start_ms = self.parent.segments.start_ms(self.slider_position)
             self.parent.player.set_time(int(start_ms + position))
 
     def set_volume(self, volume):
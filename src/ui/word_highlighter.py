@@ -0,0 +1,74 @@
+import re
+import logging
+from PyQt5.QtGui import QSyntaxHighlighter, QTextCharFormat, QColor
+
+from core.word_evaluator import WORD_CORRECT, WORD_NEAR_MISS, WORD_SIMILAR, WORD_WRONG
+from core.char_diff import CharDiffer
+from core.latency import timed
+
+logger = logging.getLogger(__name__)
+
+
+class WordHighlighter(QSyntaxHighlighter):
+    """Tô màu từng từ đã gõ, Qt chỉ gọi lại highlightBlock cho block vừa bị sửa"""
+
+    WORD_PATTERN = re.compile(r'\S+')
+
+    def __init__(self, document, evaluator, target_provider):
+        super().__init__(document)
+        self.evaluator = evaluator
+        self.target_provider = target_provider
+        # Chế độ so sánh từng ký tự cho từ gõ sai
+        self.char_diff = False
+        self.char_differ = CharDiffer()
+        # Khi bộ gõ đang soạn chữ thì giữ màu theo kết quả chấm điểm trước đó
+        self.paused = False
+        self.formats = {}
+        for state, color in ((WORD_CORRECT, "green"), (WORD_NEAR_MISS, "gold"),
+                             (WORD_SIMILAR, "orange"), (WORD_WRONG, "red")):
+            word_format = QTextCharFormat()
+            word_format.setForeground(QColor(color))
+            self.formats[state] = word_format
+
+    @timed("highlightBlock")
+    def highlightBlock(self, text):
+        try:
+            tokens = self.target_provider()
+            if tokens is None:
+                return
+            self.evaluator.set_target(tokens)
+
+            if self.paused:
+                alignment, states = self.evaluator.last_result()
+                if alignment is None:
+                    return
+            else:
+                # Căn từ trên toàn bộ văn bản (có memo nên chỉ tính một lần mỗi lần gõ phím)
+                alignment, states = self.evaluator.align(self.document().toPlainText().split())
+
+            # Block state lưu tổng số từ tính tới hết block, để block sau biết vị trí từ đầu tiên
+            index = max(self.previousBlockState(), 0)
+            for match in self.WORD_PATTERN.finditer(text):
+                if index < len(states):
+                    target_index = alignment.typed_to_target[index]
+                    if self.char_diff and states[index] != WORD_CORRECT and target_index >= 0:
+                        self.highlight_chars(match.start(), match.group(), tokens.words[target_index])
+                    else:
+                        self.setFormat(match.start(), match.end() - match.start(), self.formats[states[index]])
+                index += 1
+            self.setCurrentBlockState(index)
+
+        except Exception as e:
+            logger.error(f"Error highlighting words: {str(e)}")
+
+    def highlight_chars(self, start, word, target_word):
+        """Tô màu từng ký tự: ký tự khớp với từ đích màu xanh, ký tự sai màu đỏ"""
+        matched = self.char_differ.diff(word, target_word)
+        for offset, is_match in enumerate(matched):
+            state = WORD_CORRECT if is_match else WORD_WRONG
+            self.setFormat(start + offset, 1, self.formats[state])
+
+    def set_char_diff(self, enabled):
+        """Bật/tắt chế độ so sánh từng ký tự"""
+        self.char_diff = enabled
+        self.rehighlight()
@@ -2,12 +2,20 @@ import unittest
 from pathlib import Path
 import json
 import shutil
+import time
 from datetime import datetime
 
 from src.core.session_manager import SessionManager
 from src.core.statistics_manager import StatisticsManager
 from src.core.backup_manager import BackupManager
 from src.core.validation_manager import ValidationManager
+from src.core.data_manager import DataManager
+from src.core.sqlite_storage import SQLiteStorage
+from src.core.attempt_log import AttemptLog
+from src.core.persistence import PersistenceWorker
+from src.core.atomic_io import group_commit, write_json
+from src.core.session_repository import SessionRepository
+from src.core.error_handler import ErrorHandler, AppError, ErrorType
 
 class TestSessionManager(unittest.TestCase):
     def setUp(self):
@@ -73,6 +81,283 @@ class TestSessionManager(unittest.TestCase):
         self.assertEqual(progress["completed_segments"], 1)
         self.assertEqual(progress["current_segment"], 1)
 
+class TestSQLiteStorage(unittest.TestCase):
+    def setUp(self):
+        """Khởi tạo môi trường test"""
+        self.test_data_dir = Path("tests/test_data")
+        self.test_data_dir.mkdir(exist_ok=True)
+        self.storage = SQLiteStorage(self.test_data_dir / "practice.db")
+
+    def tearDown(self):
+        """Dọn dẹp sau khi test"""
+        self.storage.close()
+        if self.test_data_dir.exists():
+            shutil.rmtree(self.test_data_dir)
+
+    def test_attempt_round_trip(self):
+        """Test lưu attempt từng dòng và đọc lại đúng cấu trúc session"""
+        session_manager = SessionManager(DataManager(self.storage))
+        session = session_manager.create_session("movie.mp4", "movie.srt", "Movie")
+        attempt_data = {
+            "timestamp": datetime.now().isoformat(),
+            "text": "hello world",
+            "accuracy": 80,
+            "typing_speed": 40,
+            "time_taken": 5,
+            "correct_words": 2,
+            "total_words": 2
+        }
+        self.assertTrue(session_manager.add_segment_attempt(3, attempt_data))
+        self.assertTrue(session_manager.add_segment_attempt(3, dict(attempt_data, accuracy=100)))
+
+        loaded = self.storage.load_session(session["id"])
+        segment = loaded["segments_data"]["3"]
+        self.assertEqual([a["accuracy"] for a in segment["attempts"]], [80, 100])
+        self.assertEqual(segment["best_accuracy"], 100)
+        self.assertEqual(self.storage.find_sessions("movie.mp4")[0]["name"], "Movie")
+
+        # Lưu session chỉ ghi thông tin session, không ghi lại lịch sử attempt
+        session["name"] = "Renamed"
+        self.assertTrue(self.storage.save_session(dict(session, segments_data={})))
+        loaded = self.storage.load_session(session["id"])
+        self.assertEqual(loaded["name"], "Renamed")
+        self.assertEqual(len(loaded["segments_data"]["3"]["attempts"]), 2)
+
+    def test_attempts_do_not_dirty_repository(self):
+        """Test load và ghi nối attempt không làm session bị ghi lại toàn bộ khi commit"""
+        data_manager = DataManager(self.storage)
+        session = SessionManager(data_manager).create_session("movie.mp4", "movie.srt")
+        session_manager = SessionManager(DataManager(self.storage))
+        session_manager.load_session(session["id"])
+        repository = session_manager.data_manager.sessions
+        self.assertFalse(repository.is_dirty(session["id"]))
+
+        repository.mark_dirty(session["id"])
+        attempt_data = {
+            "timestamp": datetime.now().isoformat(), "text": "hi", "accuracy": 50,
+            "typing_speed": 10, "time_taken": 2, "correct_words": 1, "total_words": 2
+        }
+        self.assertTrue(session_manager.add_segment_attempt(1, attempt_data))
+        self.assertFalse(repository.is_dirty(session["id"]))
+
+    def test_replace_sessions_is_atomic(self):
+        """Test lỗi giữa chừng khi khôi phục không làm mất dữ liệu cũ"""
+        self.storage.replace_session(dict(id="old", name="Old", progress={}, segments_data={}))
+        with self.assertRaises(KeyError):
+            self.storage.replace_sessions([dict(id="new", segments_data={}), {"name": "no id"}])
+        self.assertEqual([s["id"] for s in self.storage.load_sessions()["sessions"]], ["old"])
+
+    def test_import_json(self):
+        """Test chuyển dữ liệu JSON cũ sang database một lần"""
+        sessions = {"sessions": [dict(id="old", name="Old", video_path="a.mp4", subtitle_path="a.srt",
+                                      created_date="2024-01-01", progress={}, segments_data={})]}
+        (self.test_data_dir / "sessions.json").write_text(json.dumps(sessions), encoding='utf-8')
+        (self.test_data_dir / "progress.json").write_text('{"practice_streak": 2}', encoding='utf-8')
+
+        self.assertTrue(self.storage.import_json(self.test_data_dir))
+        self.assertFalse(self.storage.import_json(self.test_data_dir))
+        self.assertEqual([s["id"] for s in self.storage.load_sessions()["sessions"]], ["old"])
+        self.assertEqual(self.storage.get_document("progress"), {"practice_streak": 2})
+
+    def test_import_skips_corrupt_file(self):
+        """Test file JSON phụ bị hỏng không làm import sessions chạy lại ở lần mở sau"""
+        sessions = {"sessions": [dict(id="old", name="Old", progress={}, segments_data={
+            "1": {"attempts": [{"accuracy": 50}]}
+        })]}
+        (self.test_data_dir / "sessions.json").write_text(json.dumps(sessions), encoding='utf-8')
+        (self.test_data_dir / "statistics.json").write_text("{broken", encoding='utf-8')
+
+        self.assertTrue(self.storage.import_json(self.test_data_dir))
+        session = self.storage.load_session("old")
+        session["segments_data"]["1"]["attempts"].append({"accuracy": 90})
+        self.storage.save_segment(session, 1, {"accuracy": 90})
+
+        self.assertFalse(self.storage.import_json(self.test_data_dir))
+        attempts = self.storage.load_session("old")["segments_data"]["1"]["attempts"]
+        self.assertEqual([a["accuracy"] for a in attempts], [50, 90])
+
+class TestAttemptLog(unittest.TestCase):
+    def setUp(self):
+        """Khởi tạo môi trường test"""
+        self.test_data_dir = Path("tests/test_data")
+        self.test_data_dir.mkdir(exist_ok=True)
+        self.log_dir = self.test_data_dir / "attempts"
+        self.session = {
+            "id": "s1", "name": "S1", "video_path": "a.mp4", "subtitle_path": "a.srt",
+            "created_date": "2024-01-01", "progress": {}, "segments_data": {}
+        }
+
+    def tearDown(self):
+        """Dọn dẹp sau khi test"""
+        if self.test_data_dir.exists():
+            shutil.rmtree(self.test_data_dir)
+
+    def add_attempt(self, log, accuracy):
+        segment = self.session["segments_data"].setdefault("2", {"attempts": [], "best_accuracy": 0})
+        segment["best_accuracy"] = max(segment["best_accuracy"], accuracy)
+        segment["attempts"].append({"accuracy": accuracy})
+        log.save_segment(self.session, 2, {"accuracy": accuracy})
+
+    def test_snapshot_and_tail(self):
+        """Test đọc lại snapshot + phần log sau khi compact"""
+        log = AttemptLog(self.log_dir)
+        log.save_session(self.session)
+        self.add_attempt(log, 70)
+        log.compact(wait=True)
+        self.add_attempt(log, 90)
+        log.close()
+
+        self.assertEqual([p.name for p in sorted(self.log_dir.iterdir())],
+                         ["log-000002.jsonl", "snapshot-000002.json"])
+        reopened = AttemptLog(self.log_dir)
+        segment = reopened.load_session("s1")["segments_data"]["2"]
+        self.assertEqual([a["accuracy"] for a in segment["attempts"]], [70, 90])
+        self.assertEqual(segment["best_accuracy"], 90)
+        reopened.close()
+
+    def test_truncated_record(self):
+        """Test bỏ qua dòng cuối bị ghi dở"""
+        log = AttemptLog(self.log_dir)
+        log.save_session(self.session)
+        self.add_attempt(log, 80)
+        log.close()
+        with open(self.log_dir / "log-000001.jsonl", "a", encoding="utf-8") as f:
+            f.write('{"op": "segm')
+
+        reopened = AttemptLog(self.log_dir)
+        self.add_attempt(reopened, 90)
+        segment = reopened.load_session("s1")["segments_data"]["2"]
+        self.assertEqual([a["accuracy"] for a in segment["attempts"]], [80, 90])
+        reopened.close()
+
+    def test_idle_sync(self):
+        """Test bản ghi cuối được fsync sau sync_interval dù không có bản ghi nào tiếp theo"""
+        log = AttemptLog(self.log_dir, sync_every=100, sync_interval=0.2)
+        log.save_session(self.session)
+        self.add_attempt(log, 80)
+        self.assertEqual(log._pending, 2)
+        deadline = time.monotonic() + 5
+        while log._pending and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(log._pending, 0)
+        log.close()
+
+class TestPersistenceWorker(unittest.TestCase):
+    def test_coalesce_and_flush(self):
+        """Test các lần lưu cùng key được gộp và flush ghi ngay"""
+        written = []
+        worker = PersistenceWorker(window=60)
+        for value in (1, 2, 3):
+            worker.submit("progress", written.append, value)
+        worker.submit("statistics", written.append, "stats")
+        self.assertEqual(written, [])
+
+        self.assertTrue(worker.flush(timeout=5))
+        self.assertEqual(sorted(written, key=str), [3, "stats"])
+        self.assertEqual(worker.merged, 2)
+
+        # Sau khi dừng thì ghi đồng bộ
+        self.assertTrue(worker.stop(timeout=5))
+        worker.submit("progress", written.append, 4)
+        self.assertEqual(written[-1], 4)
+
+class TestAtomicIO(unittest.TestCase):
+    def setUp(self):
+        """Khởi tạo môi trường test"""
+        self.test_data_dir = Path("tests/test_data")
+        self.test_data_dir.mkdir(exist_ok=True)
+
+    def tearDown(self):
+        """Dọn dẹp sau khi test"""
+        if self.test_data_dir.exists():
+            shutil.rmtree(self.test_data_dir)
+
+    def test_group_commit(self):
+        """Test các file trong cùng một lô chỉ xuất hiện khi commit và không để lại file tạm"""
+        progress_file = self.test_data_dir / "progress.json"
+        stats_file = self.test_data_dir / "statistics.json"
+        write_json(progress_file, {"segment": 1})
+
+        with group_commit():
+            write_json(progress_file, {"segment": 2})
+            write_json(progress_file, {"segment": 3})
+            write_json(stats_file, {"daily_stats": {}})
+            self.assertEqual(json.loads(progress_file.read_text(encoding='utf-8')), {"segment": 1})
+            self.assertFalse(stats_file.exists())
+
+        self.assertEqual(json.loads(progress_file.read_text(encoding='utf-8')), {"segment": 3})
+        self.assertTrue(stats_file.exists())
+        self.assertEqual(sorted(p.name for p in self.test_data_dir.iterdir()),
+                         ["progress.json", "statistics.json"])
+
+    def test_failed_write_keeps_old_content(self):
+        """Test lỗi khi ghi không làm hỏng file cũ"""
+        progress_file = self.test_data_dir / "progress.json"
+        write_json(progress_file, {"segment": 1})
+        with self.assertRaises(TypeError):
+            write_json(progress_file, {"segment": object()})
+        self.assertEqual(json.loads(progress_file.read_text(encoding='utf-8')), {"segment": 1})
+
+    def test_invalid_data_keeps_corrupt_file(self):
+        """Test file hỏng được đổi tên giữ lại trước khi ghi dữ liệu mặc định"""
+        sessions_file = self.test_data_dir / "sessions.json"
+        sessions_file.write_text("{broken", encoding='utf-8')
+        handler = ErrorHandler()
+        self.assertTrue(handler.handle_invalid_data(
+            AppError(ErrorType.INVALID_DATA, "corrupt", {"file_path": str(sessions_file)})
+        ))
+        self.assertEqual(json.loads(sessions_file.read_text(encoding='utf-8')), {"sessions": []})
+        corrupt = list(self.test_data_dir.glob("sessions.json.corrupt-*"))
+        self.assertEqual(len(corrupt), 1)
+        self.assertEqual(corrupt[0].read_text(encoding='utf-8'), "{broken")
+
+class TestSessionRepository(unittest.TestCase):
+    def setUp(self):
+        """Khởi tạo repository với storage giả"""
+        self.stored = [
+            {"id": f"s{i}", "video_path": f"ep{i % 3}.mp4", "last_accessed": f"2024-01-{i + 1:02d}"}
+            for i in range(9)
+        ]
+        self.loads = 0
+        self.persisted = []
+
+        def load():
+            self.loads += 1
+            return self.stored
+
+        def persist(changed, sessions):
+            self.persisted.append(sorted(session["id"] for session in changed))
+            return True
+
+        self.repository = SessionRepository(load, persist)
+
+    def test_indexes(self):
+        """Test tra cứu theo id, video và thời điểm truy cập chỉ load một lần"""
+        self.assertEqual(self.repository.get("s4")["video_path"], "ep1.mp4")
+        self.assertIsNone(self.repository.get("missing"))
+        self.assertEqual([s["id"] for s in self.repository.find_by_video("ep1.mp4")], ["s7", "s4", "s1"])
+        self.assertEqual([s["id"] for s in self.repository.recent(2)], ["s8", "s7"])
+        self.assertEqual(self.loads, 1)
+
+        session = self.repository.get("s0")
+        session["video_path"] = "ep1.mp4"
+        session["last_accessed"] = "2024-02-01"
+        self.repository.put(session)
+        self.assertEqual(self.repository.recent(1)[0]["id"], "s0")
+        self.assertEqual(len(self.repository.find_by_video("ep0.mp4")), 2)
+        self.assertEqual(len(self.repository.find_by_video("ep1.mp4")), 4)
+
+    def test_commit_only_dirty(self):
+        """Test chỉ ghi các session đã thay đổi"""
+        self.assertTrue(self.repository.commit())
+        self.assertEqual(self.persisted, [])
+
+        self.repository.put({"id": "new", "video_path": "ep0.mp4", "last_accessed": "2024-03-01"})
+        self.repository.mark_dirty("s2")
+        self.assertTrue(self.repository.commit())
+        self.assertEqual(self.persisted, [["new", "s2"]])
+        self.assertFalse(self.repository.is_dirty("s2"))
+
 class TestStatisticsManager(unittest.TestCase):
     def setUp(self):
         self.stats_manager = StatisticsManager(None)
@@ -0,0 +1,575 @@
+import unittest
+import random
+from array import array
+from importlib.util import find_spec
+from pathlib import Path
+import shutil
+
+from src.core.subtitle_cache import SubtitleCache
+from src.core.subtitle_cleanup import SubtitleCleaner
+from src.core.timeline_index import TimelineIndex
+from src.core.subtitle_reload import SubtitleReloader, reconcile, remap_position
+from src.core.subtitle_alignment import align_tables, load_alignment
+from src.core.word_evaluator import (
+    WordEvaluator, WORD_CORRECT, WORD_NEAR_MISS, WORD_SIMILAR, WORD_WRONG
+)
+from src.core.word_matcher import levenshtein, similarity
+from src.core.word_alignment import WordAligner, MATCH, SUBSTITUTE, INSERT, DELETE
+from src.core.progress_tracker import ProgressTracker
+from src.core.char_diff import CharDiffer, lcs_mask
+from src.core.segment_prefetch import SegmentPrefetcher
+from src.core.persistence import PersistenceWorker
+from src.core.latency import LatencyHistogram, LatencyRecorder, timed
+from src.core.textnorm import normalize_text, fold_diacritics
+from src.core.keystroke_journal import (
+    KeystrokeJournal, iter_journal, analyze_keystrokes, source_id, KEY_BACKSPACE, TEXT_KEY
+)
+from src.core.subtitle_readers import load_subtitle_file
+from src.core.subtitles import (
+    SegmentTable, iter_srt_cues, parse_timestamp, format_timestamp, normalize_token
+)
+
+SAMPLE_VTT = """WEBVTT
+
+NOTE comment block
+00:00:00.000 --> 00:00:00.500
+
+intro
+00:01.000 --> 00:02.500 align:start
+<v Anna>Hello <00:01.500>world
+
+00:00:03.000 --> 00:00:04.000
+Bye
+"""
+
+SAMPLE_ASS = """[Script Info]
+Title: Test
+
+[V4+ Styles]
+Format: Name, Fontname
+Style: Default,Arial
+
+[Events]
+Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text
+Dialogue: 0,0:00:05.00,0:00:06.00,Default,,0,0,0,,Later line, with comma
+Comment: 0,0:00:01.00,0:00:02.00,Default,,0,0,0,,ignored
+Dialogue: 0,0:00:01.50,0:00:02.25,Default,,0,0,0,,{\\an8}First\\Nsecond
+"""
+
+SAMPLE_SRT = """1
+00:00:01,000 --> 00:00:02,500
+Hello world
+
+2
+00:00:03,000 --> 00:00:04,000 X1:10 X2:20
+First line
+second line
+
+3
+00:00:05,000 --> 00:00:06,000
+Hello world
+"""
+
+class TestSubtitleParser(unittest.TestCase):
+    def setUp(self):
+        """Khởi tạo môi trường test"""
+        self.test_data_dir = Path("tests/test_data")
+        self.test_data_dir.mkdir(exist_ok=True)
+        self.srt_file = self.test_data_dir / "sample.srt"
+        self.srt_file.write_text("\ufeff" + SAMPLE_SRT, encoding="utf-8")
+
+    def tearDown(self):
+        """Dọn dẹp sau khi test"""
+        if self.test_data_dir.exists():
+            shutil.rmtree(self.test_data_dir)
+
+    def test_parse_timestamp(self):
+        """Test chuyển đổi timestamp"""
+        self.assertEqual(parse_timestamp("01:02:03,456"), 3723456)
+        self.assertEqual(parse_timestamp("00:00:01.5"), 1500)
+        self.assertEqual(parse_timestamp("02:03.040"), 123040)
+        self.assertEqual(format_timestamp(3723456), "01:02:03,456")
+
+    def test_load_srt(self):
+        """Test đọc file SRT thành SegmentTable"""
+        table = load_subtitle_file(self.srt_file)
+        self.assertEqual(len(table), 3)
+        self.assertEqual(table.start_ms(0), 1000)
+        self.assertEqual(table.end_ms(1), 4000)
+        self.assertEqual(table.text(1), "First line\nsecond line")
+        self.assertEqual(table[0]["start_time"], "00:00:01,000")
+        self.assertEqual(table[2]["duration_ms"], 1000)
+
+    def test_load_webvtt(self):
+        """Test đọc file WebVTT"""
+        vtt_file = self.test_data_dir / "sample.vtt"
+        vtt_file.write_text(SAMPLE_VTT, encoding="utf-8")
+        table = load_subtitle_file(vtt_file)
+        self.assertEqual(len(table), 2)
+        self.assertEqual(table.start_ms(0), 1000)
+        self.assertEqual(table.text(0), "<v Anna>Hello world")
+
+    def test_load_ass(self):
+        """Test đọc file ASS, bỏ Comment và sắp xếp theo thời gian"""
+        ass_file = self.test_data_dir / "sample.ass"
+        ass_file.write_text(SAMPLE_ASS, encoding="utf-8")
+        table = load_subtitle_file(ass_file)
+        self.assertEqual(len(table), 2)
+        self.assertEqual(table.start_ms(0), 1500)
+        self.assertEqual(table.end_ms(0), 2250)
+        self.assertEqual(table.text(0), "First\nsecond")
+        self.assertEqual(table.text(1), "Later line, with comma")
+
+    def test_load_utf16(self):
+        """Test đọc file SRT mã hóa UTF-16"""
+        utf16_file = self.test_data_dir / "utf16.srt"
+        utf16_file.write_text(SAMPLE_SRT.replace("Hello", "Xin chào"), encoding="utf-16")
+        table = load_subtitle_file(utf16_file)
+        self.assertEqual(len(table), 3)
+        self.assertEqual(table.text(0), "Xin chào world")
+
+    def test_interned_text(self):
+        """Test các cue trùng text dùng chung buffer"""
+        table = load_subtitle_file(self.srt_file)
+        self.assertEqual(table.texts.starts[0], table.texts.starts[2])
+        self.assertEqual(table.text(2), "Hello world")
+
+    def test_tokens(self):
+        """Test từ đích được tách và chuẩn hóa sẵn khi load"""
+        table = SegmentTable.from_cues([(1, 0, 1000, "Hello,  World!\n- Yes")])
+        tokens = table.tokens(0)
+        self.assertEqual(tokens.words, ("Hello,", "World!", "-", "Yes"))
+        self.assertEqual(tokens.normalized, ("hello", "world", "", "yes"))
+        self.assertEqual(tokens.offsets, (0, 8, 15, 17))
+        self.assertEqual(normalize_token("It's"), "its")
+
+    def test_missing_index(self):
+        """Test cue không có số thứ tự vẫn được đọc"""
+        cues = list(iter_srt_cues([
+            "00:00:01,000 --> 00:00:02,000", "42", "",
+            "00:00:03,000 --> 00:00:04,000", "Text"
+        ]))
+        self.assertEqual(len(cues), 2)
+        self.assertEqual(cues[0][3], "42")
+        self.assertEqual(SegmentTable.from_cues(cues).text(1), "Text")
+
+class TestSubtitleCache(unittest.TestCase):
+    def setUp(self):
+        """Khởi tạo môi trường test"""
+        self.test_data_dir = Path("tests/test_data")
+        self.test_data_dir.mkdir(exist_ok=True)
+        self.srt_file = self.test_data_dir / "sample.srt"
+        self.srt_file.write_text(SAMPLE_SRT, encoding="utf-8")
+        self.cache = SubtitleCache(self.test_data_dir / "cache")
+
+    def tearDown(self):
+        """Dọn dẹp sau khi test"""
+        if self.test_data_dir.exists():
+            shutil.rmtree(self.test_data_dir)
+
+    def test_load_from_cache(self):
+        """Test lần load thứ hai lấy từ cache thay vì parse lại"""
+        first = self.cache.load(self.srt_file, load_subtitle_file)
+
+        def fail_parser(path):
+            raise AssertionError("parser should not be called on cache hit")
+
+        cached = self.cache.load(self.srt_file, fail_parser)
+        self.assertEqual(len(cached), len(first))
+        self.assertEqual(list(cached.starts), list(first.starts))
+        self.assertEqual(cached.text(1), "First line\nsecond line")
+        self.assertEqual(cached.tokens(1), first.tokens(1))
+        # Các cột được chép ra khỏi mmap, file cache không còn bị giữ
+        self.assertIsInstance(cached.starts, array)
+        for path in self.cache.cache_dir.glob("*.seg"):
+            path.unlink()
+        self.assertEqual(cached.text(1), "First line\nsecond line")
+
+    def test_lazy_cache_dir(self):
+        """Test thư mục cache chỉ được tạo ở lần ghi đầu tiên"""
+        cache = SubtitleCache(self.test_data_dir / "lazy")
+        self.assertIsNone(cache.get("missing"))
+        self.assertFalse(cache.cache_dir.exists())
+        self.assertTrue(cache.put("entry", load_subtitle_file(self.srt_file)))
+        self.assertTrue(cache.entry_path("entry").exists())
+
+    def test_evict_by_size(self):
+        """Test xóa entry cũ khi vượt quá dung lượng"""
+        self.cache.max_size = 0
+        self.cache.put("old", load_subtitle_file(self.srt_file))
+        self.assertEqual(list(self.cache.cache_dir.glob("*.seg")), [])
+
+class TestSubtitleCleaner(unittest.TestCase):
+    def test_clean_all(self):
+        """Test bỏ markup, SDH, tên người nói và gạch đầu dòng"""
+        cleaner = SubtitleCleaner()
+        texts = [
+            "<i>Hello</i> {\\an8}there",
+            "[MUSIC PLAYING]",
+            "- JOHN: Hi!\n- (LAUGHS) Bye (for now)",
+            "♪ La la ♪",
+            "-5 degrees outside"
+        ]
+        self.assertEqual(cleaner.clean_all(texts), [
+            "Hello there",
+            "",
+            "Hi!\nBye (for now)",
+            "La la",
+            "-5 degrees outside"
+        ])
+
+    def test_settings(self):
+        """Test tắt từng bước cleanup"""
+        cleaner = SubtitleCleaner({"strip_speaker_labels": False})
+        self.assertEqual(cleaner.clean("JOHN: Hi"), "JOHN: Hi")
+        self.assertNotEqual(cleaner.signature(), SubtitleCleaner().signature())
+
+    def test_speaker_label_false_positives(self):
+        """Test không bỏ lời thoại trông giống tên người nói"""
+        cleaner = SubtitleCleaner()
+        self.assertEqual(cleaner.clean(">> ANNA: Hello"), "Hello")
+        self.assertEqual(cleaner.clean("A: the first option"), "A: the first option")
+        self.assertEqual(cleaner.clean("WARNING:\nkeep out"), "WARNING:\nkeep out")
+
+        cleaner = SubtitleCleaner({"strip_bare_speaker_labels": False})
+        self.assertEqual(cleaner.clean("NO: I said no"), "NO: I said no")
+        self.assertEqual(cleaner.clean("BREAKING NEWS: fire"), "BREAKING NEWS: fire")
+        self.assertEqual(cleaner.clean(">> ANNA: Hello"), "Hello")
+
+    def test_practice_tokens(self):
+        """Test từ đích được tách từ practice text, text hiển thị giữ nguyên"""
+        table = SegmentTable.from_cues([(1, 0, 1000, "<i>NAME: Hello</i>")])
+        table.apply_cleanup(SubtitleCleaner())
+        self.assertEqual(table.text(0), "<i>NAME: Hello</i>")
+        self.assertEqual(table.practice_text(0), "Hello")
+        self.assertEqual(table.tokens(0).words, ("Hello",))
+
+class TestTimelineIndex(unittest.TestCase):
+    def setUp(self):
+        # Cue 2 chồng lên cue 1, cue 3 đứng trước cue 2 trong file
+        self.table = SegmentTable.from_cues([
+            (1, 1000, 5000, "a"),
+            (2, 4000, 6000, "b"),
+            (3, 500, 800, "c"),
+            (4, 8000, 9000, "d")
+        ])
+        self.index = TimelineIndex(self.table)
+
+    def test_segment_at(self):
+        """Test tìm cue đang phát"""
+        self.assertEqual(self.index.segment_at(600), 2)
+        self.assertEqual(self.index.segment_at(2000), 0)
+        self.assertEqual(self.index.segment_at(4500), 1)
+        self.assertEqual(self.index.segment_at(7000), -1)
+
+    def test_seek(self):
+        """Test nhảy tới cue kế tiếp khi rơi vào khoảng trống"""
+        self.assertEqual(self.index.seek(7000), 3)
+        self.assertEqual(self.index.seek(0), 2)
+        self.assertEqual(self.index.seek(99999), 3)
+
+    def test_overlapping(self):
+        """Test tìm các cue giao với một khoảng thời gian"""
+        self.assertEqual(self.index.overlapping(700, 4500), [2, 0, 1])
+        self.assertEqual(self.index.overlapping(6000, 8000), [])
+
+class TestSubtitleReload(unittest.TestCase):
+    def setUp(self):
+        """Khởi tạo môi trường test"""
+        self.test_data_dir = Path("tests/test_data")
+        self.test_data_dir.mkdir(exist_ok=True)
+        self.srt_file = self.test_data_dir / "sample.srt"
+        self.srt_file.write_text(SAMPLE_SRT, encoding="utf-8")
+
+    def tearDown(self):
+        """Dọn dẹp sau khi test"""
+        if self.test_data_dir.exists():
+            shutil.rmtree(self.test_data_dir)
+
+    def test_reparse_changed_block_only(self):
+        """Test chỉ parse lại cue bị sửa"""
+        reloader = SubtitleReloader(self.srt_file)
+        self.assertTrue(reloader.prime())
+        old_table = load_subtitle_file(self.srt_file)
+
+        self.srt_file.write_text(SAMPLE_SRT.replace("First line", "Fixed line"), encoding="utf-8")
+        table = reloader.load()
+        self.assertEqual(reloader.reparsed_blocks, 1)
+        self.assertEqual(table.text(1), "Fixed line\nsecond line")
+        self.assertEqual(list(reconcile(old_table, table)), [0, 1, 2])
+
+    def test_remap_after_insert_and_delete(self):
+        """Test vị trí cue được giữ khi thêm/xóa cue phía trước"""
+        old_table = SegmentTable.from_cues([
+            (1, 0, 1000, "a"), (2, 1000, 2000, "b"), (3, 2000, 3000, "c")
+        ])
+        new_table = SegmentTable.from_cues([
+            (1, 0, 500, "new"), (2, 500, 1000, "a"), (3, 2000, 3000, "c")
+        ])
+        mapping = reconcile(old_table, new_table)
+        self.assertEqual(list(mapping), [1, -1, 2])
+        self.assertEqual(remap_position(mapping, 2), 2)
+        self.assertEqual(remap_position(mapping, 1), 1)
+
+class TestSubtitleAlignment(unittest.TestCase):
+    def setUp(self):
+        self.target = SegmentTable.from_cues([
+            (1, 0, 1000, "a"), (2, 1000, 2000, "b"), (3, 2100, 3000, "c"), (4, 9000, 9500, "d")
+        ])
+        # Cue native 1 gộp hai cue đích đầu tiên
+        self.native = SegmentTable.from_cues([
+            (1, 0, 2050, "ab"), (2, 2000, 3100, "c")
+        ])
+
+    def test_best_overlap(self):
+        """Test ghép theo độ giao nhau lớn nhất, cho phép nhiều cue ghép một cue"""
+        self.assertEqual(list(align_tables(self.target, self.native)), [0, 0, 1, -1])
+
+    def test_alignment_cache(self):
+        """Test bảng ghép được lưu cạnh cache phụ đề"""
+        test_data_dir = Path("tests/test_data")
+        test_data_dir.mkdir(exist_ok=True)
+        try:
+            target_file = test_data_dir / "target.srt"
+            native_file = test_data_dir / "native.srt"
+            target_file.write_text("target", encoding="utf-8")
+            native_file.write_text("native", encoding="utf-8")
+            cache = SubtitleCache(test_data_dir / "cache")
+
+            load_alignment(cache, target_file, native_file, self.target, self.native)
+            self.assertEqual(len(list(cache.cache_dir.glob("*.aln"))), 1)
+            index = load_alignment(cache, target_file, native_file, self.target, self.native)
+            self.assertEqual(index.paired_text(2), "c")
+            self.assertEqual(index.paired_text(3), "")
+        finally:
+            shutil.rmtree(test_data_dir)
+
+@unittest.skipUnless(find_spec("numpy") and find_spec("PyQt5"), "numpy and PyQt5 are required")
+class TestTimingRepair(unittest.TestCase):
+    def test_snap_to_speech_edges(self):
+        """Test căn start/end theo mốc giọng nói, không có mốc thì cộng tail"""
+        from src.core.timing_repair import snap_times, speech_edges
+        import numpy as np
+
+        # Giọng nói từ 1000ms tới 2000ms, phần còn lại là nhiễu nền
+        energy = np.zeros(500)
+        energy[100:200] = 60
+        onsets, offsets = speech_edges(energy)
+        self.assertEqual((list(onsets), list(offsets)), ([1000], [2000]))
+
+        starts, ends = snap_times(array('i', [1200, 4000]), array('i', [1800, 4500]),
+                                  onsets, offsets, {"pad_ms": 0, "tail_ms": 400})
+        self.assertEqual(list(starts), [1000, 4000])
+        self.assertEqual(list(ends), [2000, 4900])
+
+class TestWordEvaluator(unittest.TestCase):
+    def test_evaluate_and_memoize(self):
+        """Test so sánh từ gõ với từ đích và giữ kết quả giữa các lần gõ"""
+        table = SegmentTable.from_cues([(1, 0, 1000, "Hello, world!")])
+        evaluator = WordEvaluator()
+        evaluator.set_target(table.tokens(0))
+
+        self.assertEqual(evaluator.evaluate_words(["hello", "wrld", "extra"]),
+                         [WORD_CORRECT, WORD_NEAR_MISS, WORD_WRONG])
+        self.assertEqual(evaluator.evaluate_words(["hlo", "xyz"]), [WORD_SIMILAR, WORD_WRONG])
+        self.assertEqual(evaluator.correct_count(["HELLO", "world"]), 2)
+        self.assertIn((1, "wrld"), evaluator._states)
+
+        # Segment khác thì kết quả cũ bị xóa
+        evaluator.set_target(SegmentTable.from_cues([(1, 0, 1000, "bye")]).tokens(0))
+        self.assertEqual(evaluator._states, {})
+
+    def test_unicode_normalization(self):
+        """Test bỏ dấu câu Unicode, ký tự full-width và chế độ bỏ dấu"""
+        self.assertEqual(normalize_token("don’t…"), "dont")
+        self.assertEqual(normalize_token("Ｈｅｌｌｏ！"), "hello")
+        self.assertEqual(normalize_text("“Wait” — she said."), "wait she said")
+        self.assertEqual(fold_diacritics("Café Đường"), "Cafe Duong")
+
+        evaluator = WordEvaluator(fold=True)
+        evaluator.set_target(SegmentTable.from_cues([(1, 0, 1000, "Déjà vu")]).tokens(0))
+        self.assertEqual(evaluator.evaluate_words(["deja", "vu"]), [WORD_CORRECT, WORD_CORRECT])
+        evaluator.set_fold(False)
+        self.assertIsNone(evaluator.target)
+
+    def test_bounded_levenshtein(self):
+        """Test khoảng cách Levenshtein và dừng sớm khi vượt giới hạn"""
+        self.assertEqual(levenshtein("kitten", "sitting"), 3)
+        self.assertEqual(levenshtein("", "abc"), 3)
+        self.assertEqual(levenshtein("abcdef", "uvwxyz", 2), 3)
+        self.assertEqual(similarity("practice", "practise"), 0.875)
+        self.assertEqual(similarity("abc", "xyz", 0.5), 0.0)
+
+    def test_char_diff(self):
+        """Test đánh dấu ký tự gõ sai trong từ"""
+        self.assertEqual(lcs_mask("wrold", "world"), (True, False, True, True, True))
+        self.assertEqual(lcs_mask("abc", ""), (False, False, False))
+        differ = CharDiffer()
+        self.assertEqual(differ.diff("Helo", "hello"), (True, True, True, True))
+        self.assertIn(("Helo", "hello"), differ._cache)
+
+    def test_prefetch_next_segment(self):
+        """Test segment chuẩn bị trước được dùng lại khi chuyển segment"""
+        table = SegmentTable.from_cues([(1, 0, 1000, "one two"), (2, 1500, 2500, "three four")])
+        evaluator = WordEvaluator()
+        prefetcher = SegmentPrefetcher(table, evaluator, tail_ms=200)
+        prepared = prefetcher.prepare(1).result(timeout=5)
+        self.assertIsNone(prefetcher.prepare(2))
+        self.assertEqual((prepared.start_ms, prepared.end_ms), (1500, 2700))
+
+        self.assertIs(prefetcher.take(1), prepared)
+        evaluator.set_target(table.tokens(1))
+        self.assertIs(evaluator.target, prepared.tokens)
+        self.assertIs(evaluator.aligner, prepared.aligner)
+        self.assertEqual(evaluator.correct_count(["three", "four"]), 2)
+
+        # Chưa chuẩn bị thì dựng ngay, không có aligner dựng sẵn
+        fallback = prefetcher.take(0)
+        self.assertIsNone(fallback.aligner)
+        self.assertIs(fallback.tokens, table.tokens(0))
+
+class TestWordAlignment(unittest.TestCase):
+    def test_skipped_and_extra_words(self):
+        """Test bỏ sót một từ không làm các từ sau bị tính sai"""
+        aligner = WordAligner("the quick brown fox jumps".split())
+        alignment = aligner.align("the brown fox".split())
+        self.assertEqual(alignment.typed_ops, [MATCH, MATCH, MATCH])
+        self.assertEqual((alignment.deletions, alignment.pending), (1, [4]))
+
+        # Gõ thêm từ chỉ diff lại phần sau tiền tố đã khớp
+        alignment = aligner.align("the brown fox really jumps".split())
+        self.assertEqual(alignment.typed_ops, [MATCH, MATCH, MATCH, INSERT, MATCH])
+        self.assertEqual(alignment.errors(), [(DELETE, -1, 1), (INSERT, 3, -1)])
+
+    def test_substitution(self):
+        """Test từ gõ sai nằm giữa hai từ khớp được ghép thành SUBSTITUTE"""
+        alignment = WordAligner("the cap sat".split()).align("the cat sat".split())
+        self.assertEqual(alignment.typed_ops, [MATCH, SUBSTITUTE, MATCH])
+        self.assertEqual(alignment.typed_to_target, [0, 1, 2])
+        self.assertEqual(alignment.errors(), [(SUBSTITUTE, 1, 1)])
+        self.assertEqual((alignment.substitutions, alignment.insertions, alignment.deletions), (1, 0, 0))
+
+    def test_incremental_matches_full_alignment(self):
+        """Test căn từ tăng dần cho kết quả giống căn lại từ đầu"""
+        target = "i think that the cat sat on the mat".split()
+        typed = "the think that the cat sat on the mat".split()
+        aligner = WordAligner(target)
+        for count in range(1, len(typed) + 1):
+            alignment = aligner.align(typed[:count])
+        self.assertEqual(alignment.matches, 8)
+
+        rng = random.Random(13)
+        vocabulary = "a the cat sat on mat i think that".split()
+        for _ in range(200):
+            target = [rng.choice(vocabulary) for _ in range(rng.randint(0, 10))]
+            typed = [rng.choice(vocabulary) for _ in range(rng.randint(0, 10))]
+            aligner = WordAligner(target)
+            # Gõ từng từ, thỉnh thoảng xóa lùi một từ
+            steps = [typed[:count] for count in range(len(typed) + 1)]
+            steps.insert(rng.randint(0, len(steps)), typed[:rng.randint(0, len(typed))])
+            for step in steps:
+                alignment = aligner.align(step)
+                self.assertEqual(alignment.ops, WordAligner(target).align(step).ops)
+
+    def test_progress_tracker_errors(self):
+        """Test phân loại lỗi theo kết quả căn từ"""
+        tracker = ProgressTracker(None)
+        self.assertEqual(tracker.calculate_accuracy("the brown fox", "the quick brown fox"), 75)
+        errors = tracker.analyze_errors("the quack brown", "the quick brown fox")
+        self.assertEqual([(e["expected"], e["actual"], e["type"]) for e in errors],
+                         [("quick", "quack", "wrong_word"), ("fox", "", "missing")])
+
+class TestKeystrokeJournal(unittest.TestCase):
+    def setUp(self):
+        """Khởi tạo môi trường test"""
+        self.test_data_dir = Path("tests/test_data")
+        self.test_data_dir.mkdir(exist_ok=True)
+        self.journal_file = self.test_data_dir / "keystrokes.bin"
+
+    def tearDown(self):
+        """Dọn dẹp sau khi test"""
+        if self.test_data_dir.exists():
+            shutil.rmtree(self.test_data_dir)
+
+    def test_ring_buffer_and_replay(self):
+        """Test ring buffer giữ các phím mới nhất và đọc lại được từ file"""
+        journal = KeystrokeJournal(self.journal_file, capacity=3)
+        for position, key in enumerate([65, 66, KEY_BACKSPACE, 67]):
+            journal.record(key, position)
+        self.assertTrue(journal.flush(source_id("movie.srt"), 7))
+        journal.record(68, 0)
+        journal.flush(source_id("movie.srt"), 8)
+
+        segments = list(iter_journal(self.journal_file))
+        self.assertEqual([s["segment_index"] for s in segments], [7, 8])
+        self.assertEqual(list(segments[0]["keys"]), [66, KEY_BACKSPACE, 67])
+        self.assertEqual(list(segments[0]["positions"]), [1, 2, 3])
+        self.assertEqual(segments[0]["dropped"], 1)
+
+    def test_analyze(self):
+        """Test tính WPM, khoảng do dự và tỉ lệ sửa lỗi"""
+        second = 1_000_000_000
+        times = [0, second // 10, 2 * second, 3 * second]
+        keys = [65 | TEXT_KEY, KEY_BACKSPACE, 66 | TEXT_KEY, 67 | TEXT_KEY]
+        result = analyze_keystrokes(times, keys)
+        self.assertEqual(result["correction_rate"], 0.25)
+        self.assertEqual([i for i, _ in result["hesitations"]], [2, 3])
+        self.assertEqual(result["duration"], 3)
+
+        # Phím không sinh ký tự (Shift, Return) không làm tăng WPM
+        shift, enter = 0x01000020, 0x01000004
+        with_modifiers = analyze_keystrokes(times + [3 * second + 1, 3 * second + 2], keys + [shift, enter])
+        self.assertEqual(with_modifiers["wpm"], result["wpm"])
+        self.assertEqual(with_modifiers["correction_rate"], 0.25)
+
+    def test_input_method_commit(self):
+        """Test chữ commit qua bộ gõ được tính là ký tự đã gõ"""
+        journal = KeystrokeJournal(self.journal_file)
+        journal.record(KEY_BACKSPACE, 0)
+        journal.record_text("việt", 0)
+        times, keys, positions = journal.snapshot()
+        self.assertEqual(list(keys[1:]), [ord(char) | TEXT_KEY for char in "việt"])
+        self.assertEqual(list(positions), [0, 0, 1, 2, 3])
+        self.assertEqual(analyze_keystrokes(times, keys)["correction_rate"], 0.2)
+
+    def test_flush_through_writer(self):
+        """Test flush chỉ đóng gói bản ghi, việc ghi file do writer thực hiện"""
+        writer = PersistenceWorker(window=60)
+        journal = KeystrokeJournal(self.journal_file, writer=writer)
+        for segment_index in (1, 2):
+            journal.record(65, 0, text=True)
+            self.assertTrue(journal.flush(source_id("movie.srt"), segment_index))
+        self.assertFalse(self.journal_file.exists())
+
+        self.assertTrue(writer.stop(timeout=5))
+        self.assertEqual([s["segment_index"] for s in iter_journal(self.journal_file)], [1, 2])
+
+class TestLatency(unittest.TestCase):
+    def test_histogram_percentiles(self):
+        """Test phân vị xấp xỉ trong sai số của bucket"""
+        histogram = LatencyHistogram()
+        for ms in range(1, 101):
+            histogram.record(ms * 1_000_000)
+        self.assertEqual(histogram.count, 100)
+        self.assertAlmostEqual(histogram.percentile(50), 50_000_000, delta=12_500_000)
+        self.assertAlmostEqual(histogram.percentile(99), 99_000_000, delta=25_000_000)
+        self.assertEqual(histogram.percentile(100), 100_000_000)
+
+    def test_disabled_recorder(self):
+        """Test recorder tắt thì không ghi span nào"""
+        recorder = LatencyRecorder()
+        work = timed("work", recorder)(lambda x: x + 1)
+        self.assertEqual(work(1), 2)
+        with recorder.span("block"):
+            pass
+        self.assertEqual(recorder.summary(), {})
+
+        recorder.enabled = True
+        work(1)
+        with recorder.span("block"):
+            pass
+        self.assertEqual(set(recorder.summary()), {"work", "block"})
+        self.assertEqual(recorder.summary()["work"]["count"], 1)
+
+if __name__ == '__main__':
+    unittest.main()